@@ -0,0 +1,352 @@
+"""Асинхронный движок обхода ссылок с ограничениями по хостам
+
+Паузы вежливости выдерживаются отдельно для каждого хоста и не блокируют
+обработку других сайтов: пока один хост "отдыхает", браузеры заняты
+страницами остальных. Сама работа с браузером и requests остается
+блокирующей и выполняется в пуле потоков; обработка страницы общая с
+WorkerPool (crawler.PageProcessor). Запуск из командной строки — тонкая
+обертка над заданием (job.run_job).
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from browser import create_driver
+from crawler import DEFAULT_DELAY, BrowserWorker, PageProcessor, Politeness, host_of, parse_delay
+from discovery import DEFAULT_MAX_DEPTH, PREFETCH, CrawlTask
+from extraction import DEFAULT_BACKEND, available_backends
+from link_sources import link_count
+from page_cache import DEFAULT_CACHE_PATH, DEFAULT_CACHE_SIZE_MB
+from parse_pool import default_processes
+from timing import DEFAULT_TIMINGS_PATH, PageTimer
+from transforms import parse_transform_arg
+
+
+class HostState:
+    """Очередь ссылок и темп запросов для одного хоста"""
+
+    def __init__(self, host, per_host, delay):
+        self.host = host
+        self.links = deque()
+        # Число одновременных страниц хоста (семафор на домен)
+        self.semaphore = asyncio.Semaphore(per_host)
+        self.delay = delay
+        self.next_allowed = 0.0
+        self.consumers = 0
+
+    async def wait_turn(self):
+        """Ожидание паузы вежливости только этого хоста"""
+        while True:
+            wait = self.next_allowed - time.monotonic()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def page_done(self):
+        self.next_allowed = time.monotonic() + random.uniform(*self.delay)
+
+
+class AsyncCrawler(PageProcessor):
+    """Обход ссылок на asyncio: семафор на каждый домен и общий лимит страниц в работе
+
+    С parse_processes HTML разбирается в пуле процессов, а браузер сразу
+    освобождается для следующей страницы. links может быть ленивым источником
+    (link_sources.LinkSource): ссылки подкачиваются в очереди хостов по мере
+    работы, не больше PREFETCH страниц вперед. С discovery ссылки считаются
+    стартовыми страницами списков, найденные на них страницы добавляются в
+    очереди своих хостов (discovery.py).
+    """
+
+    def __init__(self, links, click_elements, selected_elements, concurrency=4, per_host=1,
+                 politeness=None, restart_interval=0, driver_factory=create_driver,
+                 static_fetch=False, is_running=None, on_result=None, on_progress=None, backend=None,
+                 waits=None, blocking=None, recycle_policy=None, page_cache=None, timings=None,
+                 parse_processes=0, discovery=None):
+        super().__init__(links, click_elements, selected_elements, backend, waits, static_fetch, page_cache,
+                         timings, parse_processes, discovery, max(1, concurrency), on_result, on_progress)
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.politeness = politeness or Politeness()
+        self.is_running = is_running or (lambda: True)
+        self.workers = [BrowserWorker(i, driver_factory, restart_interval, blocking=blocking,
+                                      recycle_policy=recycle_policy)
+                        for i in range(self.concurrency)]
+        self.hosts = OrderedDict()
+        self.consumers = []
+        self.data_pages = 0
+        self.next_index = 0
+        self.queued = 0
+        self.exhausted = False
+
+    @property
+    def total(self):
+        """Страниц с данными: весь список или найденные при обходе на текущий момент
+
+        Пока ленивый источник ссылок не дочитан, берется ожидаемое число его ссылок.
+        """
+        if self.discovery or self.exhausted:
+            return self.data_pages
+        return max(self.data_pages, link_count(self.links))
+
+    async def crawl(self):
+        loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self.in_flight = asyncio.Semaphore(self.concurrency)
+        self.idle_workers = asyncio.Queue()
+        for worker in self.workers:
+            worker.start()
+            self.idle_workers.put_nowait(worker)
+        if self.discovery:
+            tasks = self.discovery.seeds(self.links)
+        else:
+            tasks = (CrawlTask(url, index=index) for index, url in enumerate(self.links))
+        tasks = iter(tasks)
+        await self._feed_batch(tasks)
+        print(f"Асинхронный обход: {self.total} ссылок, {len(self.hosts)} хостов, "
+              f"до {self.concurrency} страниц одновременно, до {self.per_host} на хост")
+        if self.consumers:
+            self.open_parse_pool()
+        feeder = asyncio.ensure_future(self._feed(tasks))
+        try:
+            # Источник ссылок и страницы списков добавляют задачи и запускают новых потребителей,
+            # пока обход не закончится
+            while self.consumers or not feeder.done():
+                consumers, self.consumers = self.consumers, []
+                await asyncio.gather(feeder, *consumers)
+        finally:
+            feeder.cancel()
+            self.static_checked.set()  # Страницы, ждущие проверки быстрой загрузки, не должны зависнуть
+            await asyncio.gather(*[loop.run_in_executor(self.executor, worker.stop) for worker in self.workers])
+            self.executor.shutdown(wait=False)
+            self.close_parse_pool()
+            self.ordered.flush()
+            self.report()
+
+    async def _feed_batch(self, tasks):
+        """Следующая пачка ссылок из источника (чтение файла или сети — в отдельном потоке)"""
+        def read():
+            try:
+                return list(itertools.islice(tasks, PREFETCH))
+            except Exception as e:
+                print(f"✗ Ошибка чтения ссылок, дальше источник не читается: {e}")
+                return []
+
+        batch = [] if self.exhausted else await asyncio.get_running_loop().run_in_executor(None, read)
+        if not batch:
+            self.exhausted = True
+        for task in batch:
+            self._add_task(task)
+
+    async def _feed(self, tasks):
+        """Подкачка ссылок, когда в очередях хостов остается меньше PREFETCH страниц"""
+        while not self.exhausted and self.is_running():
+            if self.queued >= PREFETCH:
+                await asyncio.sleep(0.1)
+            else:
+                await self._feed_batch(tasks)
+
+    def _add_task(self, task):
+        """Страница в очередь своего хоста; у хоста запускается до per_host потребителей"""
+        host = host_of(task.url)
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(host, self.per_host, self.politeness.delay_for(host))
+        state.links.append(task)
+        self.queued += 1
+        if task.data:
+            self.data_pages += 1
+        if state.consumers < self.per_host:
+            state.consumers += 1
+            self.consumers.append(asyncio.ensure_future(self._host_consumer(state)))
+
+    async def _host_consumer(self, state):
+        try:
+            while state.links and self.is_running():
+                async with state.semaphore:
+                    if not state.links:
+                        return
+                    task = state.links.popleft()
+                    self.queued -= 1
+                    if task.data and task.index is None:  # Страница, найденная при обходе
+                        task.index = self.next_index
+                        self.next_index += 1
+                    timer = PageTimer(task.url)
+                    with timer.stage("politeness"):
+                        await state.wait_turn()
+                    if not self.is_running():
+                        return
+                    async with self.in_flight:
+                        await self._run_page(task, timer)
+                    state.page_done()
+        finally:
+            state.consumers -= 1
+
+    async def _run_page(self, task, timer):
+        loop = asyncio.get_running_loop()
+        # Ожидание проверки быстрой загрузки — в отдельном потоке, не в потоках браузеров
+        static, verify = await loop.run_in_executor(None, self.static_mode, task.data)
+        with timer.stage("queue"):  # Ожидание свободного браузера
+            worker = await self.idle_workers.get()
+        timer.worker = worker.name
+        try:
+            page_data, ok, next_urls, detail_urls = await loop.run_in_executor(
+                self.executor, self.process_page, worker, task, timer, static, verify)
+        finally:
+            self.idle_workers.put_nowait(worker)
+        if isinstance(page_data, Future):  # Страница снята браузером и разбирается в пуле процессов
+            page_data, ok = await asyncio.wrap_future(page_data)
+        for new_task in self.discovered(task, next_urls, detail_urls):
+            self._add_task(new_task)
+        if verify:
+            await loop.run_in_executor(self.executor, self.check_static, task.url, page_data)
+        self.finish(worker, task, page_data, ok, timer)
+        return page_data if task.data else None
+
+
+def run_crawl(links, click_elements, selected_elements, **options):
+    """Запуск асинхронного обхода без интерфейса; возвращает результаты в порядке ссылок"""
+    results = []
+    crawler = AsyncCrawler(links, click_elements, selected_elements,
+                           on_result=lambda index, page_data: results.append(page_data), **options)
+    asyncio.run(crawler.crawl())
+    return results
+
+
+def _parse_selector_args(values):
+    """Аргументы вида "имя=css-селектор" в список элементов"""
+    elements = []
+    for value in values or []:
+        name, sep, selector = value.partition("=")
+        if not sep or not name.strip() or not selector.strip():
+            raise argparse.ArgumentTypeError(f"Ожидается имя=селектор: {value}")
+        elements.append({"name": name.strip(), "selector": selector.strip()})
+    return elements
+
+
+def _parse_field_args(values, elements_by_name):
+    """Аргументы вида "имя=значение" для полей из --parse"""
+    for value in values or []:
+        name, sep, parameter = value.partition("=")
+        if not sep or name.strip() not in elements_by_name:
+            raise argparse.ArgumentTypeError(f"Ожидается имя поля из --parse и значение: {value}")
+        yield name.strip(), parameter.strip()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Асинхронный обход ссылок без интерфейса")
+    arg_parser.add_argument("links", help="Ссылки: файл txt (по одной в строке), csv, sitemap.xml (или адрес sitemap), "
+                                          "можно в gzip; при обходе сайта — страницы списков")
+    arg_parser.add_argument("--column", metavar="КОЛОНКА",
+                            help="Колонка CSV со ссылками: название или номер с 1 (по умолчанию ищется сама)")
+    arg_parser.add_argument("--parse", action="append", required=True, metavar="ИМЯ=СЕЛЕКТОР",
+                            help="Элемент для парсинга (можно указать несколько раз)")
+    arg_parser.add_argument("--transform", action="append", metavar="ИМЯ=ОБРАБОТКА",
+                            help="Обработка поля: price, number, phone, date[:формат], regex:выражение (можно несколько)")
+    arg_parser.add_argument("--attribute", action="append", metavar="ИМЯ=АТРИБУТ",
+                            help="Брать атрибут элемента (href, src...) вместо текста")
+    arg_parser.add_argument("--click", action="append", metavar="ИМЯ=СЕЛЕКТОР",
+                            help="Элемент для клика (можно указать несколько раз)")
+    arg_parser.add_argument("--next-page", default="", metavar="СЕЛЕКТОР",
+                            help="Обход сайта: ссылка на следующую страницу списка")
+    arg_parser.add_argument("--detail-link", default="", metavar="СЕЛЕКТОР",
+                            help="Обход сайта: ссылки на карточки, с которых парсятся данные")
+    arg_parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                            help="Обход сайта: переходов по следующей странице от стартовой, 0 = без ограничения")
+    arg_parser.add_argument("--max-pages", type=int, default=0,
+                            help="Обход сайта: страниц с данными, 0 = без ограничения")
+    arg_parser.add_argument("--concurrency", type=int, default=4, help="Страниц одновременно (браузеров)")
+    arg_parser.add_argument("--per-host", type=int, default=1, help="Страниц одного хоста одновременно")
+    arg_parser.add_argument("--delay", type=parse_delay, default=DEFAULT_DELAY, metavar="МИН-МАКС",
+                            help="Пауза между страницами одного хоста, сек (например 1-2)")
+    arg_parser.add_argument("--host-delay", action="append", metavar="ХОСТ=МИН-МАКС",
+                            help="Своя пауза для сайта (можно указать несколько раз)")
+    arg_parser.add_argument("--block-resources", action="store_true",
+                            help="Не загружать картинки, шрифты, видео и счетчики")
+    arg_parser.add_argument("--allow", default="", metavar="СПИСОК",
+                            help="Исключения из блокировки через запятую: категории (images, fonts, media, trackers), хосты или адреса")
+    arg_parser.add_argument("--fixed-waits", action="store_true",
+                            help="Фиксированные паузы после загрузки и кликов вместо ожидания по условиям")
+    arg_parser.add_argument("--restart", type=int, default=0,
+                            help="Перезапуск браузера через (страниц), 0 = только по памяти и замедлению")
+    arg_parser.add_argument("--max-memory", type=int, default=1500, metavar="МБ",
+                            help="Перезапуск браузера при превышении памяти (RSS, нужен psutil), 0 = не следить")
+    arg_parser.add_argument("--max-heap", type=int, default=512, metavar="МБ",
+                            help="Перезапуск при превышении JS-кучи страницы, 0 = не следить")
+    arg_parser.add_argument("--max-nodes", type=int, default=150000, help="Перезапуск при числе узлов DOM")
+    arg_parser.add_argument("--max-slowdown", type=float, default=2.0,
+                            help="Перезапуск, когда загрузка медленнее первых страниц во столько раз")
+    arg_parser.add_argument("--static-fetch", action="store_true", help="Загружать без браузера, если нет кликов")
+    arg_parser.add_argument("--cache", nargs="?", const=DEFAULT_CACHE_PATH, metavar="ФАЙЛ",
+                            help="Кэш страниц для повторных обходов: неизмененные страницы не открываются в браузере")
+    arg_parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE_MB, metavar="МБ",
+                            help="Предельный размер кэша страниц")
+    arg_parser.add_argument("--timings", nargs="?", const=DEFAULT_TIMINGS_PATH, metavar="ФАЙЛ",
+                            help="Записывать время этапов каждой страницы и вывести отчет p50/p95")
+    arg_parser.add_argument("--headless", action="store_true", help="Запускать браузеры без окна")
+    arg_parser.add_argument("--backend", choices=available_backends(), default=DEFAULT_BACKEND,
+                            help="Движок извлечения данных")
+    arg_parser.add_argument("--parse-processes", type=int, nargs="?", const=default_processes(), default=0,
+                            metavar="N", help="Разбирать HTML в N процессах параллельно с работой браузеров "
+                                              "(без числа — по числу ядер)")
+    arg_parser.add_argument("--output", default="results.json",
+                            help="Файл для результатов: .json, .jsonl, .csv, .xlsx, .parquet")
+    arg_parser.add_argument("--no-resume", action="store_true", help="Начать заново, не продолжая прошлый запуск")
+    args = arg_parser.parse_args(argv)
+
+    # Аргументы переводятся в задание: запуск, журнал и выгрузка результатов те же, что у job.py
+    from export import available_formats
+    from job import JOB_DEFAULTS, job_discovery, run_until_stopped
+    if os.path.splitext(args.output)[1].lower() not in available_formats():
+        arg_parser.error(f"Неподдерживаемый формат файла результатов: {args.output} "
+                         f"(доступны: {', '.join(available_formats())})")
+    selected_elements = _parse_selector_args(args.parse)
+    elements_by_name = {element["name"]: element for element in selected_elements}
+    for name, value in _parse_field_args(args.attribute, elements_by_name):
+        elements_by_name[name]["attribute"] = value
+    for name, value in _parse_field_args(args.transform, elements_by_name):
+        elements_by_name[name].setdefault("transforms", []).append(parse_transform_arg(value))
+    job = dict(JOB_DEFAULTS)
+    job.update({
+        "links_file": args.links,
+        "links_column": args.column or "",
+        "click_elements": _parse_selector_args(args.click),
+        "selected_elements": selected_elements,
+        "discover": bool(args.next_page or args.detail_link),
+        "next_page_selector": args.next_page,
+        "detail_link_selector": args.detail_link,
+        "max_depth": args.max_depth,
+        "limit": args.max_pages,
+        "concurrency": args.concurrency,
+        "per_host": args.per_host,
+        "delay": "-".join(map(str, args.delay)),
+        "host_delays": ";".join(args.host_delay or []),
+        "block_resources": args.block_resources,
+        "allow": args.allow,
+        "adaptive_waits": not args.fixed_waits,
+        "restart": args.restart,
+        "max_memory": args.max_memory,
+        "max_heap": args.max_heap,
+        "max_nodes": args.max_nodes,
+        "max_slowdown": args.max_slowdown,
+        "static_fetch": args.static_fetch,
+        "page_cache": args.cache or "",
+        "cache_size_mb": args.cache_size,
+        "timings": args.timings or "",
+        "backend": args.backend,
+        "parse_processes": args.parse_processes,
+        "resume": not args.no_resume,
+        "output": args.output,
+    })
+    try:
+        job_discovery(job)
+    except ValueError as e:
+        arg_parser.error(str(e))
+    run_until_stopped(job, headless=args.headless)
+
+if __name__ == "__main__":
+    main()
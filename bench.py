@@ -0,0 +1,394 @@
+"""Замер скорости парсинга на локальном тестовом сайте без интернета
+
+Сайт поднимается на 127.0.0.1: страницы каталога заданного размера,
+кнопки "Показать телефон" трех видов (номер уже в странице, номер
+подгружается скриптом, кнопка в стиле AngularJS с data-ng-click) и медленные
+картинки и шрифты. Для каждого режима обхода и движка извлечения выводятся
+страниц в секунду, время процессора и память:
+
+    python bench.py --modes extract,static,pool,async --backends lxml,soup,browser
+    python bench.py --save bench.json              # запомнить результат
+    python bench.py --baseline bench.json          # сравнить; код выхода 1 при замедлении
+
+Режим extract не запускает Chrome и проверяет только разбор HTML.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+from constants import NOT_FOUND
+from extraction import available_backends, create_extractor
+
+PHONE_KINDS = ("plain", "js", "angular")
+MODES = ("extract", "static", "pool", "async")
+# Крошечная PNG-картинка 1x1 для медленных ресурсов
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+)
+
+# Кнопки "Показать телефон": js — номер подгружается запросом, angular — то же через angular.element().triggerHandler
+PAGE_SCRIPT = """
+function reveal(button) {
+    var target = button.parentNode.querySelector('.phone');
+    fetch('/phone/' + button.getAttribute('data-id')).then(function(r) { return r.text(); })
+        .then(function(text) { target.textContent = text; });
+}
+document.addEventListener('click', function(e) {
+    var button = e.target.closest('.show-phone');
+    if (!button) return;
+    e.preventDefault();
+    if (button.hasAttribute('data-inline')) {
+        button.parentNode.querySelector('.phone').style.display = 'inline';
+    } else {
+        reveal(button);
+    }
+});
+"""
+ANGULAR_STUB = """
+window.angular = {element: function(el) {
+    return {triggerHandler: function(type) { if (type === 'click') reveal(el); }};
+}};
+"""
+BENCH_ELEMENTS = [
+    {"name": "Название", "selector": ".item .title"},
+    {"name": "Ссылка", "selector": ".item .title", "attribute": "href"},
+    {"name": "Цена", "selector": ".item .price", "transforms": [{"type": "price"}]},
+    {"name": "Дата", "selector": ".item .date", "transforms": [{"type": "date"}]},
+    {"name": "Телефон", "selector": ".item .phone", "transforms": [{"type": "phone"}]},
+]
+BENCH_CLICKS = [{"name": "Показать телефон", "selector": ".item .show-phone"}]
+
+
+class FixtureSite:
+    """Тестовый сайт: /list/N — страница каталога, /phone/ID — номер, /slow/... — медленные ресурсы"""
+
+    def __init__(self, items=20, phone_kind="plain", slow_ms=300, seed=1):
+        self.items = items
+        self.phone_kind = phone_kind
+        self.slow_ms = slow_ms
+        self.seed = seed
+        self.server = None
+
+    def phone(self, item_id):
+        rng = random.Random(self.seed * 100003 + item_id)
+        digits = [rng.randint(0, 9) for _ in range(7)]
+        return "+7 (9{}{}) {}{}{}-{}{}-{}{}".format(item_id % 10, rng.randint(0, 9), *digits)
+
+    def listing_html(self, page):
+        rng = random.Random(self.seed * 1000 + page)
+        head = [f"<title>Каталог, страница {page}</title>",
+                '<link rel="stylesheet" href="/slow/style.css">',
+                "<style>@font-face {font-family: Bench; src: url(/slow/bench.woff2)} body {font-family: Bench}</style>",
+                f"<script>{PAGE_SCRIPT}</script>"]
+        if self.phone_kind == "angular":
+            head.append(f"<script>{ANGULAR_STUB}</script>")
+        cards = []
+        for i in range(self.items):
+            item_id = page * self.items + i
+            price = f"{rng.randint(100, 200000):,}".replace(",", " ")
+            day, month = rng.randint(1, 28), rng.randint(1, 12)
+            if self.phone_kind == "plain":
+                phone = (f'<a class="show-phone" href="#" data-inline data-id="{item_id}">Показать телефон</a>'
+                         f'<span class="phone" style="display:none">{self.phone(item_id)}</span>')
+            elif self.phone_kind == "angular":
+                phone = (f'<a class="show-phone" data-ng-click="showPhones({item_id})" data-id="{item_id}">'
+                         f'Показать телефон</a><span class="phone"></span>')
+            else:
+                phone = (f'<a class="show-phone" href="#" data-id="{item_id}">Показать телефон</a>'
+                         f'<span class="phone"></span>')
+            cards.append(
+                f'<div class="item" id="item-{item_id}">'
+                f'<a class="title" href="/item/{item_id}">Товар {item_id}</a>'
+                f'<img src="/slow/img/{item_id}.png" alt="">'
+                f'<span class="price">{price} ₽</span>'
+                f'<span class="date">{day:02d}.{month:02d}.2024</span>'
+                f'<p class="description">{"Описание товара. " * rng.randint(5, 30)}</p>'
+                f'<div class="contacts">{phone}</div>'
+                f'</div>'
+            )
+        return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{''.join(head)}</head><body>"
+                f"<div class=\"catalog\">{''.join(cards)}</div>"
+                f"<a class=\"next\" href=\"/list/{page + 1}\">Далее</a></body></html>")
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match = re.match(r"^/(list|phone|slow)/(.*)$", self.path)
+                if not match:
+                    return self.send_error(404)
+                kind, rest = match.groups()
+                if kind == "list" and rest.isdigit():
+                    self._send(site.listing_html(int(rest)).encode("utf-8"), "text/html; charset=utf-8")
+                elif kind == "phone" and rest.isdigit():
+                    time.sleep(site.slow_ms / 1000 / 3)
+                    self._send(site.phone(int(rest)).encode("utf-8"), "text/plain; charset=utf-8")
+                elif kind == "slow":
+                    time.sleep(site.slow_ms / 1000)
+                    if rest.endswith(".png"):
+                        self._send(PIXEL_PNG, "image/png")
+                    else:
+                        self._send(b"", "text/css" if rest.endswith(".css") else "application/octet-stream")
+                else:
+                    self.send_error(404)
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def links(self, pages):
+        host, port = self.server.server_address
+        return [f"http://{host}:{port}/list/{page}" for page in range(pages)]
+
+
+class ResourceMonitor:
+    """Время процессора и пик памяти этого процесса и его потомков (Chrome, chromedriver)
+
+    Без psutil учитывается только время процессора самого Python.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_rss = 0
+        self.cpu = {}
+        self.running = False
+
+    def _sample(self):
+        process = psutil.Process()
+        rss = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                rss += proc.memory_info().rss
+                times = proc.cpu_times()
+                self.cpu[proc.pid] = times.user + times.system
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _loop(self):
+        while self.running:
+            self._sample()
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        if HAS_PSUTIL:
+            self._sample()
+            self.cpu_before = dict(self.cpu)
+            self.running = True
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        if HAS_PSUTIL:
+            self.running = False
+            self.thread.join()
+            self._sample()
+            self.cpu_seconds = sum(cpu - self.cpu_before.get(pid, 0.0) for pid, cpu in self.cpu.items())
+        else:
+            self.cpu_seconds = time.process_time() - self.cpu_started
+        return False
+
+
+def _missing(records):
+    """Страницы с ошибкой или без телефонов: быстрый, но неверный обход не должен выглядеть улучшением"""
+    return sum(1 for record in records if "error" in record or record.get("Телефон") == NOT_FOUND)
+
+
+def run_extract(site, pages, backend, repeat=1):
+    extractor = create_extractor(BENCH_ELEMENTS, backend)
+    documents = [site.listing_html(page).encode("utf-8") for page in range(pages)]
+    records = []
+    with ResourceMonitor() as monitor:
+        for _ in range(repeat):
+            records = [extractor.extract(html, f"http://bench/list/{i}") for i, html in enumerate(documents)]
+    return monitor, pages * repeat, records
+
+
+def run_pool(site, links, backend, workers, clicks, static_fetch, blocking, headless=True):
+    from browser import AdaptiveWaits, ResourceBlocking, create_driver
+    from crawler import Politeness, WorkerPool
+    records = []
+    pool = WorkerPool(links, clicks, BENCH_ELEMENTS, workers=workers, static_fetch=static_fetch, backend=backend,
+                      driver_factory=functools.partial(create_driver, headless=headless), waits=AdaptiveWaits(),
+                      on_result=lambda index, page_data: records.append(page_data),
+                      politeness=Politeness((0, 0)), blocking=ResourceBlocking() if blocking else None)
+    with ResourceMonitor() as monitor:
+        pool.run()
+    return monitor, len(records), records
+
+
+def run_async(site, links, backend, workers, clicks, blocking, headless=True):
+    from async_engine import AsyncCrawler
+    from browser import AdaptiveWaits, ResourceBlocking, create_driver
+    from crawler import Politeness
+    records = []
+    # Все страницы с одного хоста: per_host = числу браузеров, чтобы режимы были сравнимы
+    crawler = AsyncCrawler(links, clicks, BENCH_ELEMENTS, concurrency=workers, per_host=workers, backend=backend,
+                           driver_factory=functools.partial(create_driver, headless=headless), waits=AdaptiveWaits(),
+                           on_result=lambda index, page_data: records.append(page_data),
+                           politeness=Politeness((0, 0)), blocking=ResourceBlocking() if blocking else None)
+    with ResourceMonitor() as monitor:
+        asyncio.run(crawler.crawl())
+    return monitor, len(records), records
+
+
+def scenarios(args):
+    """(название, вид телефонов, функция запуска) для выбранных режимов и движков"""
+    backends = [backend for backend in args.backends.split(",") if backend]
+    kinds = [kind for kind in args.phones.split(",") if kind]
+    for mode in [mode for mode in args.modes.split(",") if mode]:
+        for backend in backends:
+            if mode == "extract":
+                if backend != "browser":
+                    yield (f"extract/{backend}", "plain",
+                           lambda site, backend=backend: run_extract(site, args.pages, backend, args.repeat))
+            elif mode == "static":
+                if backend != "browser":
+                    yield (f"static/{backend}", "plain", lambda site, backend=backend: run_pool(
+                        site, site.links(args.pages), backend, args.workers, [], True, False))
+            else:
+                for kind in kinds:
+                    for blocking in (False, True) if args.blocking else (False,):
+                        name = f"{mode}/{backend}/{kind}" + ("/block" if blocking else "")
+                        clicks = [] if kind == "plain" else BENCH_CLICKS
+                        if mode == "pool":
+                            run = lambda site, backend=backend, clicks=clicks, blocking=blocking: run_pool(
+                                site, site.links(args.pages), backend, args.workers, clicks, False, blocking)
+                        else:
+                            run = lambda site, backend=backend, clicks=clicks, blocking=blocking: run_async(
+                                site, site.links(args.pages), backend, args.workers, clicks, blocking)
+                        yield name, kind, run
+
+
+def chrome_available():
+    from browser import create_driver, quit_driver
+    try:
+        quit_driver(create_driver(headless=True))
+        return True
+    except Exception as e:
+        print(f"✗ Chrome не запускается, режимы с браузером пропущены: {e}")
+        return False
+
+
+def run_benchmarks(args):
+    results = {}
+    has_chrome = None
+    for name, kind, run in scenarios(args):
+        if not name.startswith("extract/"):
+            if has_chrome is None:
+                has_chrome = chrome_available()
+            if not has_chrome:
+                continue
+        site = FixtureSite(args.items, kind, args.slow_ms).start()
+        print(f"\n##### {name} #####")
+        try:
+            monitor, pages, records = run(site)
+        except Exception as e:
+            print(f"✗ {name}: не удалось запустить ({e})")
+            continue
+        finally:
+            site.stop()
+        results[name] = {
+            "pages": pages,
+            "seconds": round(monitor.seconds, 3),
+            "pages_per_sec": round(pages / monitor.seconds, 3) if monitor.seconds else 0.0,
+            "cpu_seconds": round(monitor.cpu_seconds, 3),
+            "peak_rss_mb": round(monitor.peak_rss / 1024 / 1024, 1) if HAS_PSUTIL else None,
+            "missing": _missing(records),
+        }
+    return results
+
+
+def format_results(results):
+    lines = [f"{'режим':<28}{'страниц':>9}{'стр/с':>9}{'CPU, с':>9}{'RSS, МБ':>9}{'пропуски':>10}"]
+    for name, result in results.items():
+        rss = "—" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.0f}"
+        lines.append(f"{name:<28}{result['pages']:>9}{result['pages_per_sec']:>9.2f}"
+                     f"{result['cpu_seconds']:>9.1f}{rss:>9}{result['missing']:>10}")
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance):
+    """Замедления и новые пропуски по сравнению с сохраненным результатом"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before["pages_per_sec"] and result["pages_per_sec"] < before["pages_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['pages_per_sec']:.2f} → {result['pages_per_sec']:.2f} стр/с")
+        if result["missing"] > before["missing"]:
+            regressions.append(f"{name}: пропусков {before['missing']} → {result['missing']}")
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Замер скорости парсинга на локальном тестовом сайте")
+    arg_parser.add_argument("--modes", default="extract", help=f"Режимы через запятую: {', '.join(MODES)}")
+    arg_parser.add_argument("--backends", default=",".join(available_backends()),
+                            help="Движки извлечения через запятую: lxml, soup, browser")
+    arg_parser.add_argument("--phones", default=",".join(PHONE_KINDS),
+                            help="Виды кнопок телефона для pool и async: plain, js, angular")
+    arg_parser.add_argument("--pages", type=int, default=10, help="Страниц каталога")
+    arg_parser.add_argument("--items", type=int, default=10, help="Товаров на странице")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Повторов разбора в режиме extract")
+    arg_parser.add_argument("--workers", type=int, default=2, help="Браузеров")
+    arg_parser.add_argument("--slow-ms", type=int, default=300, help="Задержка медленных ресурсов, мс")
+    arg_parser.add_argument("--blocking", action="store_true", help="Дополнительно замерить с блокировкой ресурсов")
+    arg_parser.add_argument("--save", metavar="ФАЙЛ", help="Сохранить результат в JSON")
+    arg_parser.add_argument("--baseline", metavar="ФАЙЛ", help="Сравнить с сохраненным результатом")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15,
+                            help="Допустимое замедление при сравнении (доля, по умолчанию 0.15)")
+    args = arg_parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    print("\n" + format_results(results))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"Результат сохранен в {args.save}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print("\n✗ Замедление по сравнению с " + args.baseline + ":\n  " + "\n  ".join(regressions))
+            raise SystemExit(1)
+        print(f"\n✓ Без замедлений по сравнению с {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,620 @@
+"""Работа с браузером: запуск Chrome, умные клики и ожидания"""
+import statistics
+import threading
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
+from selenium.webdriver.common.action_chains import ActionChains
+try:
+    from webdriver_manager.chrome import ChromeDriverManager
+    HAS_WEBDRIVER_MANAGER = True
+except ImportError:
+    HAS_WEBDRIVER_MANAGER = False
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+from timing import NULL_TIMER
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+_driver_path = None
+
+# Ставится в каждый новый документ до скриптов страницы: время последнего изменения DOM
+# и число незавершенных XHR/fetch, чтобы ждать "тишины", а не фиксированное время
+PAGE_TRACKER_SCRIPT = """
+(function() {
+    if (window.__parserTracker) return;
+    var tracker = window.__parserTracker = {pending: 0, lastActivity: Date.now()};
+    function touch() { tracker.lastActivity = Date.now(); }
+    new MutationObserver(touch).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        tracker.pending++;
+        touch();
+        this.addEventListener('loadend', function() { tracker.pending--; touch(); });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function() {
+            tracker.pending++;
+            touch();
+            return originalFetch.apply(this, arguments).finally(function() { tracker.pending--; touch(); });
+        };
+    }
+})();
+"""
+
+# Ждет, пока найдутся все селекторы и DOM/сеть затихнут на quiet мс,
+# либо пока страница не простоит idle мс (часть полей может отсутствовать), либо таймаут
+WAIT_READY_SCRIPT = """
+var selectors = arguments[0], quietMs = arguments[1], idleMs = arguments[2], timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+if (!window.__parserTracker) {
+""" + PAGE_TRACKER_SCRIPT + """
+}
+var start = Date.now();
+function present(selector) {
+    try { return document.querySelector(selector) !== null; } catch (e) { return true; }
+}
+(function check() {
+    var tracker = window.__parserTracker;
+    var now = Date.now();
+    var silent = tracker.pending <= 0 ? now - tracker.lastActivity : 0;
+    var found = document.readyState !== 'loading' && selectors.every(present);
+    if ((found && silent >= quietMs) || silent >= idleMs) {
+        return done({ready: true, found: found, waited: now - start});
+    }
+    if (now - start >= timeoutMs) {
+        return done({ready: false, found: found, pending: tracker.pending, waited: now - start});
+    }
+    setTimeout(check, 50);
+})();
+"""
+
+
+# Построение селектора для выбранного на странице элемента. Кандидаты: id, data-* и другие
+# устойчивые атрибуты, классы без признаков динамики, путь от устойчивых предков и
+# nth-of-type. Каждый кандидат проверяется на текущей странице: лучший — уникальный,
+# самый устойчивый и короткий, следующие сохраняются как запасные. С many лучший —
+# самый устойчивый из совпадающих с несколькими элементами (все ссылки на карточки списка).
+SELECTOR_BUILDER_SCRIPT = """
+window.__parserBuildSelectors = function(target, many) {
+    var UNSTABLE_CLASS = /^(ng-|is-|has-|js-)|(^|-)(active|hover|focus|selected|open|opened|visible|hidden|disabled|current)$|\\d{3,}|^(css|sc|jsx)-|^_|[:\\/\\[\\]@!]/;
+    // Сгенерированные значения: номера записей, длинные серии цифр, хеши, id React (:r1:).
+    // Остальное, в том числе текст не латиницей (title="Телефон"), считается устойчивым
+    var UNSTABLE_VALUE = /^\\d+$|\\d{4,}|(^|[^0-9a-z])(?=[a-f]*\\d)[0-9a-f]{8,}($|[^0-9a-z])|^:r[0-9a-z]*:$/i;
+    var STABLE_ATTRS = ['name', 'itemprop', 'role', 'aria-label', 'title', 'type', 'for'];
+    var WEIGHT = {id: 0, attr: 1, cls: 2, tag: 3, nth: 4};
+    function esc(value) {
+        return window.CSS && CSS.escape ? CSS.escape(value) : value.replace(/([^\\w-])/g, '\\\\$1');
+    }
+    function quote(value) {
+        return '"' + value.replace(/\\\\/g, '\\\\\\\\').replace(/"/g, '\\\\"') + '"';
+    }
+    function count(selector) {
+        try { return document.querySelectorAll(selector).length; } catch (e) { return 0; }
+    }
+    function nthStep(el) {
+        var n = 1, sibling = el;
+        while ((sibling = sibling.previousElementSibling)) {
+            if (sibling.tagName === el.tagName) n++;
+        }
+        return {sel: el.tagName.toLowerCase() + ':nth-of-type(' + n + ')', weight: WEIGHT.nth};
+    }
+    function ownSteps(el) {
+        var tag = el.tagName.toLowerCase();
+        var steps = [];
+        if (el.id && !UNSTABLE_VALUE.test(el.id)) steps.push({sel: '#' + esc(el.id), weight: WEIGHT.id});
+        for (var i = 0; i < el.attributes.length; i++) {
+            var attr = el.attributes[i];
+            var stable = attr.name.indexOf('data-') === 0 || STABLE_ATTRS.indexOf(attr.name) !== -1;
+            if (stable && attr.value && attr.value.length <= 80 && !UNSTABLE_VALUE.test(attr.value)) {
+                steps.push({sel: tag + '[' + attr.name + '=' + quote(attr.value) + ']', weight: WEIGHT.attr});
+            }
+        }
+        var classes = Array.prototype.filter.call(el.classList, function(c) { return !UNSTABLE_CLASS.test(c); });
+        classes.forEach(function(c) { steps.push({sel: tag + '.' + esc(c), weight: WEIGHT.cls}); });
+        if (classes.length > 1) steps.push({sel: tag + '.' + classes.map(esc).join('.'), weight: WEIGHT.cls + 0.5});
+        steps.push({sel: tag, weight: WEIGHT.tag});
+        return steps;
+    }
+    var candidates = {};
+    function consider(selector, weight) {
+        if (candidates[selector]) return;
+        var matches = count(selector);
+        var ok = false;
+        try { ok = target.matches(selector); } catch (e) {}
+        if (ok && matches > 0) candidates[selector] = {selector: selector, matches: matches, weight: weight};
+    }
+    var targetSteps = ownSteps(target).concat([nthStep(target)]);
+    // Одиночный nth-of-type без предка слишком зависит от разметки остальной страницы
+    targetSteps.forEach(function(step) { consider(step.sel, step.weight === WEIGHT.nth ? 2 * WEIGHT.nth : step.weight); });
+    // Устойчивые предки (не дальше 6 уровней) + сам элемент
+    var prefixes = [];
+    var ancestor = target.parentElement;
+    for (var depth = 0; ancestor && ancestor !== document.documentElement && depth < 6; depth++) {
+        var stableSteps = ownSteps(ancestor).filter(function(step) { return step.weight < WEIGHT.tag; });
+        if (stableSteps.length) {
+            var best = stableSteps[0];
+            targetSteps.forEach(function(step) {
+                consider(best.sel + ' ' + step.sel, best.weight + step.weight + 1);
+                prefixes.forEach(function(prefix) {
+                    consider(best.sel + ' ' + prefix.sel + ' ' + step.sel, best.weight + prefix.weight + step.weight + 2);
+                });
+            });
+            prefixes.push(best);
+        }
+        ancestor = ancestor.parentElement;
+    }
+    // Запасной вариант, который всегда уникален: путь nth-of-type от ближайшего предка с id или от body
+    var path = [], el = target;
+    while (el && el.parentElement && el !== document.body) {
+        if (el !== target && el.id && !UNSTABLE_VALUE.test(el.id)) {
+            path.unshift('#' + esc(el.id));
+            break;
+        }
+        path.unshift(nthStep(el).sel);
+        el = el.parentElement;
+    }
+    if (el === document.body) path.unshift('body');
+    consider(path.join(' > '), WEIGHT.nth * path.length);
+    var ranked = Object.keys(candidates).map(function(key) { return candidates[key]; });
+    ranked.sort(function(a, b) {
+        return (a.matches !== 1) - (b.matches !== 1) || a.matches - b.matches
+            || a.weight - b.weight || a.selector.length - b.selector.length;
+    });
+    if (many) {
+        var repeated = ranked.filter(function(c) { return c.matches > 1 && c.weight !== WEIGHT.tag; });
+        repeated.sort(function(a, b) {
+            return a.weight - b.weight || b.matches - a.matches || a.selector.length - b.selector.length;
+        });
+        if (repeated.length) {
+            ranked = repeated.concat(ranked.filter(function(c) { return repeated.indexOf(c) === -1; }));
+        }
+    }
+    var unique = ranked.filter(function(c) { return c.matches === 1; });
+    var alternatives = (unique.length > 1 ? unique : ranked).slice(1).filter(function(c) {
+        return c.weight !== WEIGHT.tag;  // Один тег без уточнений совпадет со всей страницей
+    }).slice(0, 3);
+    return {
+        selector: ranked.length ? ranked[0].selector : target.tagName.toLowerCase(),
+        matches: ranked.length ? ranked[0].matches : 0,
+        alternatives: alternatives.map(function(c) { return c.selector; })
+    };
+};
+"""
+
+
+# Шаблоны URL для Network.setBlockedURLs по категориям ресурсов
+_EXTENSIONS = {
+    "images": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "fonts": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "ogv", "ogg", "mp3", "wav", "m4a", "mov", "avi", "m3u8"),
+}
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "mc.yandex.ru", "an.yandex.ru", "yandex.ru/ads", "top-fwz1.mail.ru",
+    "connect.facebook.net", "vk.com/rtrg", "hotjar.com", "criteo.com", "criteo.net",
+    "adriver.ru", "adfox.ru", "tiktok.com/i18n/pixel", "mediator.media",
+)
+BLOCK_CATEGORIES = ("images", "fonts", "media", "trackers")
+
+
+class ResourceBlocking:
+    """Профиль блокировки ресурсов для обхода: картинки, шрифты, видео, счетчики
+
+    allow — список исключений для задания: название категории (например "fonts")
+    разрешает ее целиком; хост ("cdn.example.com", вместе с поддоменами) или
+    адрес ("https://cdn.example.com/api/") разрешает только свои запросы, а
+    остальные ресурсы той же категории блокируются. Исключения передаются в
+    Chrome первыми (urlPatterns с block: false) и проверяются раньше шаблонов
+    блокировки. Chrome без urlPatterns получает обычный список шаблонов, из
+    которого убраны только счетчики разрешенных хостов.
+    """
+
+    def __init__(self, categories=BLOCK_CATEGORIES, allow=()):
+        allow = [item.strip() for item in allow if item.strip()]
+        self.categories = [category for category in categories if category not in map(str.lower, allow)]
+        self.allowed = [item for item in allow if item.lower() not in BLOCK_CATEGORIES]
+        self.allowed_hosts = [_allowed_host(item) for item in self.allowed]
+
+    def patterns(self):
+        patterns = []
+        for category in self.categories:
+            if category == "trackers":
+                patterns.extend(f"*{host}*" for host in TRACKER_HOSTS if not self._tracker_allowed(host))
+            else:
+                for ext in _EXTENSIONS[category]:
+                    patterns.append(f"*.{ext}")
+                    patterns.append(f"*.{ext}?*")
+        return patterns
+
+    def _tracker_allowed(self, tracker):
+        """Счетчик не блокируется, если его хост совпадает с разрешенным или один — поддомен другого"""
+        host = tracker.split("/")[0]
+        return any(host == allowed or host.endswith("." + allowed) or allowed.endswith("." + host)
+                   for allowed in self.allowed_hosts)
+
+    def allow_patterns(self):
+        """Исключения в синтаксисе URLPattern для urlPatterns с block: false"""
+        patterns = []
+        for item in self.allowed:
+            if "://" in item:
+                scheme, _, rest = item.partition("://")
+                host, slash, path = rest.partition("/")
+                patterns.append(f"{scheme}://{host}/{path if slash else ''}*")
+                continue
+            host, slash, path = item.partition("/")
+            patterns.append(f"*://{host}:*/{path}*")
+            if "*" not in host:
+                patterns.append(f"*://*.{host}:*/{path}*")
+        return patterns
+
+    def apply(self, driver):
+        driver.execute_cdp_cmd('Network.enable', {})
+        patterns = self.patterns()
+        allow_patterns = self.allow_patterns() if patterns else []
+        if allow_patterns:
+            # urlPatterns проверяются раньше шаблонов urls: первое совпадение с block: false пропускает запрос
+            try:
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {
+                    "urls": patterns,
+                    "urlPatterns": [{"urlPattern": pattern, "block": False} for pattern in allow_patterns],
+                })
+            except Exception as e:
+                # Старый Chrome без urlPatterns: обычный список, из которого уже убраны разрешенные счетчики
+                print(f"! Исключения блокировки не поддерживаются этой версией Chrome ({e}), "
+                      f"разрешены только счетчики с этих хостов")
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": patterns})
+        else:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": patterns})
+        allowed = f" (разрешено: {', '.join(self.allowed)})" if allow_patterns else ""
+        print(f"Блокировка ресурсов: {', '.join(self.categories) or 'нет'}{allowed}")
+
+    @staticmethod
+    def clear(driver):
+        """Снять блокировку (браузер окна предпросмотра после парсинга)"""
+        try:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": []})
+        except Exception:
+            pass
+
+
+def _allowed_host(item):
+    """Хост исключения в нижнем регистре: "https://CDN.example.com/api/" и "*.cdn.example.com" -> cdn.example.com"""
+    if "://" in item:
+        item = item.partition("://")[2]
+    return item.split("/")[0].split(":")[0].lower().lstrip("*.")
+
+
+def parse_allow_list(text):
+    """"fonts, mc.yandex.ru, https://cdn.example.com/api/" в список исключений"""
+    return [item.strip() for item in str(text or "").replace(";", ",").split(",") if item.strip()]
+
+
+def _chrome_service():
+    """Service для chromedriver (путь от webdriver_manager запоминается)"""
+    global _driver_path
+    if HAS_WEBDRIVER_MANAGER:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+        return Service(_driver_path)
+    return Service()  # Предполагается, что chromedriver в PATH
+
+
+def create_driver(headless=False):
+    """Запуск Chrome драйвера с ВИДИМЫМ браузером (headless — без окна, для серверов без дисплея)"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+    chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    chrome_options.add_argument("--window-size=1200,800")
+    chrome_options.add_argument("--start-maximized")
+    driver = webdriver.Chrome(service=_chrome_service(), options=chrome_options)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": USER_AGENT})
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {"source": PAGE_TRACKER_SCRIPT})
+    print("Браузер запущен с улучшенными настройками" + (" (без окна)" if headless else ""))
+    return driver
+
+
+def quit_driver(driver):
+    """Закрытие браузера без исключений"""
+    if driver:
+        try:
+            driver.quit()
+        except:
+            pass
+
+
+def angular_present(driver):
+    """Есть ли на странице AngularJS (проверяется один раз на страницу)"""
+    try:
+        return bool(driver.execute_script("return typeof angular !== 'undefined' && !!angular.element"))
+    except Exception:
+        return False
+
+
+def angular_click(driver, element, description="", angular=None):
+    """Клик для AngularJS элементов
+
+    angular — заранее известное наличие AngularJS на странице (None — проверить).
+    """
+    try:
+        angular_ready = angular if angular is not None else angular_present(driver)
+        if angular_ready:
+            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
+            time.sleep(0.5)
+            driver.execute_script("angular.element(arguments[0]).triggerHandler('click');", element)
+            print(f"  ✓ AngularJS triggerHandler клик успешен: {description}")
+            time.sleep(1)
+            return True
+        else:
+            print(f"  ! AngularJS не доступен: {description}")
+            return False
+    except Exception as e:
+        print(f"  ! AngularJS клик не сработал: {e}")
+        return False
+
+
+def _native_click(driver, element, description="", angular=None):
+    try:
+        element.click()
+        print(f"  ✓ Обычный клик успешен: {description}")
+        return True
+    except ElementClickInterceptedException:
+        return False
+
+
+def _js_click(driver, element, description="", angular=None):
+    try:
+        driver.execute_script("arguments[0].click();", element)
+        print(f"  ✓ JavaScript клик успешен: {description}")
+        return True
+    except Exception as e:
+        print(f"  ! JavaScript клик не сработал: {e}")
+        return False
+
+
+def _actions_click(driver, element, description="", angular=None):
+    try:
+        actions = ActionChains(driver)
+        actions.move_to_element(element).pause(0.5).click().perform()
+        print(f"  ✓ ActionChains клик успешен: {description}")
+        return True
+    except Exception as e:
+        print(f"  ! ActionChains клик не сработал: {e}")
+        return False
+
+
+def _coordinates_click(driver, element, description="", angular=None):
+    try:
+        location = element.location_once_scrolled_into_view
+        size = element.size
+        x = location['x'] + size['width'] // 2
+        y = location['y'] + size['height'] // 2
+        driver.execute_script(f"window.scrollTo(0, {y - 100});")
+        time.sleep(0.5)
+        driver.execute_script(f"document.elementFromPoint({x}, {y}).click();")
+        print(f"  ✓ Клик по координатам успешен: {description}")
+        return True
+    except Exception as e:
+        print(f"  ! Клик по координатам не сработал: {e}")
+        return False
+
+
+# Способы клика в порядке перебора по умолчанию
+CLICK_STRATEGIES = {
+    "angular": angular_click,
+    "native": _native_click,
+    "js": _js_click,
+    "actions": _actions_click,
+    "coordinates": _coordinates_click,
+}
+# Эти способы не требуют, чтобы элемент был кликабелен для пользователя
+SCRIPT_STRATEGIES = ("angular", "js")
+
+
+class ClickStrategyCache:
+    """Запоминает, какой способ клика сработал для пары (домен, селектор кнопки)"""
+
+    def __init__(self):
+        self.strategies = {}
+        self.lock = threading.Lock()
+
+    def get(self, domain, selector):
+        with self.lock:
+            return self.strategies.get((domain, selector))
+
+    def remember(self, domain, selector, strategy):
+        with self.lock:
+            self.strategies[(domain, selector)] = strategy
+
+
+def smart_click(driver, element, description="", learned=None, angular=None, timer=NULL_TIMER):
+    """Улучшенный умный клик с поддержкой AngularJS
+
+    learned — способ, который раньше сработал для этой кнопки: пробуется первым.
+    angular — наличие AngularJS на странице, если уже известно.
+    timer — PageTimer: время подготовки и каждой попытки клика.
+    Возвращает название сработавшего способа или False.
+    """
+    try:
+        print(f"  Пытаюсь кликнуть: {description}")
+        order = list(CLICK_STRATEGIES)
+        if learned in CLICK_STRATEGIES:
+            order.remove(learned)
+            order.insert(0, learned)
+        if angular is False:
+            order.remove("angular")
+        with timer.stage("click_prepare"):
+            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
+            time.sleep(0.5)
+            if learned not in SCRIPT_STRATEGIES:
+                WebDriverWait(driver, 5).until(EC.element_to_be_clickable(element))
+        for strategy in order:
+            started = time.perf_counter()
+            clicked = CLICK_STRATEGIES[strategy](driver, element, description, angular)
+            timer.click(strategy, time.perf_counter() - started, clicked)
+            if clicked:
+                return strategy
+        print(f"  ! Все способы клика не сработали: {description}")
+        return False
+    except TimeoutException:
+        print(f"  ! Таймаут ожидания кликабельности: {description}")
+        return False
+    except Exception as e:
+        print(f"  ✗ Ошибка при клике {description}: {e}")
+        return False
+
+
+def wait_for_element(driver, selector, timeout=10):
+    """Ожидание появления элемента"""
+    try:
+        element = WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        return element
+    except TimeoutException:
+        print(f"  Элемент не появился: {selector}")
+        return None
+
+
+def wait_for_page_ready(driver, selectors=(), quiet_ms=500, idle_ms=1500, timeout=10):
+    """Ожидание по условиям: селекторы на месте и страница затихла"""
+    driver.set_script_timeout(timeout + 5)
+    try:
+        return driver.execute_async_script(WAIT_READY_SCRIPT, list(selectors), quiet_ms, idle_ms, int(timeout * 1000))
+    except Exception as e:
+        print(f"  ! Ожидание готовности страницы не сработало: {e}")
+        return {"ready": False}
+
+
+class AdaptiveWaits:
+    """Ожидания по состоянию страницы вместо фиксированных random.uniform пауз"""
+
+    def __init__(self, quiet_ms=500, idle_ms=1500, timeout=10, click_timeout=5):
+        self.quiet_ms = quiet_ms
+        self.idle_ms = idle_ms
+        self.timeout = timeout
+        self.click_timeout = click_timeout
+
+    def for_data(self, driver, selectors):
+        """После загрузки страницы и перед извлечением данных"""
+        state = wait_for_page_ready(driver, selectors, self.quiet_ms, self.idle_ms, self.timeout)
+        if not state.get("ready"):
+            print(f"  ! Страница не затихла за {self.timeout} с, продолжаю")
+        return state
+
+    def after_click(self, driver):
+        """После клика: ждем окончания запросов и изменений DOM, которые он вызвал"""
+        return wait_for_page_ready(driver, (), self.quiet_ms, self.quiet_ms, self.click_timeout)
+
+
+MB = 1024 * 1024
+
+
+def enable_metrics(driver):
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+    except Exception as e:
+        print(f"  ! Метрики браузера недоступны: {e}")
+
+
+def browser_metrics(driver):
+    """Память и размер DOM: CDP Performance.getMetrics и RSS процессов Chrome (если есть psutil)"""
+    metrics = {}
+    try:
+        values = {m['name']: m['value'] for m in driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']}
+        metrics['heap_mb'] = values.get('JSHeapUsedSize', 0) / MB
+        metrics['nodes'] = int(values.get('Nodes', 0))
+    except Exception:
+        pass
+    if HAS_PSUTIL:
+        try:
+            # Дочерние процессы chromedriver — это браузер и все его рендереры
+            chromedriver = psutil.Process(driver.service.process.pid)
+            metrics['rss_mb'] = sum(child.memory_info().rss for child in chromedriver.children(recursive=True)) / MB
+        except Exception:
+            pass
+    return metrics
+
+
+class LatencyTracker:
+    """Рост времени загрузки страниц относительно первых страниц после запуска браузера"""
+
+    def __init__(self, baseline_pages=5, alpha=0.3):
+        self.baseline_pages = baseline_pages
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.first = []
+        self.baseline = None
+        self.recent = None
+
+    def add(self, seconds):
+        if self.baseline is None:
+            self.first.append(seconds)
+            if len(self.first) >= self.baseline_pages:
+                self.baseline = statistics.median(self.first)
+                self.recent = self.baseline
+            return
+        self.recent = self.alpha * seconds + (1 - self.alpha) * self.recent
+
+    def ratio(self):
+        if not self.baseline:
+            return 1.0
+        return self.recent / self.baseline
+
+
+class RecyclePolicy:
+    """Когда перезапускать браузер: по памяти, числу узлов DOM и замедлению загрузки
+
+    При достижении warm_ratio от любого порога заранее готовится запасной браузер,
+    при достижении порога — происходит переключение на него.
+    """
+
+    OK, WARM, RECYCLE = 0, 1, 2
+
+    def __init__(self, max_rss_mb=1500, max_heap_mb=512, max_nodes=150000, max_latency_ratio=2.0,
+                 warm_ratio=0.8):
+        self.limits = {
+            'rss_mb': max_rss_mb,
+            'heap_mb': max_heap_mb,
+            'nodes': max_nodes,
+            'latency_ratio': max_latency_ratio,
+        }
+        self.warm_ratio = warm_ratio
+
+    def check(self, metrics):
+        """(уровень, причина) для последних метрик браузера"""
+        level, reason = self.OK, ""
+        for name, limit in self.limits.items():
+            value = metrics.get(name)
+            if not limit or value is None:
+                continue
+            if value >= limit:
+                return self.RECYCLE, f"{name} {value:.0f} >= {limit}"
+            if value >= limit * self.warm_ratio:
+                level, reason = self.WARM, f"{name} {value:.0f}"
+        return level, reason
@@ -0,0 +1,240 @@
+"""Журнал временных результатов в формате JSONL (одна страница — одна строка)"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CHUNK_SIZE = 1024 * 1024
+ON_DISK_INDEX_THRESHOLD = 500000  # Записей в журнале, после которых индекс URL хранится на диске
+
+
+def url_key(url):
+    """64-битный хеш URL: в индексе хранятся хеши, а не сами строки"""
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+class UrlIndex:
+    """Множество обработанных URL: в памяти или в sqlite для очень больших запусков"""
+
+    def __init__(self, path=None):
+        self.path = None
+        self.keys = set()
+        if path:
+            self.spill(path)
+
+    def spill(self, path):
+        """Перенос индекса из памяти в sqlite, когда адресов стало слишком много"""
+        if self.path:
+            return
+        if os.path.exists(path):
+            os.remove(path)
+        # Индекс читают потоки браузеров при продолжении обхода (по одному, под блокировкой очереди)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("CREATE TABLE urls (key INTEGER PRIMARY KEY)")
+        self.db.executemany("INSERT OR IGNORE INTO urls VALUES (?)", ((key,) for key in self.keys))
+        self.path = path
+        self.keys = None
+
+    def add(self, url):
+        if self.path:
+            self.db.execute("INSERT OR IGNORE INTO urls VALUES (?)", (url_key(url),))
+        else:
+            self.keys.add(url_key(url))
+
+    def discard(self, url):
+        if self.path:
+            self.db.execute("DELETE FROM urls WHERE key = ?", (url_key(url),))
+        else:
+            self.keys.discard(url_key(url))
+
+    def __contains__(self, url):
+        if self.path:
+            return self.db.execute("SELECT 1 FROM urls WHERE key = ?", (url_key(url),)).fetchone() is not None
+        return url_key(url) in self.keys
+
+    def __len__(self):
+        if self.path:
+            return self.db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        return len(self.keys)
+
+    def close(self):
+        if self.path:
+            self.db.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class CheckpointJournal:
+    """Журнал только на дозапись: каждая страница дописывается в конец файла
+
+    fsync выполняется пачками (каждые fsync_every записей или fsync_interval
+    секунд), поэтому запись результата не зависит от размера уже собранных данных.
+    """
+
+    def __init__(self, path='temp_results.jsonl', fsync_every=20, fsync_interval=5.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def is_empty(self):
+        self.flush()
+        return not self.exists() or os.path.getsize(self.path) == 0
+
+    def append(self, page_data):
+        line = json.dumps(page_data, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self._open_for_append()
+            self.file.write(line)
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def flush(self):
+        """Принудительная запись на диск"""
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self._sync()
+                self.file.close()
+                self.file = None
+
+    def _open_for_append(self):
+        needs_newline = False
+        if self.exists() and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"  # Строка, оборванная при сбое
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if needs_newline:
+            self.file.write("\n")
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def count(self):
+        """Число записей без разбора JSON (считаются переводы строк)"""
+        if not self.exists():
+            return 0
+        self.flush()
+        count = 0
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                count += chunk.count(b"\n")
+        return count
+
+    def __iter__(self):
+        """Чтение записей по одной; оборванная при сбое последняя строка пропускается"""
+        if not self.exists():
+            return
+        self.flush()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"Пропущена поврежденная строка {line_no} в {self.path}")
+
+    def load(self):
+        return list(self)
+
+    def latest(self):
+        """Последняя запись для каждого URL (порядок — по первому появлению URL)"""
+        return list(self.iter_latest())
+
+    def iter_latest(self):
+        """То же, что latest(), но записи читаются с диска по одной"""
+        offsets, _ = self.latest_offsets()
+        return self.read_at(offsets)
+
+    def latest_offsets(self):
+        """Смещения последней записи каждого URL (в порядке первого появления URL) и все колонки журнала
+
+        Журнал читается потоком; в памяти остаются только хеши URL и смещения строк.
+        """
+        offsets = {}
+        columns = {}
+        if not self.exists():
+            return [], []
+        self.flush()
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        print(f"Пропущена поврежденная строка {line_no} в {self.path}")
+                        record = None
+                    if isinstance(record, dict):
+                        url = record.get("url")
+                        offsets[url_key(url) if url else ("line", line_no)] = offset
+                        columns.update(dict.fromkeys(record))
+                offset += len(line)
+        return list(offsets.values()), list(columns)
+
+    def read_at(self, offsets):
+        """Записи по смещениям из latest_offsets"""
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def completed_index(self, on_disk_threshold=ON_DISK_INDEX_THRESHOLD):
+        """Индекс URL, последняя запись которых завершилась без ключа error"""
+        count = self.count()
+        index = UrlIndex(self.path + ".index" if count > on_disk_threshold else None)
+        for record in self:
+            url = record.get("url")
+            if not url:
+                continue
+            if "error" in record:
+                index.discard(url)
+            else:
+                index.add(url)
+        return index
+
+    def compact(self, records=None):
+        """Перезапись журнала: одна актуальная запись на каждый URL
+
+        Если records не переданы, берется последняя запись для каждого URL из самого журнала.
+        """
+        self.close()
+        if records is None:
+            records = self.iter_latest()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.close()
+        if self.exists():
+            os.remove(self.path)
@@ -0,0 +1,7 @@
+"""Служебные значения полей результата, общие для извлечения, обхода и хранения результатов
+
+Модуль без зависимостей: его можно импортировать из модулей с данными,
+не подтягивая selenium и парсеры HTML.
+"""
+NOT_FOUND = "Не найдено"  # Элемент не найден на странице
+LOAD_ERROR = "Ошибка загрузки"  # Страницу не удалось обработать
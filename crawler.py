@@ -0,0 +1,819 @@
+"""Обход ссылок: обработка одной страницы и пул браузеров"""
+import abc
+import random
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from browser import (USER_AGENT, ClickStrategyCache, LatencyTracker, RecyclePolicy, ResourceBlocking,
+                     angular_present, browser_metrics, create_driver, enable_metrics, quit_driver, smart_click)
+from discovery import CrawlTask, Frontier
+from link_sources import LinkSource, link_count
+from constants import LOAD_ERROR, NOT_FOUND
+from extraction import create_extractor
+from page_cache import PageResponse, job_fingerprint
+from parse_pool import ParsePool
+from timing import NULL_TIMER, PageTimer
+
+DEFAULT_DELAY = (1, 2)  # Пауза вежливости между страницами одного сайта, сек
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+def parse_delay(text):
+    """"1-2" или "1.5" в пару (мин, макс) секунд"""
+    text = str(text).strip().replace(",", ".")
+    low, sep, high = text.partition("-")
+    low = float(low)
+    high = float(high) if sep else low
+    if low < 0 or high < low:
+        raise ValueError(f"Некорректная пауза: {text}")
+    return low, high
+
+
+def parse_host_delays(text):
+    """"site.ru=3-5; other.com=0" в словарь хост -> (мин, макс)"""
+    delays = {}
+    for item in str(text or "").replace("\n", ";").split(";"):
+        if not item.strip():
+            continue
+        host, sep, delay = item.partition("=")
+        if not sep:
+            raise ValueError(f"Ожидается сайт=пауза: {item.strip()}")
+        delays[host.strip().lower()] = parse_delay(delay)
+    return delays
+
+
+class Politeness:
+    """Бюджет пауз по сайтам: отдельно от загрузки и кликов, настраивается для каждого хоста
+
+    Между началами страниц одного хоста выдерживается случайная пауза из его
+    диапазона; страницы других хостов при этом не ждут.
+    """
+
+    def __init__(self, default_delay=DEFAULT_DELAY, host_delays=None):
+        self.default_delay = default_delay
+        self.host_delays = host_delays or {}
+        self.next_allowed = {}
+        self.lock = threading.Lock()
+
+    def delay_for(self, host):
+        if host in self.host_delays:
+            return self.host_delays[host]
+        # Поддомены наследуют паузу родительского домена
+        for configured, delay in self.host_delays.items():
+            if host.endswith("." + configured):
+                return delay
+        return self.default_delay
+
+    def wait(self, url):
+        """Ожидание своей очереди к хосту (слот резервируется сразу)"""
+        host = host_of(url)
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_allowed.get(host, 0.0))
+            self.next_allowed[host] = start + random.uniform(*self.delay_for(host))
+        if start > now:
+            time.sleep(start - now)
+
+
+def find_with_fallback(driver, element):
+    """Элементы по основному селектору, а если их нет — по первому сработавшему запасному"""
+    for selector in [element["selector"]] + element.get("alternatives", []):
+        found = driver.find_elements(By.CSS_SELECTOR, selector)
+        if found:
+            if selector != element["selector"]:
+                print(f"    ! {element['name']}: использован запасной селектор {selector}")
+            return found
+    return []
+
+
+def load_page(driver, url, click_elements, selectors, waits=None, click_cache=None, timer=NULL_TIMER):
+    """Загрузка страницы и клики по кнопкам; после нее страница готова к извлечению
+
+    selectors — селекторы, появления которых ждать перед извлечением.
+    waits — AdaptiveWaits для ожиданий по состоянию страницы; без него
+    используются прежние фиксированные паузы.
+    click_cache — ClickStrategyCache: сработавший способ клика пробуется первым на следующих страницах.
+    timer — PageTimer для замеров по этапам.
+    """
+    with timer.stage("navigation"):
+        driver.get(url)
+    with timer.stage("body_wait"):
+        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    with timer.stage("data_wait"):
+        if waits:
+            waits.for_data(driver, selectors)
+        else:
+            time.sleep(random.uniform(1, 3))
+
+    if click_elements:
+        print(f"  Выполняю клики по {len(click_elements)} типам элементов")
+        domain = host_of(url)
+        angular = angular_present(driver)
+        for click_element in click_elements:
+            try:
+                with timer.stage("click_find"):
+                    elements = find_with_fallback(driver, click_element)
+                print(f"    Найдено {len(elements)} элементов для: {click_element['name']}")
+                clicked_count = 0
+                for idx, elem in enumerate(elements):
+                    learned = click_cache.get(domain, click_element["selector"]) if click_cache else None
+                    strategy = smart_click(driver, elem, f"{click_element['name']} #{idx+1}", learned, angular,
+                                           timer)
+                    if strategy:
+                        if click_cache and strategy != learned:
+                            click_cache.remember(domain, click_element["selector"], strategy)
+                        clicked_count += 1
+                        with timer.stage("click_wait"):
+                            if waits:
+                                waits.after_click(driver)
+                            else:
+                                time.sleep(random.uniform(2, 4))
+                    else:
+                        print(f"      ✗ Не удалось кликнуть: {click_element['name']} #{idx+1}")
+                print(f"    ✓ Успешно кликнуто: {clicked_count}/{len(elements)} для {click_element['name']}")
+            except Exception as e:
+                print(f"    ✗ Ошибка при клике {click_element['name']}: {e}")
+
+    with timer.stage("data_wait"):
+        if not waits:
+            time.sleep(random.uniform(2, 3))
+        elif click_elements:
+            waits.for_data(driver, selectors)
+
+
+def parse_page(driver, url, click_elements, extractor, waits=None, click_cache=None, timer=NULL_TIMER):
+    """Загрузка страницы, клики по кнопкам и извлечение данных"""
+    load_page(driver, url, click_elements, [field.wait_selector for field in extractor.active_fields], waits,
+              click_cache, timer)
+    return extractor.extract_from_driver(driver, url, timer)
+
+
+def parse_listing(driver, task, click_elements, extractor, discovery, waits=None, click_cache=None,
+                  timer=NULL_TIMER):
+    """Страница списка в браузере: (данные или None, ссылки на следующую страницу, ссылки на карточки)
+
+    Данные (и клики) нужны, только если страница списка сама является страницей с данными.
+    """
+    if task.data:
+        page_data = parse_page(driver, task.url, click_elements, extractor, waits, click_cache, timer)
+    else:
+        load_page(driver, task.url, [], discovery.wait_selectors, waits, None, timer)
+        page_data = None
+    next_urls, detail_urls = discovery.links_from_driver(driver, timer)
+    return page_data, next_urls, detail_urls
+
+
+def fetch_listing(fetcher, task, extractor, discovery, selected_elements, timer=NULL_TIMER):
+    """Страница списка без браузера; None, если ее нужно открыть в браузере"""
+    try:
+        with timer.stage("fetch"):
+            html_content = fetcher.fetch(task.url)
+        next_urls, detail_urls = discovery.links_from_html(html_content, task.url, timer)
+        page_data = extractor.extract(html_content, task.url, timer) if task.data else None
+    except Exception as e:
+        print(f"  ! Быстрая загрузка не удалась, открываю в браузере: {e}")
+        return None
+    if not next_urls and not detail_urls:
+        print("  ! Без браузера ссылки не найдены, открываю в браузере")
+        return None
+    if page_data is not None and has_missing_fields(page_data, selected_elements):
+        print("  ! Без браузера найдено не все, открываю в браузере")
+        return None
+    return page_data, next_urls, detail_urls
+
+
+def has_missing_fields(page_data, selected_elements):
+    return any(page_data.get(element["name"]) == NOT_FOUND for element in selected_elements)
+
+
+class StaticFetcher:
+    """Загрузка страниц через requests без браузера (для страниц без кликов)
+
+    Каждый поток получает свою Session с пулом keep-alive соединений.
+    """
+
+    def __init__(self, timeout=15, pool_size=10):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.local = threading.local()
+
+    def session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "ru-RU,ru;q=0.9,en;q=0.8",
+            })
+            self.local.session = session
+        return session
+
+    def fetch(self, url):
+        response = self.session().get(url, timeout=self.timeout)
+        response.raise_for_status()
+        # Байты, а не response.text: кодировку из <meta charset> определит BeautifulSoup
+        return response.content
+
+    def parse(self, url, extractor, timer=NULL_TIMER):
+        with timer.stage("fetch"):
+            html_content = self.fetch(url)
+        return extractor.extract(html_content, url, timer)
+
+    def fetch_if_changed(self, url, entry=None):
+        """Условный запрос по ETag/Last-Modified записи кэша; None — сервер ответил 304"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        response = self.session().get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry is not None:
+            return None
+        response.raise_for_status()
+        return PageResponse(response.headers.get("ETag"), response.headers.get("Last-Modified"), response.content)
+
+    def matches_browser(self, url, browser_data, extractor, selected_elements):
+        """Проверка, что без браузера извлекаются те же данные, что и из отрисованной страницы"""
+        try:
+            static_data = self.parse(url, extractor)
+        except Exception as e:
+            print(f"  ! Быстрая загрузка не удалась для {url}: {e}")
+            return False
+        mismatched = [element["name"] for element in selected_elements
+                      if static_data.get(element["name"]) != browser_data.get(element["name"])]
+        if mismatched:
+            print(f"  ! Без браузера отличаются поля: {', '.join(mismatched)}")
+            return False
+        return True
+
+
+def check_page_cache(cache, fetcher, url, fingerprint):
+    """(page_data из кэша или None, ответ сервера для сохранения в кэш или None)"""
+    entry = cache.get(url, fingerprint)
+    try:
+        response = fetcher.fetch_if_changed(url, entry)
+    except Exception as e:
+        print(f"  ! Кэш: не удалось проверить страницу: {e}")
+        cache.record(False)
+        return None, None
+    if entry is not None and (response is None or response.content_hash == entry.content_hash):
+        print("  ✓ Страница не изменилась, данные взяты из кэша")
+        if response is None:
+            cache.touch(url)
+        else:
+            cache.put(url, fingerprint, response, entry.page_data)  # Новые ETag/Last-Modified
+        cache.record(True)
+        return entry.page_data, None
+    cache.record(False)
+    return None, response
+
+
+def error_result(url, error, selected_elements):
+    """Результат для страницы, которую не удалось обработать"""
+    error_data = {"url": url, "error": str(error)}
+    for element in selected_elements:
+        error_data[element["name"]] = LOAD_ERROR
+    return error_data
+
+
+class OrderedResults:
+    """Выдача результатов в порядке исходного списка ссылок
+
+    Страницы могут заканчиваться в любом порядке; результат отдается в callback,
+    как только готовы все предыдущие. Вызывать под внешней блокировкой.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.pending = {}
+        self.next_index = 0
+
+    def add(self, index, page_data):
+        self.pending[index] = page_data
+        while self.next_index in self.pending:
+            self._emit(self.next_index, self.pending.pop(self.next_index))
+            self.next_index += 1
+
+    def flush(self):
+        """После остановки отдаем то, что успели обработать, даже с пропусками"""
+        for index in sorted(self.pending):
+            self._emit(index, self.pending.pop(index))
+
+    def _emit(self, index, page_data):
+        if self.callback:
+            self.callback(index, page_data)
+
+
+class BrowserWorker:
+    """Отдельная сессия Chrome со своим счетчиком перезапусков
+
+    С recycle_policy браузер перезапускается по измеренной памяти, размеру DOM и
+    замедлению загрузки; запасной браузер готовится в фоне заранее, поэтому
+    переключение на него проходит без простоя.
+    """
+
+    def __init__(self, worker_id, driver_factory=create_driver, restart_interval=0, driver=None, blocking=None,
+                 recycle_policy=None):
+        self.worker_id = worker_id
+        self.driver_factory = driver_factory
+        self.restart_interval = restart_interval
+        self.driver = driver
+        self.keep_driver = driver is not None  # Браузер окна предпросмотра не закрываем по окончании
+        self.blocking = blocking
+        self.recycle_policy = recycle_policy
+        self.prepared = False
+        self.spare = None
+        self.spare_thread = None
+        self.recycle_reason = None
+        self.latency = LatencyTracker()
+        self.metrics = {}
+        self.pages_since_restart = 0
+        self.restarts = 0
+        self.processed = 0
+        self.errors = 0
+        self.started_at = None
+
+    @property
+    def name(self):
+        return f"W{self.worker_id + 1}"
+
+    def start(self):
+        self.started_at = time.time()
+
+    def ensure_driver(self):
+        """Браузер запускается только когда он действительно нужен"""
+        if self.driver is None:
+            self.driver = self.driver_factory()
+        if not self.prepared:
+            self._prepare(self.driver)
+            self.prepared = True
+        return self.driver
+
+    def _prepare(self, driver):
+        if self.blocking:
+            self.blocking.apply(driver)
+        if self.recycle_policy:
+            enable_metrics(driver)
+
+    def page_done(self, seconds=None):
+        """Учет страницы, открытой в браузере, и замер его состояния"""
+        self.pages_since_restart += 1
+        if seconds is not None:
+            self.latency.add(seconds)
+        if not self.recycle_policy or self.driver is None:
+            return
+        self.metrics = browser_metrics(self.driver)
+        self.metrics['latency_ratio'] = self.latency.ratio()
+        level, reason = self.recycle_policy.check(self.metrics)
+        if level >= RecyclePolicy.WARM:
+            self._start_spare()
+        if level >= RecyclePolicy.RECYCLE:
+            self.recycle_reason = reason
+
+    def restart_if_needed(self):
+        """Перезапуск по состоянию браузера или каждые restart_interval страниц"""
+        reason = self.recycle_reason
+        if not reason and self.restart_interval > 0 and self.pages_since_restart >= self.restart_interval:
+            reason = f"после {self.pages_since_restart} страниц"
+        if reason:
+            print(f"[{self.name}] Перезапуск браузера: {reason}")
+            self.restart()
+            return True
+        return False
+
+    def restart(self):
+        old_driver = self.driver
+        self.driver = self._take_spare()
+        self.prepared = True
+        threading.Thread(target=quit_driver, args=(old_driver,), daemon=True).start()
+        self.recycle_reason = None
+        self.latency.reset()
+        self.pages_since_restart = 0
+        self.restarts += 1
+
+    def _start_spare(self):
+        if self.spare is not None or self.spare_thread is not None:
+            return
+        print(f"[{self.name}] Готовлю запасной браузер")
+        self.spare_thread = threading.Thread(target=self._build_spare, daemon=True)
+        self.spare_thread.start()
+
+    def _build_spare(self):
+        try:
+            driver = self.driver_factory()
+            self._prepare(driver)
+            self.spare = driver
+        except Exception as e:
+            print(f"[{self.name}] Не удалось запустить запасной браузер: {e}")
+
+    def _take_spare(self):
+        self._start_spare()
+        self.spare_thread.join()
+        spare, self.spare, self.spare_thread = self.spare, None, None
+        if spare is None:
+            spare = self.driver_factory()
+            self._prepare(spare)
+        return spare
+
+    def stop(self):
+        if self.spare_thread is not None:
+            self.spare_thread.join()
+            quit_driver(self.spare)
+            self.spare, self.spare_thread = None, None
+        if not self.keep_driver:
+            quit_driver(self.driver)
+            self.driver = None
+        elif self.blocking and self.prepared:
+            ResourceBlocking.clear(self.driver)
+
+    def pages_per_minute(self):
+        if not self.started_at or not self.processed:
+            return 0.0
+        elapsed = time.time() - self.started_at
+        return self.processed * 60 / elapsed if elapsed > 0 else 0.0
+
+    def stats(self):
+        return {
+            "worker": self.name,
+            "processed": self.processed,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "pages_per_minute": self.pages_per_minute(),
+            "memory_mb": self.metrics.get('rss_mb', self.metrics.get('heap_mb')),
+        }
+
+
+class PageProcessor(abc.ABC):
+    """Обработка одной страницы, общая для WorkerPool и AsyncCrawler
+
+    Проверка кэша, быстрая загрузка без браузера (первая страница с данными
+    сверяется с браузером), загрузка и клики, извлечение сразу или в пуле
+    процессов, запись ошибки, ссылки со страниц списков и учет результата.
+    Движки отличаются тем, как раздают страницы браузерам, и своим total.
+    """
+
+    def __init__(self, links, click_elements, selected_elements, backend=None, waits=None, static_fetch=False,
+                 page_cache=None, timings=None, parse_processes=0, discovery=None, pool_size=1,
+                 on_result=None, on_progress=None, on_restart=None):
+        self.links = links
+        self.click_elements = click_elements
+        self.selected_elements = selected_elements
+        self.extractor = create_extractor(selected_elements, backend)
+        self.backend = backend
+        self.waits = waits
+        self.click_cache = ClickStrategyCache()
+        # Быстрая загрузка через requests возможна только если на страницах ничего не нужно нажимать
+        self.static_fetcher = StaticFetcher(pool_size=pool_size) if static_fetch and not click_elements else None
+        self.static_checked = threading.Event()
+        self.static_verifying = False
+        self.static_pages = 0
+        self.static_fallbacks = 0
+        self.page_cache = page_cache
+        self.cache_fetcher = self.static_fetcher or StaticFetcher(pool_size=pool_size)
+        self.cache_fingerprint = job_fingerprint(click_elements, selected_elements, backend)
+        self.timings = timings
+        self.parse_processes = parse_processes
+        self.parse_pool = None
+        self.discovery = discovery
+        self.on_progress = on_progress
+        self.on_restart = on_restart
+        self.workers = []
+        self.lock = threading.Lock()
+        self.ordered = OrderedResults(on_result)
+        self.done = 0
+
+    @property
+    @abc.abstractmethod
+    def total(self):
+        """Страниц с данными для вывода "i/total" """
+
+    def worker_stats(self):
+        return [worker.stats() for worker in self.workers]
+
+    def open_parse_pool(self):
+        if self.parse_processes:
+            self.parse_pool = ParsePool(self.selected_elements, self.backend, self.parse_processes)
+
+    def close_parse_pool(self):
+        if self.parse_pool:
+            self.parse_pool.close()  # Дожидаемся разбора уже снятых страниц
+            self.parse_pool = None
+
+    def report(self):
+        """Итоги запуска в консоль"""
+        if self.static_fetcher:
+            print(f"Без браузера: {self.static_pages} страниц, открыто в браузере: {self.static_fallbacks}")
+        if self.page_cache:
+            print(self.page_cache.report())
+        if self.discovery:
+            print(self.discovery.report())
+        if isinstance(self.links, LinkSource):
+            print(f"Источник ссылок: {self.links.report()}")
+
+    def static_mode(self, data=True):
+        """(загружать без браузера, эта страница проверяет быструю загрузку)
+
+        Первая страница с данными открывается в браузере и сравнивается с быстрой
+        загрузкой; остальные страницы ждут результата проверки.
+        """
+        if self.static_fetcher is None:
+            return False, False
+        if data and not self.static_checked.is_set():
+            with self.lock:
+                verify = not self.static_verifying
+                self.static_verifying = True
+            if verify:
+                print("  Проверка быстрой загрузки на этой странице")
+                return False, True
+            self.static_checked.wait()
+        return self.static_fetcher is not None, False
+
+    def check_static(self, url, page_data):
+        """Сравнение быстрой загрузки с данными из браузера; при расхождении она отключается"""
+        try:
+            if "error" not in page_data and self.static_fetcher.matches_browser(
+                    url, page_data, self.extractor, self.selected_elements):
+                print("  ✓ Быстрая загрузка без браузера включена")
+            else:
+                print("  ! Быстрая загрузка отключена: страницы нужно открывать в браузере")
+                self.static_fetcher = None
+        finally:
+            self.static_checked.set()
+
+    def process_page(self, worker, task, timer, static=False, verify=False):
+        """Страница в потоке браузера: (данные, ok, ссылки на следующие страницы, ссылки на карточки)
+
+        Данные — None у страницы списка без данных и Future с парой (данные, ok),
+        если HTML разбирается в пуле процессов.
+        """
+        if task.listing:
+            return self._process_listing(worker, task, timer, static)
+        page_data, ok = self._process(worker, task.index, task.url, timer, static, verify)
+        return page_data, ok, [], []
+
+    def discovered(self, task, next_urls, detail_urls):
+        """Новые страницы обхода, найденные на странице списка"""
+        if not task.listing:
+            return []
+        new_tasks = self.discovery.expand(task, next_urls, detail_urls)
+        print(f"  Ссылок: следующих страниц {len(next_urls)}, карточек {len(detail_urls)}, новых {len(new_tasks)}")
+        return new_tasks
+
+    def finish(self, worker, task, page_data, ok, timer):
+        """Учет страницы; результат страницы с данными отдается в on_result по порядку"""
+        with self.lock:
+            # Счетчики браузера меняются под self.lock: с разбором в пуле процессов
+            # страницу завершает поток обратного вызова пула, а не поток браузера
+            worker.processed += 1
+            if not ok:
+                worker.errors += 1
+            if task.data:
+                self.done += 1
+                # Запись результата: on_result сохраняет его в результаты и журнал
+                with timer.stage("checkpoint"):
+                    self.ordered.add(task.index, page_data)
+            done = self.done
+        if self.timings:
+            self.timings.record(timer)
+        if task.data and self.on_progress:
+            self.on_progress(done, task.url, ok, self.worker_stats())
+
+    def _restart_if_needed(self, worker, timer):
+        with timer.stage("restart"):
+            if worker.restart_if_needed() and self.on_restart:
+                self.on_restart(worker)
+
+    def _fetch_static(self, url, response=None, timer=NULL_TIMER):
+        """Быстрая загрузка; None если страницу все же нужно открыть в браузере
+
+        response — уже полученный при проверке кэша ответ, чтобы не скачивать страницу дважды.
+        """
+        extractor = self.parse_pool or self.extractor
+        try:
+            if response is not None:
+                page_data = extractor.extract(response.body, url, timer)
+            else:
+                page_data = self.static_fetcher.parse(url, extractor, timer)
+        except Exception as e:
+            print(f"  ! Быстрая загрузка не удалась, открываю в браузере: {e}")
+            return None
+        if has_missing_fields(page_data, self.selected_elements):
+            print("  ! Без браузера найдено не все, открываю в браузере")
+            return None
+        return page_data
+
+    def _process(self, worker, index, url, timer, static=False, verify=False):
+        """Страница с данными в потоке браузера: (данные, ok)
+
+        Данные — Future с парой (данные, ok), если HTML разбирается в пуле процессов.
+        """
+        print(f"\n=== [{worker.name}] Обрабатывается {index+1}/{self.total}: {url} ===")
+        response = None
+        # Проверочная страница всегда открывается в браузере: данные в кэше могли быть получены
+        # и без браузера, тогда сравнение быстрой загрузки с ними ничего не проверяет
+        if self.page_cache and not verify:
+            with timer.stage("cache"):
+                page_data, response = check_page_cache(self.page_cache, self.cache_fetcher, url,
+                                                       self.cache_fingerprint)
+            if page_data is not None:
+                timer.source = "cache"
+                return page_data, True
+        if static and self.static_fetcher:
+            page_data = self._fetch_static(url, response, timer)
+            with self.lock:
+                if page_data is not None:
+                    self.static_pages += 1
+                else:
+                    self.static_fallbacks += 1
+            if page_data is not None:
+                timer.source = "static"
+                self._cache_page(url, response, page_data, timer)
+                return page_data, True
+        try:
+            self._restart_if_needed(worker, timer)
+            timer.source = "browser"
+            started = time.time()
+            if self.parse_pool and self.extractor.name != "browser" and not verify:
+                driver = worker.ensure_driver()
+                selectors = [field.wait_selector for field in self.extractor.active_fields]
+                load_page(driver, url, self.click_elements, selectors, self.waits, self.click_cache, timer)
+                with timer.stage("page_source"):
+                    html_content = driver.page_source
+                worker.page_done(time.time() - started)
+                # Разбор идет в процессе пула, браузер свободен для следующей ссылки; ожидание места
+                # в очереди разбора держит браузер — так работает обратное давление
+                result = Future()
+                future = self.parse_pool.submit(html_content, url, timer)
+                future.add_done_callback(lambda future: result.set_result(
+                    self._parsed(worker, url, response, timer, future)))
+                return result, True
+            page_data = parse_page(worker.ensure_driver(), url, self.click_elements, self.extractor, self.waits,
+                                   self.click_cache, timer)
+            worker.page_done(time.time() - started)
+        except Exception as e:
+            return self._error(worker, url, e, timer), False
+        self._cache_page(url, response, page_data, timer)
+        return page_data, True
+
+    def _process_listing(self, worker, task, timer, static=False):
+        """Страница списка: (данные, если страница с данными, ok, ссылки на следующие страницы, на карточки)"""
+        url = task.url
+        label = f"{task.index+1}/{self.total}" if task.data else "список"
+        print(f"\n=== [{worker.name}] Обрабатывается {label}, глубина {task.depth}: {url} ===")
+        if static and self.static_fetcher:
+            found = fetch_listing(self.static_fetcher, task, self.extractor, self.discovery, self.selected_elements,
+                                  timer)
+            with self.lock:
+                if found is not None:
+                    self.static_pages += 1
+                else:
+                    self.static_fallbacks += 1
+            if found is not None:
+                timer.source = "static"
+                page_data, next_urls, detail_urls = found
+                return page_data, True, next_urls, detail_urls
+        try:
+            self._restart_if_needed(worker, timer)
+            timer.source = "browser"
+            started = time.time()
+            page_data, next_urls, detail_urls = parse_listing(
+                worker.ensure_driver(), task, self.click_elements, self.extractor, self.discovery, self.waits,
+                self.click_cache, timer)
+            worker.page_done(time.time() - started)
+        except Exception as e:
+            return self._error(worker, url, e, timer), False, [], []
+        return page_data, True, next_urls, detail_urls
+
+    def _parsed(self, worker, url, response, timer, future):
+        """(данные, ok) после разбора страницы в пуле процессов"""
+        try:
+            page_data = future.result()
+        except Exception as e:
+            print(f"  ✗ [{worker.name}] Ошибка при разборе {url}: {e}")
+            timer.source = "error"
+            return error_result(url, e, self.selected_elements), False
+        self._cache_page(url, response, page_data, timer)
+        return page_data, True
+
+    def _error(self, worker, url, error, timer):
+        print(f"  ✗ [{worker.name}] Ошибка при обработке {url}: {error}")
+        worker.page_done()
+        timer.source = "error"
+        return error_result(url, error, self.selected_elements)
+
+    def _cache_page(self, url, response, page_data, timer=NULL_TIMER):
+        if self.page_cache and response is not None:
+            with timer.stage("cache"):
+                self.page_cache.put(url, self.cache_fingerprint, response, page_data)
+
+
+class WorkerPool(PageProcessor):
+    """Пул независимых браузеров, разбирающих ссылки из общей очереди
+
+    Результаты отдаются в on_result строго в порядке исходного списка ссылок,
+    независимо от того, какой браузер закончил страницу раньше. links — список
+    или ленивый источник (link_sources.LinkSource), который читается по мере работы.
+    С parse_processes HTML разбирается в пуле процессов (ParsePool): браузер
+    после page_source сразу берет следующую ссылку.
+    С discovery ссылки считаются стартовыми страницами списков, а очередь
+    пополняется найденными на них страницами (discovery.py); результаты
+    отдаются в порядке обработки.
+    """
+
+    def __init__(self, links, click_elements, selected_elements, workers=1, restart_interval=0,
+                 driver_factory=create_driver, initial_driver=None, is_running=None,
+                 on_result=None, on_progress=None, on_restart=None, static_fetch=False, backend=None,
+                 waits=None, politeness=None, blocking=None, recycle_policy=None, page_cache=None, timings=None,
+                 parse_processes=0, discovery=None):
+        super().__init__(links, click_elements, selected_elements, backend, waits, static_fetch, page_cache,
+                         timings, parse_processes, discovery, max(1, workers), on_result, on_progress, on_restart)
+        self.politeness = politeness or Politeness()
+        self.workers = [
+            BrowserWorker(i, driver_factory, restart_interval, driver=initial_driver if i == 0 else None,
+                          blocking=blocking, recycle_policy=recycle_policy)
+            for i in range(max(1, workers))
+        ]
+        self.is_running = is_running or (lambda: True)
+        self.frontier = Frontier(by_host=discovery is not None)
+
+    @property
+    def total(self):
+        """Страниц с данными: весь список или найденные при обходе на текущий момент
+
+        Пока ленивый источник ссылок не дочитан, берется ожидаемое число его ссылок.
+        """
+        if self.discovery or self.frontier.exhausted:
+            return self.frontier.data_pages
+        return max(self.frontier.data_pages, link_count(self.links))
+
+    def run(self):
+        """Запуск всех браузеров и ожидание окончания очереди"""
+        if self.discovery:
+            tasks = self.discovery.seeds(self.links)
+        else:
+            tasks = (CrawlTask(url, index=index) for index, url in enumerate(self.links))
+        if self.frontier.feed(tasks):
+            self.open_parse_pool()
+        try:
+            threads = [threading.Thread(target=self._worker_loop, args=(worker,), daemon=True)
+                       for worker in self.workers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.close_parse_pool()
+        self.report()
+        with self.lock:
+            self.ordered.flush()
+
+    def _worker_loop(self, worker):
+        worker.start()
+        if not self.static_fetcher:
+            try:
+                worker.ensure_driver()
+            except Exception as e:
+                print(f"[{worker.name}] Не удалось запустить браузер: {e}")
+                return
+        try:
+            while self.is_running():
+                task = self.frontier.get(self.is_running)
+                if task is None:
+                    break
+                try:
+                    self._run_task(worker, task)
+                finally:
+                    self.frontier.task_done(task)
+        finally:
+            worker.stop()
+
+    def _run_task(self, worker, task):
+        timer = PageTimer(task.url, worker.name)
+        with timer.stage("politeness"):
+            self.politeness.wait(task.url)
+        static, verify = self.static_mode(task.data)
+        page_data, ok, next_urls, detail_urls = self.process_page(worker, task, timer, static, verify)
+        for new_task in self.discovered(task, next_urls, detail_urls):
+            self.frontier.put(new_task)
+        if isinstance(page_data, Future):
+            page_data.add_done_callback(lambda future: self.finish(worker, task, *future.result(), timer))
+            return
+        if verify:
+            self.check_static(task.url, page_data)
+        self.finish(worker, task, page_data, ok, timer)
@@ -0,0 +1,365 @@
+"""Обход сайта без готового списка ссылок: страницы списков, «следующая страница», карточки
+
+Стартовые ссылки считаются страницами списков. С каждой такой страницы
+берутся ссылка на следующую страницу (селектор next_page) и ссылки на
+карточки (селектор detail_link); данные парсятся с карточек, а без
+селектора карточек — с самих страниц списков. Очередь обходится в ширину,
+по очереди между сайтами. Адреса приводятся к единому виду, повторы
+отсекаются фильтром Блума (около 2,5 байта на адрес вместо строки в памяти).
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+from extraction import HAS_LXML
+from timing import NULL_TIMER
+
+DEFAULT_MAX_DEPTH = 50  # Переходов по «следующей странице» от стартовой
+SEEN_CAPACITY = 1000000  # Адресов в первом фильтре; дальше добавляются фильтры вдвое больше
+SEEN_ERROR_RATE = 0.0001  # Доля новых адресов, ошибочно принятых за уже виденные
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = ("utm_", "yclid", "gclid", "fbclid", "_openstat")
+PREFETCH = 1000  # Страниц из ленивого источника ссылок, которые держатся в очереди заранее
+
+# Ссылка из найденного элемента: сам <a>, ссылка вокруг него или внутри него
+LINKS_SCRIPT = """
+var result = [];
+for (var i = 0; i < arguments[0].length; i++) {
+    var hrefs = [];
+    if (arguments[0][i]) {
+        var nodes = document.querySelectorAll(arguments[0][i]);
+        for (var j = 0; j < nodes.length; j++) {
+            var link = nodes[j].closest('a[href]') || nodes[j].querySelector('a[href]');
+            if (link) hrefs.push(link.href);
+        }
+    }
+    result.push(hrefs);
+}
+return result;
+"""
+
+
+def normalize_url(url, base=None):
+    """Адрес в едином виде для очереди и проверки повторов; None, если это не страница http(s)
+
+    Схема и хост в нижнем регистре, без порта по умолчанию, #якоря и меток utm_*.
+    """
+    url = str(url).strip()
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = parts.hostname
+    if scheme not in DEFAULT_PORTS or not host:
+        return None
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    netloc = host if port is None or port == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+    query = "&".join(
+        param for param in parts.query.split("&")
+        if param and not param.split("=", 1)[0].lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def site_of(url):
+    """Сайт для ограничения обхода: хост без www."""
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class BloomFilter:
+    """Фильтр Блума: «точно не было» или «скорее всего было» с заданной долей ошибок"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class SeenUrls:
+    """Уже встреченные адреса; фильтр растет вместе с обходом, память — около 2,5 байта на адрес"""
+
+    def __init__(self, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE):
+        # Каждый следующий фильтр точнее вдвое, чтобы общая доля ошибок оставалась в пределах error_rate
+        self.filters = [BloomFilter(capacity, error_rate / 2)]
+        self.error_rate = error_rate / 2
+
+    def __contains__(self, url):
+        return any(url in bloom for bloom in self.filters)
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    def add(self, url):
+        """True, если адрес встретился впервые"""
+        if url in self:
+            return False
+        bloom = self.filters[-1]
+        if bloom.count >= bloom.capacity:
+            self.error_rate /= 2
+            bloom = BloomFilter(bloom.capacity * 2, self.error_rate)
+            self.filters.append(bloom)
+        bloom.add(url)
+        return True
+
+
+class CrawlTask:
+    """Страница в очереди обхода
+
+    listing — страница списка (с нее берутся ссылки); data — с нее парсятся
+    данные. index — номер результата; страницы, найденные при обходе,
+    получают его, когда их берут в работу.
+    """
+
+    __slots__ = ("url", "depth", "listing", "data", "index")
+
+    def __init__(self, url, depth=0, listing=False, data=True, index=None):
+        self.url = url
+        self.depth = depth
+        self.listing = listing
+        self.data = data
+        self.index = index
+
+
+class Discovery:
+    """Настройки и состояние обхода сайта: селекторы ссылок, глубина, лимит, виденные адреса
+
+    max_pages — сколько страниц с данными взять в обход (0 = без ограничения);
+    done — уже обработанные адреса при продолжении запуска: карточки из него
+    пропускаются, страницы списков обходятся снова, но без повторного парсинга.
+    """
+
+    def __init__(self, next_page="", detail_link="", max_depth=DEFAULT_MAX_DEPTH, max_pages=0, same_host=True,
+                 done=None):
+        self.next_page = (next_page or "").strip()
+        self.detail_link = (detail_link or "").strip()
+        if not self.next_page and not self.detail_link:
+            raise ValueError("Для обхода сайта нужен селектор следующей страницы или ссылок на карточки")
+        self.matchers = []
+        for selector in (self.next_page, self.detail_link):
+            try:
+                self.matchers.append(soupsieve.compile(selector) if selector else None)
+            except Exception as e:
+                raise ValueError(f"неверный селектор {selector}: {e}")
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_host = same_host
+        self.done = done
+        self.seen = SeenUrls()
+        self.lock = threading.Lock()
+        self.data_pages = 0
+        self.listing_pages = 0
+
+    @property
+    def parses_listings(self):
+        """Без селектора карточек данные берутся со страниц списков"""
+        return not self.detail_link
+
+    @property
+    def wait_selectors(self):
+        """Страница списка готова, когда на ней есть карточки или ссылка на следующую страницу"""
+        return [", ".join(selector for selector in (self.detail_link, self.next_page) if selector)]
+
+    def seeds(self, links):
+        """Стартовые страницы списков"""
+        for url in links:
+            with self.lock:
+                task = self._accept(url, None, 0, listing=True)
+            if task is not None:
+                yield task
+
+    def expand(self, task, next_urls, detail_urls):
+        """Новые страницы из ссылок страницы списка task с учетом глубины, лимита и уже виденных"""
+        site = site_of(task.url)
+        found = []
+        with self.lock:
+            if not self.max_depth or task.depth < self.max_depth:
+                for url in next_urls:
+                    found.append(self._accept(url, site, task.depth + 1, listing=True))
+            for url in detail_urls:
+                found.append(self._accept(url, site, task.depth + 1, listing=False))
+        return [new_task for new_task in found if new_task is not None]
+
+    def _accept(self, url, site, depth, listing):
+        url = normalize_url(url)
+        if url is None or (self.same_host and site is not None and site_of(url) != site):
+            return None
+        if self.max_pages and self.data_pages >= self.max_pages:
+            return None  # Лимит набран: дальше обходить незачем
+        if not self.seen.add(url):
+            return None
+        data = not listing or self.parses_listings
+        if data and self.done is not None and url in self.done:
+            if not listing:
+                return None
+            data = False  # Страница списка уже обработана: только ссылки
+        if data:
+            self.data_pages += 1
+        if listing:
+            self.listing_pages += 1
+        return CrawlTask(url, depth, listing, data)
+
+    def links_from_driver(self, driver, timer=NULL_TIMER):
+        """(ссылки на следующую страницу, ссылки на карточки) со страницы, открытой в браузере"""
+        with timer.stage("links"):
+            found = driver.execute_script(LINKS_SCRIPT, [self.next_page, self.detail_link]) or [[], []]
+        return found[0], found[1]
+
+    def links_from_html(self, html_content, url, timer=NULL_TIMER):
+        """(ссылки на следующую страницу, ссылки на карточки) из HTML страницы url"""
+        with timer.stage("links"):
+            soup = BeautifulSoup(html_content, 'lxml' if HAS_LXML else 'html.parser')
+            base = soup.find('base', href=True)
+            base_url = urljoin(url, base['href']) if base else url
+            return tuple(self._hrefs(soup, matcher, base_url) for matcher in self.matchers)
+
+    @staticmethod
+    def _hrefs(soup, matcher, base_url):
+        if matcher is None:
+            return []
+        hrefs = []
+        for tag in matcher.select(soup):
+            if tag.name == 'a' and tag.get('href'):
+                link = tag
+            else:
+                link = tag.find_parent('a', href=True) or tag.find('a', href=True)
+            if link is not None:
+                hrefs.append(urljoin(base_url, link['href']))
+        return hrefs
+
+    def report(self):
+        return (f"Обход сайта: страниц списков {self.listing_pages}, страниц с данными {self.data_pages}, "
+                f"адресов просмотрено {len(self.seen)}")
+
+
+class Frontier:
+    """Очередь страниц для потоков браузеров
+
+    by_host — по очереди между сайтами, внутри сайта в порядке добавления
+    (то есть в ширину); без него — в порядке исходного списка. Пока
+    страницы списков в работе, пустая очередь еще может пополниться, и get ждет.
+    Задачи из feed читаются лениво: в очереди держится не больше prefetch страниц.
+    Источник читает один поток за раз и без блокировки очереди, чтобы медленный
+    LinkSource (файл, sitemap, сеть) не останавливал выдачу уже прочитанных страниц.
+    """
+
+    def __init__(self, by_host=False, prefetch=PREFETCH):
+        self.by_host = by_host
+        self.prefetch = prefetch
+        self.hosts = OrderedDict()
+        self.condition = threading.Condition()
+        self.source = None
+        self.reading = False
+        self.size = 0
+        self.expanding = 0
+        self.data_pages = 0
+        self.next_index = 0
+
+    def feed(self, tasks):
+        """Ленивый источник задач; возвращает число задач, уже попавших в очередь"""
+        with self.condition:
+            self.source = iter(tasks)
+        self._refill()
+        return self.size
+
+    @property
+    def exhausted(self):
+        """Источник задач прочитан до конца"""
+        return self.source is None
+
+    def _refill(self):
+        with self.condition:
+            if self.reading or self.source is None or self.size >= self.prefetch:
+                return
+            self.reading = True
+            source, wanted = self.source, self.prefetch - self.size
+        batch = []
+        exhausted = False
+        while len(batch) < wanted:
+            try:
+                task = next(source, None)
+            except Exception as e:
+                print(f"✗ Ошибка чтения ссылок, дальше источник не читается: {e}")
+                task = None
+            if task is None:
+                exhausted = True
+                break
+            batch.append(task)
+        with self.condition:
+            for task in batch:
+                self.put(task)
+            if exhausted:
+                self.source = None
+            self.reading = False
+            self.condition.notify_all()
+
+    def put(self, task):
+        host = urlsplit(task.url).netloc.lower() if self.by_host else ""
+        with self.condition:
+            self.hosts.setdefault(host, deque()).append(task)
+            self.size += 1
+            if task.data:
+                self.data_pages += 1
+            self.condition.notify()
+
+    def get(self, is_running=None):
+        """Следующая страница или None, когда очередь пуста и пополняться уже нечему"""
+        while True:
+            self._refill()
+            with self.condition:
+                if self.size:
+                    return self._pop()
+                if self.source is not None and not self.reading:
+                    continue  # Прочитанное успели разобрать другие потоки — читать дальше
+                # Пока источник читает другой поток или страницы списков в работе, очередь еще пополнится
+                if not (self.reading or self.expanding) or (is_running and not is_running()):
+                    return None
+                self.condition.wait(0.5)
+
+    def _pop(self):
+        """Следующая задача из непустой очереди; вызывается под self.condition"""
+        host, tasks = next(iter(self.hosts.items()))
+        task = tasks.popleft()
+        if tasks:
+            self.hosts.move_to_end(host)
+        else:
+            del self.hosts[host]
+        self.size -= 1
+        if task.listing:
+            self.expanding += 1
+        if task.data and task.index is None:
+            task.index = self.next_index
+            self.next_index += 1
+        return task
+
+    def task_done(self, task):
+        if task.listing:
+            with self.condition:
+                self.expanding -= 1
+                self.condition.notify_all()
@@ -0,0 +1,257 @@
+"""Потоковый экспорт результатов в Excel, CSV, JSON, JSONL и Parquet
+
+Записи читаются из журнала temp_results.jsonl пачками по EXPORT_CHUNK и сразу
+дописываются в файл, поэтому память не зависит от числа результатов.
+"""
+import csv
+import json
+import os
+import re
+from datetime import date, datetime
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from constants import LOAD_ERROR, NOT_FOUND
+
+EXPORT_CHUNK = 5000
+XLSX_MAX_ROWS = 1048575  # Строк данных на листе Excel (еще одна — заголовок)
+XLSX_MAX_CELL = 32767
+
+
+class CsvExporter:
+    """CSV в UTF-8 с BOM, чтобы Excel сразу открывал кириллицу"""
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, records):
+        self.writer.writerows([record.get(col, "") for col in self.columns] for record in records)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlExporter:
+    """Одна запись — одна строка JSON"""
+
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, records):
+        self.file.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonExporter:
+    """Массив JSON в том же виде, что и json.dump(..., indent=2), но без сборки списка в памяти"""
+
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write("[")
+        self.first = True
+
+    def write(self, records):
+        for record in records:
+            text = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            self.file.write(("\n  " if self.first else ",\n  ") + text)
+            self.first = False
+
+    def close(self):
+        self.file.write("]" if self.first else "\n]")
+        self.file.close()
+
+
+class XlsxExporter:
+    """Excel через openpyxl в режиме write-only: строки сразу уходят во временный файл листа
+
+    Если строк больше, чем помещается на лист, создается следующий лист.
+    """
+
+    def __init__(self, path, columns):
+        if not HAS_OPENPYXL:
+            raise RuntimeError("Для экспорта в Excel установите openpyxl: pip install openpyxl")
+        self.path = path
+        self.columns = columns
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.sheet_rows = 0
+
+    def _new_sheet(self):
+        number = len(self.workbook.worksheets) + 1
+        self.sheet = self.workbook.create_sheet("Результаты" if number == 1 else f"Результаты {number}")
+        self.sheet.append(self.columns)
+        self.sheet_rows = 0
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, str):
+            return ILLEGAL_CHARACTERS_RE.sub("", value)[:XLSX_MAX_CELL]
+        if value is None or isinstance(value, (int, float, bool)):
+            return value
+        return str(value)
+
+    def write(self, records):
+        for record in records:
+            if self.sheet is None or self.sheet_rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append([self._cell(record.get(col, "")) for col in self.columns])
+            self.sheet_rows += 1
+
+    def close(self):
+        if self.sheet is None:
+            self._new_sheet()
+        self.workbook.save(self.path)
+
+
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+ISO_DATETIME = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}(:\d{2})?$")
+SENTINEL_VALUES = (NOT_FOUND, LOAD_ERROR)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def parquet_type(values):
+    """Тип колонки по значениям: числа, логические, даты ГГГГ-ММ-ДД и дата-время из обработок
+    полей (transforms.py), иначе строка. "Не найдено" и пустые значения не учитываются.
+
+    Числа всегда дробные: parse_number возвращает "1 500" целым, а "12 990,50" — дробным,
+    и целая колонка потеряла бы дробные цены из следующих пачек.
+    """
+    values = [value for value in values if value is not None and value not in SENTINEL_VALUES]
+    if not values:
+        return pa.string()
+    if all(isinstance(value, bool) for value in values):
+        return pa.bool_()
+    if all(_is_number(value) for value in values):
+        return pa.float64()
+    if all(isinstance(value, str) and ISO_DATE.match(value) for value in values):
+        return pa.date32()
+    if all(isinstance(value, str) and ISO_DATETIME.match(value) for value in values):
+        return pa.timestamp("s")
+    return pa.string()
+
+
+def parquet_value(value, value_type):
+    """Значение для колонки value_type; ValueError, если оно другого типа"""
+    if value is None:
+        return None
+    if pa.types.is_string(value_type):
+        return str(value)
+    if value in SENTINEL_VALUES:
+        return None  # В типизированной колонке "Не найдено" и ошибка — пустое значение
+    if pa.types.is_boolean(value_type) and isinstance(value, bool):
+        return value
+    if pa.types.is_floating(value_type) and _is_number(value):
+        return float(value)
+    if pa.types.is_date(value_type) and isinstance(value, str) and ISO_DATE.match(value):
+        return date.fromisoformat(value)
+    if pa.types.is_timestamp(value_type) and isinstance(value, str) and ISO_DATETIME.match(value):
+        return datetime.fromisoformat(value)
+    raise ValueError(value)
+
+
+class ParquetExporter:
+    """Parquet через pyarrow: каждая пачка — отдельная группа строк
+
+    Тип каждой колонки определяется по первой пачке (parquet_type): числа,
+    цены и даты из обработок полей сохраняют свой тип. Значения другого типа
+    в следующих пачках записываются пустыми, их число выводится в конце.
+    """
+
+    def __init__(self, path, columns):
+        if not HAS_PYARROW:
+            raise RuntimeError("Для экспорта в Parquet установите pyarrow: pip install pyarrow")
+        self.path = path
+        self.columns = columns
+        self.schema = None
+        self.writer = None
+        self.mismatched = {}
+
+    def write(self, records):
+        if self.schema is None:
+            self.schema = pa.schema([(col, parquet_type(record.get(col) for record in records))
+                                     for col in self.columns])
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        data = {}
+        for field in self.schema:
+            values = []
+            for record in records:
+                try:
+                    values.append(parquet_value(record.get(field.name), field.type))
+                except ValueError:
+                    values.append(None)
+                    self.mismatched[field.name] = self.mismatched.get(field.name, 0) + 1
+            data[field.name] = values
+        self.writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        if self.writer is None:
+            self.write([])  # Пустой файл с колонками
+        self.writer.close()
+        for col, count in self.mismatched.items():
+            print(f"! Parquet: в колонке «{col}» {count} значений другого типа записаны пустыми")
+
+
+EXPORTERS = {
+    ".xlsx": XlsxExporter,
+    ".csv": CsvExporter,
+    ".json": JsonExporter,
+    ".jsonl": JsonlExporter,
+    ".parquet": ParquetExporter,
+}
+
+
+def available_formats():
+    return [ext for ext in EXPORTERS
+            if (ext != ".xlsx" or HAS_OPENPYXL) and (ext != ".parquet" or HAS_PYARROW)]
+
+
+def export_records(records, columns, path, on_progress=None, total=None):
+    """Запись результатов в файл; формат — по расширению path. Возвращает число записей"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORTERS:
+        raise ValueError(f"Неизвестный формат экспорта: {ext or path}")
+    exporter = EXPORTERS[ext](path, columns)
+    written = 0
+    chunk = []
+    try:
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= EXPORT_CHUNK:
+                exporter.write(chunk)
+                written += len(chunk)
+                chunk = []
+                if on_progress:
+                    on_progress(written, total)
+        if chunk:
+            exporter.write(chunk)
+            written += len(chunk)
+    finally:
+        exporter.close()
+    if on_progress:
+        on_progress(written, total)
+    return written
+
+
+def export_journal(journal, path, on_progress=None):
+    """Экспорт последней записи каждого URL из журнала (CheckpointJournal) без загрузки журнала в память"""
+    offsets, columns = journal.latest_offsets()
+    return export_records(journal.read_at(offsets), columns, path, on_progress, len(offsets))
@@ -0,0 +1,349 @@
+"""Извлечение выбранных полей из HTML: сменные движки разбора
+
+Селекторы компилируются один раз на запуск (create_extractor), после чего
+каждая страница разбирается один раз, а все поля собираются по одному
+дереву документа. Значения полей сразу проходят обработки из "transforms"
+(transforms.py); вместо текста элемента можно взять атрибут ("attribute").
+"""
+import abc
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+import soupsieve
+try:
+    import lxml.html
+    from lxml import etree
+    from cssselect import HTMLTranslator, SelectorError
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+from constants import NOT_FOUND
+from timing import NULL_TIMER
+from transforms import apply_transforms, build_transforms
+
+URL_ATTRIBUTES = ('href', 'src')  # Значения дополняются до полного адреса страницы
+SKIPPED_TEXT_TAGS = ('script', 'style', 'template')
+
+
+class CompiledField:
+    """Поле для парсинга с заранее скомпилированным селектором
+
+    alternatives — запасные селекторы из выбора элемента; пробуются по очереди,
+    если основной селектор ничего не нашел. attribute — атрибут элемента
+    (href, src и т. п.) вместо текста.
+    """
+
+    def __init__(self, name, selector, alternatives=(), attribute=None):
+        self.name = name
+        self.selector = selector
+        self.alternatives = list(alternatives)
+        self.attribute = attribute
+        self.matchers = []
+        self.transforms = []
+        self.error = None
+
+    @property
+    def wait_selector(self):
+        """Селектор для ожидания: поле готово, когда найден любой из вариантов"""
+        return ", ".join([self.selector] + self.alternatives)
+
+
+class BaseExtractor(abc.ABC):
+    """Общая часть движков: компиляция полей и сборка page_data"""
+
+    name = None
+
+    def __init__(self, selected_elements):
+        self.fields = []
+        for element in selected_elements:
+            field = CompiledField(element["name"], element["selector"], attribute=element.get("attribute") or None)
+            selectors, errors = [], []
+            for selector in [element["selector"]] + list(element.get("alternatives", [])):
+                try:
+                    field.matchers.append(self.compile(selector))
+                    selectors.append(selector)
+                except Exception as e:
+                    errors.append(e)  # Неверный селектор не используется, остальные варианты работают
+            if selectors:
+                if selectors[0] != element["selector"]:
+                    print(f"! Поле «{field.name}»: неверный селектор {element['selector']}, "
+                          f"используется запасной {selectors[0]}")
+                field.selector, field.alternatives = selectors[0], selectors[1:]
+            else:
+                field.error = f"Ошибка: {str(errors[0])}"
+            try:
+                field.transforms = build_transforms(element.get("transforms"))
+            except Exception as e:
+                field.error = f"Ошибка: {str(e)}"
+            self.fields.append(field)
+        self.active_fields = [field for field in self.fields if field.error is None]
+
+    @abc.abstractmethod
+    def compile(self, selector):
+        """Скомпилированный селектор; исключение, если селектор неверный"""
+
+    @abc.abstractmethod
+    def parse(self, html_content):
+        """Дерево документа для collect"""
+
+    @abc.abstractmethod
+    def collect(self, document):
+        """Тексты (или атрибуты) найденных элементов: список списков в порядке self.active_fields"""
+
+    @staticmethod
+    def field_value(field, values, url):
+        """Значение поля из найденных значений: после обработок одно значение
+        сохраняет свой тип (число, дата), несколько склеиваются через " | "
+        """
+        if field.attribute in URL_ATTRIBUTES:
+            values = [urljoin(url, value) for value in values]
+        if field.transforms:
+            values = apply_transforms(field.transforms, values)
+        if not values:
+            return NOT_FOUND
+        if len(values) == 1:
+            return values[0]
+        return " | ".join(str(value) for value in values)
+
+    def extract(self, html_content, url, timer=NULL_TIMER):
+        """page_data из HTML; timer — PageTimer для замера разбора и извлечения"""
+        with timer.stage("parse"):
+            document = self.parse(html_content)
+        with timer.stage("extraction"):
+            page_data = {"url": url}
+            texts_by_field = dict(zip(map(id, self.active_fields), self.collect(document)))
+            for field in self.fields:
+                if field.error is not None:
+                    page_data[field.name] = field.error
+                    continue
+                page_data[field.name] = self.field_value(field, texts_by_field[id(field)], url)
+        return page_data
+
+    def extract_from_driver(self, driver, url, timer=NULL_TIMER):
+        """Извлечение из страницы, открытой в браузере"""
+        with timer.stage("page_source"):
+            html_content = driver.page_source
+        return self.extract(html_content, url, timer)
+
+
+class SoupExtractor(BaseExtractor):
+    """BeautifulSoup + soupsieve: совместимый движок, если lxml не установлен"""
+
+    name = "soup"
+
+    def compile(self, selector):
+        return soupsieve.compile(selector)
+
+    def parse(self, html_content):
+        return BeautifulSoup(html_content, 'html.parser')
+
+    def collect(self, soup):
+        found = [[] for _ in self.active_fields]
+        # Один обход дерева: каждый элемент проверяется основными селекторами всех полей
+        for tag in soup.find_all(True):
+            for i, field in enumerate(self.active_fields):
+                if field.matchers[0].match(tag):
+                    found[i].append(self.tag_value(tag, field))
+        for i, field in enumerate(self.active_fields):
+            found[i] = [value for value in found[i] if value is not None]
+            for matcher in field.matchers[1:]:
+                if found[i]:
+                    break
+                values = (self.tag_value(tag, field) for tag in matcher.select(soup))
+                found[i] = [value for value in values if value is not None]
+        return found
+
+    @staticmethod
+    def tag_value(tag, field):
+        """Текст элемента или значение атрибута (None, если атрибута нет)"""
+        if field.attribute is None:
+            return tag.get_text(strip=True)
+        value = tag.get(field.attribute)
+        return " ".join(value) if isinstance(value, list) else value
+
+
+class LxmlExtractor(BaseExtractor):
+    """lxml + cssselect: CSS переводится в XPath один раз и выполняется в C
+
+    Документ разбирается один раз; текст элемента, попавшего в несколько
+    полей, вычисляется один раз. Селекторы, которые cssselect не переводит
+    (:nth-of-type без тега, :nth-child(... of S) и т. п.), выполняются через
+    soupsieve, как в движке soup: результат не зависит от выбранного движка.
+    """
+
+    name = "lxml"
+
+    def __init__(self, selected_elements):
+        self.translator = HTMLTranslator()  # Имена тегов без учета регистра, как в HTML
+        self.parser = lxml.html.HTMLParser(encoding='utf-8')
+        self.text_xpath = etree.XPath(
+            "descendant-or-self::text()[not(parent::script) and not(parent::style) and not(parent::template)]"
+        )
+        super().__init__(selected_elements)
+
+    def compile(self, selector):
+        try:
+            return etree.XPath(self.translator.css_to_xpath(selector))
+        except (SelectorError, etree.XPathError):
+            return soupsieve.compile(selector)
+
+    def parse(self, html_content):
+        if not html_content:
+            return None
+        if isinstance(html_content, bytes):
+            html_content = UnicodeDammit(html_content, is_html=True).unicode_markup
+        if not html_content or not html_content.strip():
+            return None
+        try:
+            return lxml.html.document_fromstring(html_content.encode('utf-8'), parser=self.parser)
+        except etree.ParserError:
+            return None
+
+    def element_text(self, element):
+        if element.tag in SKIPPED_TEXT_TAGS:
+            return ""
+        return "".join(part.strip() for part in self.text_xpath(element))
+
+    def collect(self, tree):
+        found = [[] for _ in self.active_fields]
+        if tree is None:
+            return found
+        texts = {}
+        soup = None
+        for i, field in enumerate(self.active_fields):
+            for matcher in field.matchers:
+                if isinstance(matcher, soupsieve.SoupSieve):
+                    if soup is None:  # Дерево для soupsieve строится, только если такие селекторы есть
+                        soup = BeautifulSoup(etree.tostring(tree, encoding='unicode', method='html'), 'lxml')
+                    values = (SoupExtractor.tag_value(tag, field) for tag in matcher.select(soup))
+                    found[i] = [value for value in values if value is not None]
+                    if found[i]:
+                        break
+                    continue
+                for element in matcher(tree):
+                    if not isinstance(element.tag, str):
+                        continue
+                    if field.attribute is not None:
+                        value = element.get(field.attribute)
+                        if value is not None:
+                            found[i].append(value)
+                        continue
+                    text = texts.get(element)
+                    if text is None:
+                        text = texts[element] = self.element_text(element)
+                    found[i].append(text)
+                if found[i]:
+                    break
+        return found
+
+
+# Тексты собираются так же, как get_text(strip=True): все текстовые узлы без script/style,
+# каждый без пробелов по краям, склеенные без разделителя
+BROWSER_EXTRACT_SCRIPT = """
+var fields = arguments[0];
+var result = {};
+function textOf(el) {
+    if (/^(SCRIPT|STYLE|TEMPLATE)$/.test(el.nodeName)) return '';
+    var walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    var parts = [];
+    var node;
+    while ((node = walker.nextNode())) {
+        var parent = node.parentNode;
+        if (parent && /^(SCRIPT|STYLE)$/.test(parent.nodeName)) continue;
+        var text = node.nodeValue.trim();
+        if (text) parts.push(text);
+    }
+    return parts.join('');
+}
+function valuesOf(nodes, attribute) {
+    var values = [];
+    for (var j = 0; j < nodes.length; j++) {
+        if (!attribute) {
+            values.push(textOf(nodes[j]));
+        } else if (nodes[j].hasAttribute(attribute)) {
+            values.push(nodes[j].getAttribute(attribute));
+        }
+    }
+    return values;
+}
+for (var i = 0; i < fields.length; i++) {
+    var name = fields[i][0];
+    try {
+        var values = [];
+        // Основной селектор, затем запасные, пока что-нибудь не найдется
+        for (var k = 0; k < fields[i][1].length && !values.length; k++) {
+            values = valuesOf(document.querySelectorAll(fields[i][1][k]), fields[i][2]);
+        }
+        result[name] = values;
+    } catch (e) {
+        result[name] = {error: String(e && e.message || e)};
+    }
+}
+return result;
+"""
+
+
+class BrowserScriptExtractor(BaseExtractor):
+    """Извлечение прямо в браузере: все селекторы отправляются одним execute_script
+
+    Вместо передачи всего page_source по WebDriver возвращается только словарь
+    готовых текстов по полям. Для HTML без браузера (быстрая загрузка)
+    используется обычный движок.
+    """
+
+    name = "browser"
+
+    def __init__(self, selected_elements):
+        self.html_extractor = create_extractor(selected_elements, DEFAULT_BACKEND)
+        super().__init__(selected_elements)
+        self.script_fields = [[field.name, [field.selector] + field.alternatives, field.attribute]
+                              for field in self.active_fields]
+
+    def compile(self, selector):
+        soupsieve.compile(selector)  # Ошибка в селекторе видна сразу, а не на каждой странице
+        return selector
+
+    def parse(self, html_content):
+        return self.html_extractor.parse(html_content)
+
+    def collect(self, document):
+        return self.html_extractor.collect(document)
+
+    def extract(self, html_content, url, timer=NULL_TIMER):
+        return self.html_extractor.extract(html_content, url, timer)
+
+    def extract_from_driver(self, driver, url, timer=NULL_TIMER):
+        with timer.stage("extraction"):
+            values = driver.execute_script(BROWSER_EXTRACT_SCRIPT, self.script_fields) or {}
+        page_data = {"url": url}
+        for field in self.fields:
+            if field.error is not None:
+                page_data[field.name] = field.error
+                continue
+            value = values.get(field.name) or []
+            if isinstance(value, dict):
+                page_data[field.name] = f"Ошибка: {value.get('error')}"
+            else:
+                page_data[field.name] = self.field_value(field, value, url)
+        return page_data
+
+
+BACKENDS = {"lxml": LxmlExtractor, "soup": SoupExtractor, "browser": BrowserScriptExtractor}
+DEFAULT_BACKEND = "lxml" if HAS_LXML else "soup"
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != "lxml" or HAS_LXML]
+
+
+def create_extractor(selected_elements, backend=None):
+    """Движок извлечения для запуска; селекторы компилируются здесь один раз"""
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lxml" and not HAS_LXML:
+        print("lxml не установлен, используется BeautifulSoup: pip install lxml cssselect")
+        backend = "soup"
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный движок извлечения: {backend}")
+    return BACKENDS[backend](selected_elements)
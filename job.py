@@ -0,0 +1,246 @@
+"""Запуск парсинга без интерфейса по файлу задания
+
+Задание — JSON-файл со ссылками, селекторами (в том виде, в каком их
+сохраняет окно программы) и настройками запуска:
+
+    python job.py job.json
+
+Модуль не импортирует tkinter и запускает Chrome без окна, поэтому задание
+можно выполнять на сервере без дисплея, например из cron.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import signal
+
+from async_engine import AsyncCrawler
+from browser import AdaptiveWaits, RecyclePolicy, ResourceBlocking, create_driver, parse_allow_list
+from checkpoint import CheckpointJournal
+from export import available_formats, export_journal
+from crawler import Politeness, parse_delay, parse_host_delays
+from discovery import DEFAULT_MAX_DEPTH, Discovery
+from link_sources import LinkSource, is_url
+from page_cache import DEFAULT_CACHE_SIZE_MB, PageCache
+from timing import TimingRecorder, timing_report
+from profiles import PROFILES_DIR, ProfileStore
+from transforms import upgrade_elements
+from results import ResultStore
+
+JOB_DEFAULTS = {
+    "links": [],
+    "links_file": "",
+    "links_column": "",
+    "profile": "",
+    "profiles_dir": "",
+    "click_elements": [],
+    "selected_elements": [],
+    "limit": 0,
+    "discover": False,
+    "next_page_selector": "",
+    "detail_link_selector": "",
+    "max_depth": DEFAULT_MAX_DEPTH,
+    "concurrency": 1,
+    "per_host": 1,
+    "delay": "1-2",
+    "host_delays": "",
+    "restart": 0,
+    "max_memory": 1500,
+    "max_heap": 512,
+    "max_nodes": 150000,
+    "max_slowdown": 2.0,
+    "adaptive_waits": True,
+    "block_resources": False,
+    "allow": "",
+    "static_fetch": False,
+    "page_cache": "",
+    "cache_size_mb": DEFAULT_CACHE_SIZE_MB,
+    "timings": "",
+    "parse_processes": 0,
+    "backend": None,
+    "resume": True,
+    "checkpoint": "",
+    "output": "results.json",
+}
+JOB_PATHS = ("links_file", "profiles_dir", "page_cache", "timings", "checkpoint", "output")
+
+
+def _check_elements(job, key):
+    for element in job[key]:
+        if not isinstance(element, dict) or not element.get("name") or not element.get("selector"):
+            raise ValueError(f"{key}: ожидается список объектов с полями name и selector")
+
+
+def load_job(path):
+    """Чтение задания; относительные пути считаются от папки файла задания
+
+    Если указан profile, селекторы и настройки берутся из профиля сайта;
+    значения из самого задания имеют приоритет.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    unknown = sorted(set(data) - set(JOB_DEFAULTS))
+    if unknown:
+        print(f"! Неизвестные параметры задания пропущены: {', '.join(unknown)}")
+    data = {key: value for key, value in data.items() if key in JOB_DEFAULTS}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for key in JOB_PATHS:
+        if data.get(key) and not is_url(data[key]):
+            data[key] = os.path.join(base_dir, data[key])
+    job = dict(JOB_DEFAULTS)
+    if data.get("profile"):
+        profile = ProfileStore(data.get("profiles_dir") or PROFILES_DIR).load(data["profile"])
+        job.update({key: value for key, value in profile.get("settings", {}).items() if key in JOB_DEFAULTS})
+        job["click_elements"] = profile.get("click_elements", [])
+        job["selected_elements"] = profile.get("selected_elements", [])
+        for key in ("click_elements", "selected_elements"):
+            if not data.get(key):
+                data.pop(key, None)  # Пустой список в задании не заменяет элементы профиля
+    job.update(data)
+    job["selected_elements"] = upgrade_elements(job["selected_elements"])  # "phones": true из старых заданий
+    _check_elements(job, "click_elements")
+    _check_elements(job, "selected_elements")
+    if not job["selected_elements"]:
+        raise ValueError("В задании не выбраны элементы для парсинга (selected_elements)")
+    if job["discover"]:
+        job_discovery(job)  # Ошибка в селекторах обхода видна до запуска
+    return job
+
+
+def save_job(path, job):
+    """Сохранение задания; сохраняются только известные параметры"""
+    data = {key: job.get(key, default) for key, default in JOB_DEFAULTS.items()}
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def job_links(job):
+    """Ссылки задания: список links и источник links_file, с учетом лимита
+
+    links_file — файл txt, csv (колонка links_column), sitemap.xml или адрес
+    sitemap, в том числе в gzip; он читается лениво во время обхода. При обходе
+    сайта это стартовые страницы списков, а лимит относится к найденным страницам.
+    """
+    links = [link.strip() for link in job["links"] if link.strip()]
+    return LinkSource(job["links_file"], job["links_column"], links,
+                      limit=0 if job["discover"] else job["limit"])
+
+
+def job_discovery(job, done=None):
+    """Обход сайта по селекторам задания или None, если задан готовый список ссылок"""
+    if not job["discover"]:
+        return None
+    return Discovery(job["next_page_selector"], job["detail_link_selector"], job["max_depth"], job["limit"],
+                     done=done)
+
+
+def crawl_options(job, headless=True):
+    """Настройки AsyncCrawler из задания"""
+    return {
+        "concurrency": job["concurrency"],
+        "per_host": job["per_host"],
+        "politeness": Politeness(parse_delay(job["delay"]), parse_host_delays(job["host_delays"])),
+        "waits": AdaptiveWaits() if job["adaptive_waits"] else None,
+        "blocking": ResourceBlocking(allow=parse_allow_list(job["allow"])) if job["block_resources"] else None,
+        "restart_interval": job["restart"],
+        "recycle_policy": RecyclePolicy(job["max_memory"], job["max_heap"], job["max_nodes"], job["max_slowdown"]),
+        "static_fetch": job["static_fetch"],
+        "parse_processes": job["parse_processes"],
+        "backend": job["backend"],
+        "driver_factory": functools.partial(create_driver, headless=headless),
+    }
+
+
+def run_job(job, headless=True, is_running=None):
+    """Выполнение задания; возвращает все результаты (включая прошлые при продолжении)"""
+    links = job_links(job)
+    # Журнал по умолчанию лежит рядом с файлом результатов
+    journal = CheckpointJournal(job["checkpoint"] or os.path.splitext(job["output"])[0] + ".jsonl")
+    results = ResultStore.for_elements(job["selected_elements"])
+    done = None
+    if job["resume"] and journal.exists():
+        done = journal.completed_index()
+        if job["discover"]:
+            # Страницы списков обходятся заново, уже обработанные страницы пропускаются при обходе
+            print(f"Продолжение обхода: уже обработано {len(done)} страниц")
+        else:
+            links.exclude = done  # Уже обработанные ссылки пропускаются при чтении источника
+            print(f"Продолжение: уже обработано {len(done)} страниц")
+        results.extend(record for record in journal.iter_latest() if "error" not in record)
+    else:
+        journal.clear()
+
+    def on_result(index, page_data):
+        results.append(page_data)
+        journal.append(page_data)
+
+    def on_progress(done, url, ok, worker_stats):
+        print(f"Обработано: {done}/{crawler.total} {'' if ok else 'ERROR: '}{url}")
+
+    page_cache = PageCache(job["page_cache"], job["cache_size_mb"]) if job["page_cache"] else None
+    timings = TimingRecorder(job["timings"]) if job["timings"] else None
+    crawler = AsyncCrawler(links, job["click_elements"], job["selected_elements"],
+                           is_running=is_running, on_result=on_result, on_progress=on_progress,
+                           page_cache=page_cache, timings=timings, discovery=job_discovery(job, done),
+                           **crawl_options(job, headless))
+    try:
+        asyncio.run(crawler.crawl())
+    finally:
+        if done is not None:
+            done.close()
+        journal.compact(results)
+        if page_cache:
+            page_cache.close()
+        if timings:
+            timings.close()
+    if timings:
+        print(timing_report(job["timings"]))
+    # Формат файла результатов — по расширению: .json, .jsonl, .csv, .xlsx, .parquet
+    count = export_journal(journal, job["output"])
+    print(f"Сохранено {count} результатов в {job['output']}")
+    return results
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Запуск парсинга по файлу задания без интерфейса")
+    arg_parser.add_argument("job", help="Файл задания (JSON)")
+    arg_parser.add_argument("--links-file", help="Файл со ссылками (txt, csv, sitemap, gzip) или адрес sitemap "
+                                                 "вместо указанного в задании")
+    arg_parser.add_argument("--output", help="Файл для результатов вместо указанного в задании")
+    arg_parser.add_argument("--no-resume", action="store_true", help="Начать заново, не продолжая прошлый запуск")
+    arg_parser.add_argument("--show-browser", action="store_true", help="Показывать окно браузера (для отладки)")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        job = load_job(args.job)
+    except (OSError, ValueError) as e:
+        arg_parser.error(f"Не удалось прочитать задание: {e}")
+    if args.links_file:
+        job["links"] = []
+        job["links_file"] = args.links_file if is_url(args.links_file) else os.path.abspath(args.links_file)
+    if args.output:
+        job["output"] = os.path.abspath(args.output)
+    if args.no_resume:
+        job["resume"] = False
+    if os.path.splitext(job["output"])[1].lower() not in available_formats():
+        arg_parser.error(f"Неподдерживаемый формат файла результатов: {job['output']} "
+                         f"(доступны: {', '.join(available_formats())})")
+    run_until_stopped(job, headless=not args.show_browser)
+
+
+def run_until_stopped(job, headless=True):
+    """run_job с остановкой по SIGTERM/SIGINT: текущие страницы дорабатываются и записываются"""
+    running = [True]
+
+    def stop(signum, frame):
+        print("Получен сигнал остановки, дожидаюсь текущих страниц...")
+        running[0] = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    return run_job(job, headless=headless, is_running=lambda: running[0])
+
+
+if __name__ == "__main__":
+    main()
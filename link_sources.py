@@ -0,0 +1,254 @@
+"""Потоковые источники ссылок: большие текстовые файлы, gzip, sitemap.xml и индексы sitemap, колонка CSV
+
+Ссылки читаются по мере того, как их забирает очередь браузеров, и целиком
+в памяти не хранятся. Повторы отсекаются на лету по адресу в едином виде
+(discovery.normalize_url): в индексе 8-байтные хеши, после 500 тысяч
+адресов индекс переносится на диск.
+"""
+import contextlib
+import csv
+import gzip
+import io
+import itertools
+import os
+import tempfile
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+import requests
+
+from browser import USER_AGENT
+from checkpoint import ON_DISK_INDEX_THRESHOLD, UrlIndex
+from discovery import normalize_url
+
+SAMPLE_SIZE = 20  # Ссылок в примере для окна программы
+SOURCE_TIMEOUT = 60
+MAX_SITEMAP_DEPTH = 3  # Вложенность индексов sitemap
+GZIP_MAGIC = b"\x1f\x8b"
+URL_HEADERS = ("url", "urls", "link", "links", "href", "loc", "ссылка", "ссылки", "адрес", "url адрес")
+
+
+def is_url(path):
+    return str(path).lower().startswith(("http://", "https://"))
+
+
+def link_count(links):
+    """Число ссылок: длина списка или ожидаемое число ссылок источника (0, если неизвестно)"""
+    try:
+        return len(links)
+    except TypeError:
+        return getattr(links, "expected", None) or 0
+
+
+@contextlib.contextmanager
+def open_source(path):
+    """Поток байтов файла или адреса; gzip распаковывается на лету (по сигнатуре, а не расширению)"""
+    with contextlib.ExitStack() as stack:
+        if is_url(path):
+            response = stack.enter_context(requests.get(path, stream=True, timeout=SOURCE_TIMEOUT,
+                                                        headers={"User-Agent": USER_AGENT}))
+            response.raise_for_status()
+            response.raw.decode_content = True  # Content-Encoding: gzip
+            response.raw.auto_close = False  # Иначе BufferedReader не дочитает конец ответа
+            stream = stack.enter_context(io.BufferedReader(response.raw))
+        else:
+            stream = stack.enter_context(open(path, 'rb'))
+        if stream.peek(2)[:2] == GZIP_MAGIC:
+            stream = stack.enter_context(gzip.GzipFile(fileobj=stream))
+        yield stream
+
+
+def source_kind(path, head):
+    """"sitemap", "csv" или "text" по имени файла и его началу"""
+    name = (urlsplit(path).path if is_url(path) else str(path)).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".csv", ".tsv")):
+        return "csv"
+    if name.endswith(".xml") or head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+        return "sitemap"
+    return "text"
+
+
+def iter_links(path, column=None, depth=0):
+    """Ссылки из файла или адреса по одной, как они записаны в источнике (без проверки повторов)"""
+    with open_source(path) as stream:
+        kind = source_kind(path, stream.peek(256))
+        if kind == "sitemap":
+            yield from iter_sitemap(stream, path, depth)
+        elif kind == "csv":
+            yield from iter_csv(stream, column, delimiter="\t" if ".tsv" in str(path).lower() else None)
+        else:
+            for line in io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace'):
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def iter_sitemap(stream, path, depth=0):
+    """<loc> из urlset; индекс sitemap раскрывается в ссылки вложенных sitemap
+
+    Разбор потоковый: обработанные элементы сразу удаляются из дерева.
+    """
+    root = namespace = None
+    is_index = False
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        if root is None:
+            root = element
+            namespace = root.tag[:root.tag.find("}") + 1]
+            is_index = root.tag == namespace + "sitemapindex"
+            continue
+        if event != "end":
+            continue
+        # Только <loc> самого sitemap, а не image:loc и другие расширения
+        if element.tag == namespace + "loc" and element.text and element.text.strip():
+            loc = element.text.strip()
+            if is_url(path):
+                loc = urljoin(path, loc)
+            elif is_index and not is_url(loc):
+                loc = os.path.join(os.path.dirname(str(path)), loc)  # Локальный индекс и sitemap рядом с ним
+            if not is_index:
+                yield loc
+            elif depth >= MAX_SITEMAP_DEPTH:
+                print(f"  ! Пропущен sitemap {loc}: слишком глубокая вложенность индексов")
+            else:
+                try:
+                    yield from iter_links(loc, depth=depth + 1)
+                except Exception as e:
+                    print(f"  ✗ Не удалось прочитать sitemap {loc}: {e}")
+        elif element.tag in (namespace + "url", namespace + "sitemap"):
+            root.clear()
+
+
+def _looks_like_url(cell):
+    return is_url(cell.strip())
+
+
+def csv_column(header, column=None):
+    """(номер колонки со ссылками, первая строка — заголовок)
+
+    column — название колонки или ее номер с 1; без него ищется заголовок вроде
+    url/ссылка, а если заголовка нет — первая колонка, где в первой строке ссылка.
+    """
+    names = [cell.strip().lower() for cell in header]
+    if column not in (None, ""):
+        column = str(column).strip()
+        if column.lower() in names:
+            return names.index(column.lower()), True
+        if column.isdigit() and int(column) > 0:
+            index = int(column) - 1
+            return index, not (index < len(header) and _looks_like_url(header[index]))
+        raise ValueError(f"в CSV нет колонки «{column}»")
+    for index, name in enumerate(names):
+        if name in URL_HEADERS:
+            return index, True
+    for index, cell in enumerate(header):
+        if _looks_like_url(cell):
+            return index, False
+    raise ValueError("в CSV не найдена колонка со ссылками: укажите ее название или номер")
+
+
+def iter_csv(stream, column=None, delimiter=None):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    first_line = text.readline()
+    if not first_line:
+        return
+    if delimiter is None:
+        try:
+            delimiter = csv.Sniffer().sniff(first_line, delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ","
+    rows = csv.reader(itertools.chain([first_line], text), delimiter=delimiter)
+    header = next(rows)
+    index, has_header = csv_column(header, column)
+    if not has_header:
+        rows = itertools.chain([header], rows)
+    for row in rows:
+        if index < len(row) and row[index].strip():
+            yield row[index].strip()
+
+
+class LinkSource:
+    """Ленивый список ссылок для WorkerPool и AsyncCrawler
+
+    Каждый проход заново читает источник: ссылки из links, затем из path
+    (файл или адрес). Повторы и строки, которые не являются ссылками http(s),
+    пропускаются. limit — сколько ссылок отдать (0 = все); exclude — индекс
+    уже обработанных адресов при продолжении запуска; count — число уникальных
+    ссылок, если оно уже известно по scan().
+    """
+
+    def __init__(self, path="", column=None, links=(), limit=0, exclude=None, count=None):
+        self.path = path
+        self.column = column
+        self.links = list(links)
+        self.limit = limit
+        self.exclude = exclude
+        self.count = count
+        self.duplicates = 0
+        self.invalid = 0
+        self.skipped = 0
+
+    def copy(self, limit=0, exclude=None):
+        """Тот же источник с другим лимитом и исключениями; известное число ссылок сохраняется"""
+        return LinkSource(self.path, self.column, self.links, limit, exclude, self.count)
+
+    @property
+    def expected(self):
+        """Сколько ссылок ожидается в проходе (None, пока источник не просмотрен)"""
+        if self.count is None:
+            return None
+        expected = max(0, self.count - self.skipped)
+        return min(expected, self.limit) if self.limit > 0 else expected
+
+    def _raw(self):
+        yield from self.links
+        if self.path:
+            yield from iter_links(self.path, self.column)
+
+    def _unique(self):
+        self.duplicates = self.invalid = 0
+        seen = UrlIndex()
+        unique = 0
+        try:
+            for url in self._raw():
+                key = normalize_url(url)
+                if key is None:
+                    self.invalid += 1
+                    continue
+                if key in seen:
+                    self.duplicates += 1
+                    continue
+                seen.add(key)
+                unique += 1
+                if unique == ON_DISK_INDEX_THRESHOLD:
+                    seen.spill(os.path.join(tempfile.gettempdir(), f"links-{os.getpid()}-{id(self)}.index"))
+                yield url
+            self.count = unique
+        finally:
+            seen.close()
+
+    def __iter__(self):
+        self.skipped = 0
+        given = 0
+        for url in self._unique():
+            if self.exclude is not None and url in self.exclude:
+                self.skipped += 1
+                continue
+            if self.limit > 0 and given >= self.limit:
+                return
+            given += 1
+            yield url
+
+    def scan(self, sample_size=SAMPLE_SIZE):
+        """Один проход по источнику: (число уникальных ссылок, первые sample_size ссылок)"""
+        sample = []
+        count = 0
+        for url in self._unique():
+            if len(sample) < sample_size:
+                sample.append(url)
+            count += 1
+        return count, sample
+
+    def report(self):
+        return f"повторов пропущено: {self.duplicates}, не ссылок: {self.invalid}"
@@ -0,0 +1,129 @@
+"""Кэш страниц на диске для повторных обходов
+
+Для каждого URL хранятся ETag, Last-Modified, хеш содержимого и уже
+извлеченный page_data. Если страница не изменилась (ответ 304 или тот же
+хеш), ее данные берутся из кэша без браузера, кликов и разбора HTML.
+Размер кэша ограничен: давно не использованные записи удаляются первыми.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from checkpoint import url_key
+
+DEFAULT_CACHE_PATH = "page_cache.sqlite"
+DEFAULT_CACHE_SIZE_MB = 200
+
+
+def content_hash(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def job_fingerprint(click_elements, selected_elements, backend=None):
+    """Отпечаток настроек извлечения: данные из кэша годятся только для тех же кликов и полей"""
+    data = json.dumps([click_elements, selected_elements, backend], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class PageResponse:
+    """Сведения об ответе сервера, по которым страница проверяется при следующем обходе"""
+
+    def __init__(self, etag, last_modified, body):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.content_hash = content_hash(body)
+
+
+class CacheEntry:
+    def __init__(self, etag, last_modified, content_hash, page_data):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.page_data = page_data
+
+
+class PageCache:
+    """SQLite-файл с записями по URL и вытеснением по давности использования (LRU)"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_size_mb=DEFAULT_CACHE_SIZE_MB):
+        self.path = path
+        self.max_size = max_size_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "key INTEGER PRIMARY KEY, url TEXT, fingerprint TEXT, etag TEXT, last_modified TEXT,"
+            "content_hash TEXT, page_data TEXT, size INTEGER, last_used REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self.size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, fingerprint):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT url, fingerprint, etag, last_modified, content_hash, page_data FROM pages WHERE key = ?",
+                (url_key(url),)
+            ).fetchone()
+        if row is None or row[0] != url or row[1] != fingerprint:
+            return None
+        return CacheEntry(row[2], row[3], row[4], json.loads(row[5]))
+
+    def put(self, url, fingerprint, response, page_data):
+        data = json.dumps(page_data, ensure_ascii=False)
+        size = len(data.encode('utf-8')) + len(url) + 200
+        with self.lock:
+            old = self.db.execute("SELECT size FROM pages WHERE key = ?", (url_key(url),)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url_key(url), url, fingerprint, response.etag, response.last_modified,
+                 response.content_hash, data, size, time.time())
+            )
+            self.size += size - (old[0] if old else 0)
+            if self.size > self.max_size:
+                self._evict()
+            self.db.commit()
+
+    def touch(self, url):
+        with self.lock:
+            self.db.execute("UPDATE pages SET last_used = ? WHERE key = ?", (time.time(), url_key(url)))
+            self.db.commit()
+
+    def _evict(self):
+        """Удаление давно не использованных записей, пока кэш не уменьшится до 90% лимита"""
+        target = self.max_size * 0.9
+        rows = self.db.execute("SELECT key, size FROM pages ORDER BY last_used")
+        evicted = []
+        for key, size in rows:
+            if self.size <= target:
+                break
+            evicted.append((key,))
+            self.size -= size
+        self.db.executemany("DELETE FROM pages WHERE key = ?", evicted)
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        total = self.hits + self.misses
+        return (f"Кэш страниц: без изменений {self.hits} из {total} ({self.hit_rate():.0%}), "
+                f"размер {self.size / 1024 / 1024:.1f} МБ")
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
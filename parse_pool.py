@@ -0,0 +1,100 @@
+"""Разбор HTML в отдельных процессах, пока браузеры открывают следующие страницы
+
+Браузер только загружает страницу, нажимает кнопки и снимает page_source;
+разбор и извлечение полей выполняются в пуле процессов (на всех ядрах, без
+GIL). Очередь снимков ограничена: если процессы не успевают, браузер ждет
+свободного места, и память не растет.
+"""
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from extraction import create_extractor
+from timing import NULL_TIMER, PageTimer
+
+_extractor = None
+
+
+def _init_process(selected_elements, backend):
+    global _extractor
+    _extractor = create_extractor(selected_elements, backend)
+
+
+def _extract_snapshot(html_content, url):
+    timer = PageTimer(url)
+    page_data = _extractor.extract(html_content, url, timer)
+    return page_data, timer.stages
+
+
+def default_processes():
+    return max(1, (os.cpu_count() or 2) - 1)  # Одно ядро остается браузерам и интерфейсу
+
+
+class ParsePool:
+    """Пул процессов с ограниченной очередью снимков страниц
+
+    max_pending — сколько снимков может ждать разбора одновременно (включая
+    разбираемые); submit блокируется, пока место не освободится.
+    """
+
+    def __init__(self, selected_elements, backend=None, processes=None, max_pending=None):
+        self.processes = processes or default_processes()
+        self.max_pending = max_pending or self.processes * 2
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.idle = threading.Condition()
+        self.pending = 0
+        self.executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_process,
+                                            initargs=(selected_elements, backend))
+        print(f"Разбор страниц в {self.processes} процессах, очередь до {self.max_pending} снимков")
+
+    def submit(self, html_content, url, timer=NULL_TIMER):
+        """Снимок страницы в очередь разбора; Future с page_data
+
+        Время этапов разбора из процесса добавляется в timer до того, как Future завершится.
+        """
+        result = Future()
+        with timer.stage("parse_queue"):
+            self.slots.acquire()
+        with self.idle:
+            self.pending += 1
+        try:
+            future = self.executor.submit(_extract_snapshot, html_content, url)
+        except Exception:
+            self._release()
+            raise
+
+        def done(future):
+            try:
+                page_data, stages = future.result()
+            except Exception as e:
+                result.set_exception(e)
+            else:
+                for name, seconds in stages.items():
+                    timer.add(name, seconds)
+                result.set_result(page_data)
+            finally:
+                self._release()
+
+        future.add_done_callback(done)
+        return result
+
+    def extract(self, html_content, url, timer=NULL_TIMER):
+        """Разбор в пуле с ожиданием результата (для быстрой загрузки без браузера)"""
+        return self.submit(html_content, url, timer).result()
+
+    def _release(self):
+        self.slots.release()
+        with self.idle:
+            self.pending -= 1
+            if not self.pending:
+                self.idle.notify_all()
+
+    def drain(self):
+        """Ожидание разбора всех отправленных снимков (и их обработчиков)"""
+        with self.idle:
+            while self.pending:
+                self.idle.wait()
+
+    def close(self):
+        self.drain()
+        self.executor.shutdown()
@@ -1,29 +1,41 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
-import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
-from selenium.webdriver.common.action_chains import ActionChains
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-    HAS_WEBDRIVER_MANAGER = True
-except ImportError:
-    HAS_WEBDRIVER_MANAGER = False
-import pandas as pd
 import json
 import time
 import threading
 import os
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import logging
-import random
-import re
+
+from browser import (SELECTOR_BUILDER_SCRIPT, AdaptiveWaits, RecyclePolicy, ResourceBlocking, create_driver,
+                     parse_allow_list, quit_driver)
+from crawler import Politeness, WorkerPool, parse_delay, parse_host_delays
+from checkpoint import CheckpointJournal
+from discovery import DEFAULT_MAX_DEPTH, Discovery
+from export import available_formats, export_journal
+from extraction import DEFAULT_BACKEND, available_backends
+from job import save_job
+from link_sources import LinkSource, is_url, link_count
+from page_cache import DEFAULT_CACHE_PATH, DEFAULT_CACHE_SIZE_MB, PageCache
+from timing import DEFAULT_TIMINGS_PATH, TimingRecorder, timing_report
+from profiles import ProfileStore
+from results import ResultStore
+from transforms import build_transforms
+
+# Обработки значения поля в окне «🔧 Обработка»: название → тип из transforms.py
+TRANSFORM_CHOICES = {
+    "нет": None,
+    "число": "number",
+    "цена": "price",
+    "дата": "date",
+    "телефон (E.164)": "phone",
+    "регулярное выражение": "regex",
+}
+RESULTS_PAGE_SIZE = 500  # Строк на странице таблицы результатов
+UI_REFRESH_MS = 500  # Прогресс и таблица обновляются пачкой с этим интервалом
 
 
 class UniversalParser:
@@ -40,13 +52,30 @@ class UniversalParser:
         self.selected_elements = []
         self.click_elements = []  # Элементы для клика (selectors)
         self.links = []
-        self.results = []
+        self.link_source = LinkSource()  # Файл или sitemap со ссылками; читается лениво во время парсинга
+        self.link_sample = []
+        self.resume_index = None  # Индекс обработанных адресов при продолжении, закрывается после парсинга
+        self.results = ResultStore()
         self.is_selecting = False
         self.is_click_selecting = False
+        self.link_selecting = None  # "next" или "detail": выбор селектора для обхода сайта
         self.parsing_in_progress = False
+        # Журнал занят от запуска парсинга до его сжатия после остановки (и во время экспорта):
+        # экспорт читает журнал по смещениям, а compact подменяет файл
+        self.journal_busy = False
+        self.exporting = False
         self.total_links = 0
         self.page_limit = 0  # Лимит страниц
-        self.temp_results_file = 'temp_results.json'
+        self.temp_results_file = 'temp_results.jsonl'
+        self.checkpoint = CheckpointJournal(self.temp_results_file)
+        self.results_loaded = False
+        self.shown_results = None  # Список, строки которого сейчас в таблице
+        self.shown_until = 0  # Индекс в self.results после последней показанной строки
+        self.shown_columns = None
+        self.results_page = 0
+        self.results_follow = True  # Открыта последняя страница: переходить на новые автоматически
+        self.pending_progress = None
+        self.profiles = ProfileStore()
         self.load_temp_results()  # Загрузка временных результатов при запуске
         self.setup_ui()
         self.setup_logging()
@@ -59,21 +88,42 @@ class UniversalParser:
         self.logger = logging.getLogger()
 
     def load_temp_results(self):
-        """Загрузка временных результатов"""
-        if os.path.exists(self.temp_results_file):
-            try:
-                with open(self.temp_results_file, 'r', encoding='utf-8') as f:
-                    self.results = json.load(f)
-                print(f"Загружено {len(self.results)} временных результатов")
-            except Exception as e:
-                print(f"Ошибка загрузки временных результатов: {e}")
-                self.results = []
+        """Подсчет временных результатов; сами записи читаются при первом обращении"""
+        try:
+            legacy_file = 'temp_results.json'
+            if os.path.exists(legacy_file) and not self.checkpoint.exists():
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    legacy_results = json.load(f)
+                self.checkpoint.compact(legacy_results)
+                os.remove(legacy_file)
+                print(f"Временные результаты перенесены в {self.temp_results_file}")
+            self.temp_results_count = self.checkpoint.count()
+            self.results_loaded = self.temp_results_count == 0
+            if self.temp_results_count:
+                print(f"Найдено {self.temp_results_count} временных результатов")
+        except Exception as e:
+            print(f"Ошибка загрузки временных результатов: {e}")
+            self.results = ResultStore()
+            self.results_loaded = True
+
+    def ensure_results_loaded(self):
+        """Чтение временных результатов из журнала, если они еще не загружены"""
+        if self.results_loaded or self.parsing_in_progress:
+            return
+        try:
+            offsets, columns = self.checkpoint.latest_offsets()
+            self.results = ResultStore(columns)
+            self.results.extend(self.checkpoint.read_at(offsets))
+            print(f"Загружено {len(self.results)} временных результатов")
+        except Exception as e:
+            print(f"Ошибка загрузки временных результатов: {e}")
+            self.results = ResultStore()
+        self.results_loaded = True
 
     def save_temp_results(self):
-        """Сохранение результатов после каждой ссылки"""
+        """Принудительная запись журнала результатов на диск"""
         try:
-            with open(self.temp_results_file, 'w', encoding='utf-8') as f:
-                json.dump(self.results, f, ensure_ascii=False, indent=2)
+            self.checkpoint.flush()
             print(f"Сохранено {len(self.results)} результатов")
         except Exception as e:
             print(f"Ошибка сохранения временных результатов: {e}")
@@ -82,33 +132,9 @@ class UniversalParser:
         """Настройка Chrome драйвера с ВИДИМЫМ браузером"""
         try:
             if self.driver:
-                try:
-                    self.driver.quit()
-                except:
-                    pass
-            chrome_options = Options()
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-            chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-            chrome_options.add_argument("--disable-background-timer-throttling")
-            chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-            chrome_options.add_argument("--disable-renderer-backgrounding")
-            chrome_options.add_argument("--window-size=1200,800")
-            chrome_options.add_argument("--start-maximized")
-            if HAS_WEBDRIVER_MANAGER:
-                service = Service(ChromeDriverManager().install())
-            else:
-                service = Service()  # Предполагается, что chromedriver в PATH
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            })
-            print("Браузер запущен с улучшенными настройками")
+                quit_driver(self.driver)
+                self.driver = None
+            self.driver = create_driver()
         except Exception as e:
             error_msg = f"Не удалось запустить браузер: {str(e)}\nЕсли ошибка связана с chromedriver, установите webdriver_manager: pip install webdriver-manager\nИли скачайте chromedriver и добавьте в PATH."
             messagebox.showerror("Ошибка", error_msg)
@@ -128,98 +154,6 @@ class UniversalParser:
         finally:
             self.waiting_for_restart = False
 
-    def angular_click(self, element, description=""):
-        """Клик для AngularJS элементов"""
-        try:
-            angular_ready = self.driver.execute_script("return typeof angular !== 'undefined' && angular.element")
-            if angular_ready:
-                self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-                time.sleep(0.5)
-                self.driver.execute_script("angular.element(arguments[0]).triggerHandler('click');", element)
-                print(f"  ✓ AngularJS triggerHandler клик успешен: {description}")
-                time.sleep(1)
-                return True
-            else:
-                print(f"  ! AngularJS не доступен: {description}")
-                return False
-        except Exception as e:
-            print(f"  ! AngularJS клик не сработал: {e}")
-            return False
-
-    def smart_click(self, element, description=""):
-        """Улучшенный умный клик с поддержкой AngularJS"""
-        try:
-            print(f"  Пытаюсь кликнуть: {description}")
-            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
-            time.sleep(0.5)
-            WebDriverWait(self.driver, 5).until(EC.element_to_be_clickable(element))
-            if self.angular_click(element, description):
-                return True
-            try:
-                element.click()
-                print(f"  ✓ Обычный клик успешен: {description}")
-                return True
-            except ElementClickInterceptedException:
-                pass
-            try:
-                self.driver.execute_script("arguments[0].click();", element)
-                print(f"  ✓ JavaScript клик успешен: {description}")
-                return True
-            except Exception as e:
-                print(f"  ! JavaScript клик не сработал: {e}")
-            try:
-                actions = ActionChains(self.driver)
-                actions.move_to_element(element).pause(0.5).click().perform()
-                print(f"  ✓ ActionChains клик успешен: {description}")
-                return True
-            except Exception as e:
-                print(f"  ! ActionChains клик не сработал: {e}")
-            try:
-                location = element.location_once_scrolled_into_view
-                size = element.size
-                x = location['x'] + size['width'] // 2
-                y = location['y'] + size['height'] // 2
-                self.driver.execute_script(f"window.scrollTo(0, {y - 100});")
-                time.sleep(0.5)
-                self.driver.execute_script(f"document.elementFromPoint({x}, {y}).click();")
-                print(f"  ✓ Клик по координатам успешен: {description}")
-                return True
-            except Exception as e:
-                print(f"  ! Клик по координатам не сработал: {e}")
-            print(f"  ! Все способы клика не сработали: {description}")
-            return False
-        except TimeoutException:
-            print(f"  ! Таймаут ожидания кликабельности: {description}")
-            return False
-        except Exception as e:
-            print(f"  ✗ Ошибка при клике {description}: {e}")
-            return False
-
-    def wait_for_element(self, selector, timeout=10):
-        """Ожидание появления элемента"""
-        try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-            )
-            return element
-        except TimeoutException:
-            print(f"  Элемент не появился: {selector}")
-            return None
-
-    def extract_phone_numbers(self, text):
-        """Извлечение телефонных номеров из текста"""
-        patterns = [
-            r'\+7\s?\(?\d{3}\)?\s?\d{3}[\s-]?\d{2}[\s-]?\d{2}',
-            r'8\s?\(?\d{3}\)?\s?\d{3}[\s-]?\d{2}[\s-]?\d{2}',
-            r'\+7-\d{3}-\d{3}-\d{2}-\d{2}',
-            r'\d{3}[\s-]?\d{2}[\s-]?\d{2}[\s-]?\d{2}',
-        ]
-        phones = []
-        for pattern in patterns:
-            found = re.findall(pattern, text)
-            phones.extend(found)
-        return list(set(phones))
-
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
         # Стиль — сохраняем как атрибут класса
@@ -235,8 +169,14 @@ class UniversalParser:
         self.setup_links_tab(notebook)
         self.setup_selection_tab(notebook)
         self.setup_results_tab(notebook)
+        notebook.bind('<<NotebookTabChanged>>', lambda e: self._on_tab_changed(notebook))
         self.setup_progress_panel()
 
+    def _on_tab_changed(self, notebook):
+        if notebook.index(notebook.select()) == 2 and not self.results_loaded:
+            self.ensure_results_loaded()
+            self._display_results()
+
     def setup_progress_panel(self):
         """Панель прогресса внизу окна"""
         progress_frame = ttk.Frame(self.root, relief=tk.RAISED, borderwidth=1)
@@ -262,6 +202,8 @@ class UniversalParser:
         self.style.configure('green.Horizontal.TProgressbar', background='#27ae60')
 
         self.progress_info_var = tk.StringVar()
+        if not self.results_loaded:
+            self.progress_info_var.set(f"Есть временные результаты прошлого запуска ({self.temp_results_count}) — откройте вкладку «Результаты»")
         info_label = ttk.Label(progress_frame, textvariable=self.progress_info_var, font=('Arial', 9), foreground='#34495e')
         info_label.pack(anchor=tk.W)
 
@@ -270,10 +212,10 @@ class UniversalParser:
         links_frame = ttk.Frame(notebook, padding=10)
         notebook.add(links_frame, text="1. 📎 Загрузка ссылок")
 
-        header = ttk.Label(links_frame, text="Загрузите файл со списком ссылок (каждая ссылка с новой строки)", style='Header.TLabel')
+        header = ttk.Label(links_frame, text="Загрузите список ссылок: txt (по одной в строке), csv, sitemap.xml, можно в gzip", style='Header.TLabel')
         header.pack(pady=10)
 
-        ttk.Label(links_frame, text="Загруженные ссылки:", style='Info.TLabel').pack(pady=5, anchor=tk.W)
+        ttk.Label(links_frame, text="Загруженные ссылки (первые из списка):", style='Info.TLabel').pack(pady=5, anchor=tk.W)
         self.links_text = scrolledtext.ScrolledText(links_frame, height=15, state=tk.DISABLED, wrap=tk.WORD, font=('Consolas', 9))
         self.links_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
@@ -288,17 +230,87 @@ class UniversalParser:
         self.limit_entry = ttk.Entry(settings_inner, textvariable=self.limit_var, width=10, font=('Arial', 10))
         self.limit_entry.pack(side=tk.LEFT, padx=5)
 
-        ttk.Label(settings_inner, text="Перезапуск браузера через (страниц):").pack(side=tk.LEFT, padx=(20,0))
-        self.restart_var = tk.StringVar(value="20")
+        ttk.Label(settings_inner, text="Перезапуск браузера через (страниц, 0 = по памяти):").pack(side=tk.LEFT, padx=(20,0))
+        self.restart_var = tk.StringVar(value="0")
         self.restart_entry = ttk.Entry(settings_inner, textvariable=self.restart_var, width=10, font=('Arial', 10))
         self.restart_entry.pack(side=tk.LEFT, padx=5)
 
+        ttk.Label(settings_inner, text="Браузеров параллельно:").pack(side=tk.LEFT, padx=(20,0))
+        self.workers_var = tk.StringVar(value="1")
+        self.workers_entry = ttk.Entry(settings_inner, textvariable=self.workers_var, width=10, font=('Arial', 10))
+        self.workers_entry.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(settings_inner, text="Движок извлечения:").pack(side=tk.LEFT, padx=(20,0))
+        self.backend_var = tk.StringVar(value=DEFAULT_BACKEND)
+        ttk.Combobox(settings_inner, textvariable=self.backend_var, values=available_backends(),
+                     state='readonly', width=8, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+
+        delays_inner = ttk.Frame(settings_frame)
+        delays_inner.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(delays_inner, text="Пауза между страницами сайта (сек):").pack(side=tk.LEFT)
+        self.delay_var = tk.StringVar(value="1-2")
+        ttk.Entry(delays_inner, textvariable=self.delay_var, width=10, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        ttk.Label(delays_inner, text="Для отдельных сайтов (сайт=мин-макс; ...):").pack(side=tk.LEFT, padx=(20,0))
+        self.host_delays_var = tk.StringVar(value="")
+        ttk.Entry(delays_inner, textvariable=self.host_delays_var, width=40, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+
+        recycle_inner = ttk.Frame(settings_frame)
+        recycle_inner.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(recycle_inner, text="Перезапуск браузера при памяти больше (МБ, 0 = не следить):").pack(side=tk.LEFT)
+        self.max_memory_var = tk.StringVar(value="1500")
+        ttk.Entry(recycle_inner, textvariable=self.max_memory_var, width=10, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        ttk.Label(recycle_inner, text="или замедлении загрузки в (раз):").pack(side=tk.LEFT, padx=(20,0))
+        self.max_slowdown_var = tk.StringVar(value="2")
+        ttk.Entry(recycle_inner, textvariable=self.max_slowdown_var, width=10, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+
+        self.adaptive_waits_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(settings_frame, text="⏱️ Ждать готовности страницы (селекторы найдены, DOM и сеть затихли) вместо фиксированных пауз",
+                        variable=self.adaptive_waits_var).pack(anchor=tk.W, padx=5, pady=(5,0))
+
+        blocking_inner = ttk.Frame(settings_frame)
+        blocking_inner.pack(fill=tk.X, padx=5, pady=(5,0))
+        self.block_resources_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(blocking_inner, text="🚫 Не загружать картинки, шрифты, видео и счетчики",
+                        variable=self.block_resources_var).pack(side=tk.LEFT)
+        ttk.Label(blocking_inner, text="Разрешить (категории, хосты или адреса через запятую):").pack(side=tk.LEFT, padx=(20,0))
+        self.allow_resources_var = tk.StringVar(value="")
+        ttk.Entry(blocking_inner, textvariable=self.allow_resources_var, width=30, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="↻ Продолжить прошлый запуск (пропускать уже обработанные ссылки, повторять ссылки с ошибкой)",
+                        variable=self.resume_var).pack(anchor=tk.W, padx=5, pady=(5,0))
+
+        self.static_fetch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="⚡ Загружать без браузера, если нет кнопок для клика (проверяется на первой ссылке)",
+                        variable=self.static_fetch_var).pack(anchor=tk.W, padx=5, pady=(5,0))
+
+        parse_inner = ttk.Frame(settings_frame)
+        parse_inner.pack(fill=tk.X, padx=5, pady=(5,0))
+        ttk.Label(parse_inner, text="🧮 Процессов для разбора HTML, пока браузеры открывают следующие страницы (0 = разбирать в потоке браузера):").pack(side=tk.LEFT)
+        self.parse_processes_var = tk.StringVar(value="0")
+        ttk.Entry(parse_inner, textvariable=self.parse_processes_var, width=10, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+
+        cache_inner = ttk.Frame(settings_frame)
+        cache_inner.pack(fill=tk.X, padx=5, pady=(5,0))
+        self.page_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(cache_inner, text="🗄️ Кэш страниц: не открывать в браузере страницы, которые не изменились с прошлого обхода",
+                        variable=self.page_cache_var).pack(side=tk.LEFT)
+        ttk.Label(cache_inner, text="Размер кэша (МБ):").pack(side=tk.LEFT, padx=(20,0))
+        self.cache_size_var = tk.StringVar(value=str(DEFAULT_CACHE_SIZE_MB))
+        ttk.Entry(cache_inner, textvariable=self.cache_size_var, width=10, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+
+        self.timings_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text=f"⏱️ Замеры времени по этапам страницы ({DEFAULT_TIMINGS_PATH}, отчет p50/p95 в консоли)",
+                        variable=self.timings_var).pack(anchor=tk.W, padx=5, pady=(5,0))
+
         button_frame = ttk.Frame(links_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=10)
         ttk.Button(button_frame, text="📁 Загрузить из файла", command=self.load_links_from_file, style='Accent.TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="🌐 Sitemap по адресу", command=self.load_links_from_url, style='Click.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="🗑️ Очистить список", command=self.clear_links, style='Stop.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="💾 Сохранить ссылки", command=self.save_links, style='Click.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="🔄 Перезапустить браузер", command=self.restart_driver, style='Click.TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="📝 Сохранить задание", command=self.save_job_file, style='Click.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="➡️ Далее", command=lambda: notebook.select(1), style='Accent.TButton').pack(side=tk.RIGHT, padx=5)
 
     def setup_selection_tab(self, notebook):
@@ -350,6 +362,17 @@ class UniversalParser:
         right_frame = ttk.Frame(content_frame)
         right_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5)
 
+        profile_frame = ttk.LabelFrame(right_frame, text="📁 Профиль сайта", padding=5)
+        profile_frame.pack(fill=tk.X, pady=5)
+        self.profile_var = tk.StringVar()
+        self.profile_combo = ttk.Combobox(profile_frame, textvariable=self.profile_var, values=self.profiles.names(), font=('Arial', 10))
+        self.profile_combo.pack(fill=tk.X, padx=5, pady=5)
+        profile_btn_frame = ttk.Frame(profile_frame)
+        profile_btn_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(profile_btn_frame, text="📂 Загрузить", command=self.load_profile, style='Accent.TButton').pack(side=tk.LEFT)
+        ttk.Button(profile_btn_frame, text="💾 Сохранить", command=self.save_profile, style='Click.TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_btn_frame, text="❌ Удалить", command=self.delete_profile, style='Stop.TButton').pack(side=tk.RIGHT)
+
         click_frame = ttk.LabelFrame(right_frame, text="🖱️ Элементы для клика", padding=5)
         click_frame.pack(fill=tk.X, pady=5)
         self.click_listbox = tk.Listbox(click_frame, height=6, font=('Consolas', 9))
@@ -359,6 +382,30 @@ class UniversalParser:
         ttk.Button(click_btn_frame, text="❌ Удалить", command=self.remove_click_element, style='Stop.TButton').pack(side=tk.LEFT)
         ttk.Button(click_btn_frame, text="🗑️ Очистить", command=self.clear_click_elements, style='Stop.TButton').pack(side=tk.RIGHT)
 
+        discovery_frame = ttk.LabelFrame(right_frame, text="🧭 Обход сайта", padding=5)
+        discovery_frame.pack(fill=tk.X, pady=5)
+        self.discover_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(discovery_frame, text="Ссылки — стартовые страницы списков, остальное найти по ссылкам",
+                        variable=self.discover_var).pack(anchor=tk.W, padx=5)
+        next_frame = ttk.Frame(discovery_frame)
+        next_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Button(next_frame, text="➡️ Следующая страница", width=22,
+                   command=lambda: self.toggle_link_selection("next"), style='Click.TButton').pack(side=tk.LEFT)
+        self.next_page_var = tk.StringVar(value="")
+        ttk.Entry(next_frame, textvariable=self.next_page_var, font=('Consolas', 9)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        detail_frame = ttk.Frame(discovery_frame)
+        detail_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Button(detail_frame, text="🔗 Ссылка на карточку", width=22,
+                   command=lambda: self.toggle_link_selection("detail"), style='Click.TButton').pack(side=tk.LEFT)
+        self.detail_link_var = tk.StringVar(value="")
+        ttk.Entry(detail_frame, textvariable=self.detail_link_var, font=('Consolas', 9)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        depth_frame = ttk.Frame(discovery_frame)
+        depth_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Label(depth_frame, text="Глубина (страниц списка, 0 = без ограничения):").pack(side=tk.LEFT)
+        self.max_depth_var = tk.StringVar(value=str(DEFAULT_MAX_DEPTH))
+        ttk.Entry(depth_frame, textvariable=self.max_depth_var, width=6, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(depth_frame, text="🗑️ Очистить", command=self.clear_link_selectors, style='Stop.TButton').pack(side=tk.RIGHT)
+
         parse_frame = ttk.LabelFrame(right_frame, text="📊 Элементы для парсинга", padding=5)
         parse_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         self.parse_listbox = tk.Listbox(parse_frame, height=10, font=('Consolas', 9))
@@ -366,6 +413,7 @@ class UniversalParser:
         parse_btn_frame = ttk.Frame(parse_frame)
         parse_btn_frame.pack(fill=tk.X, padx=5, pady=5)
         ttk.Button(parse_btn_frame, text="❌ Удалить", command=self.remove_parse_element, style='Stop.TButton').pack(side=tk.LEFT)
+        ttk.Button(parse_btn_frame, text="🔧 Обработка", command=self.edit_field_processing, style='Click.TButton').pack(side=tk.LEFT, padx=5)
         ttk.Button(parse_btn_frame, text="🗑️ Очистить", command=self.clear_parse_elements, style='Stop.TButton').pack(side=tk.RIGHT)
 
         self.start_parsing_btn = ttk.Button(right_frame, text="🚀 НАЧАТЬ ПАРСИНГ", 
@@ -394,30 +442,46 @@ class UniversalParser:
         tree_scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
         tree_scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
 
+        pages_frame = ttk.Frame(results_frame)
+        pages_frame.pack(fill=tk.X, pady=(5,0))
+        ttk.Button(pages_frame, text="◀", width=3, command=lambda: self._show_results_page(self.results_page - 1)).pack(side=tk.LEFT)
+        self.results_page_var = tk.StringVar(value="")
+        ttk.Label(pages_frame, textvariable=self.results_page_var).pack(side=tk.LEFT, padx=10)
+        ttk.Button(pages_frame, text="▶", width=3, command=lambda: self._show_results_page(self.results_page + 1)).pack(side=tk.LEFT)
+
         export_frame = ttk.Frame(results_frame)
         export_frame.pack(fill=tk.X, pady=10)
-        ttk.Button(export_frame, text="📊 Экспорт в Excel", command=self.export_excel, style='Accent.TButton').pack(side=tk.LEFT, padx=5)
-        ttk.Button(export_frame, text="📄 Экспорт в JSON", command=self.export_json, style='Click.TButton').pack(side=tk.LEFT, padx=5)
+        self.journal_buttons = [
+            ttk.Button(export_frame, text="📊 Экспорт в Excel", command=self.export_excel, style='Accent.TButton'),
+            ttk.Button(export_frame, text="📄 Экспорт в JSON", command=self.export_json, style='Click.TButton'),
+            ttk.Button(export_frame, text="📑 CSV / JSONL / Parquet", command=self.export_other, style='Click.TButton'),
+        ]
+        for button in self.journal_buttons:
+            button.pack(side=tk.LEFT, padx=5)
         ttk.Button(export_frame, text="💾 Сохранить временные результаты", command=self.save_temp_results, style='Click.TButton').pack(side=tk.LEFT, padx=5)
-        ttk.Button(export_frame, text="🧹 Очистить", command=self.clear_results, style='Stop.TButton').pack(side=tk.RIGHT, padx=5)
-
-        if self.results:
-            self._display_results()
+        clear_button = ttk.Button(export_frame, text="🧹 Очистить", command=self.clear_results, style='Stop.TButton')
+        clear_button.pack(side=tk.RIGHT, padx=5)
+        self.journal_buttons.append(clear_button)
 
-    def update_progress(self, current, total, status=""):
+    def update_progress(self, current, total, status="", worker_stats=None):
         """Обновление прогресса"""
         try:
             if total > 0:
                 progress_percent = (current / total) * 100
                 self.progress_var.set(progress_percent)
             self.status_var.set(f"Обработано: {current}/{total} {status}")
+            workers_info = ""
+            if worker_stats:
+                workers_info = " | " + "  ".join(
+                    f"{w['worker']}: {w['pages_per_minute']:.1f} стр/мин ({w['processed']}, ош. {w['errors']}, перезап. {w['restarts']}"
+                    + (f", {w['memory_mb']:.0f} МБ)" if w.get('memory_mb') else ")")
+                    for w in worker_stats
+                )
             if current == total:
-                self.progress_info_var.set("Завершено! ✅")
+                self.progress_info_var.set("Завершено! ✅" + workers_info)
             else:
                 remaining = total - current
-                self.progress_info_var.set(f"Осталось: {remaining} страниц | {status}")
-            self.root.update_idletasks()
-            self.root.update()
+                self.progress_info_var.set(f"Осталось: {remaining} страниц | {status}{workers_info}")
         except Exception as e:
             print(f"Ошибка обновления прогресса: {e}")
 
@@ -425,7 +489,7 @@ class UniversalParser:
         if not self.driver:
             messagebox.showwarning("Предупреждение", "Сначала загрузите страницу")
             return
-        if self.is_click_selecting:
+        if self.is_click_selecting or self.link_selecting:
             messagebox.showwarning("Предупреждение", "Сначала завершите выбор элементов для клика")
             return
         self.is_selecting = not self.is_selecting
@@ -443,7 +507,7 @@ class UniversalParser:
         if not self.driver:
             messagebox.showwarning("Предупреждение", "Сначала загрузите страницу")
             return
-        if self.is_selecting:
+        if self.is_selecting or self.link_selecting:
             messagebox.showwarning("Предупреждение", "Сначала завершите выбор элементов для парсинга")
             return
         self.is_click_selecting = not self.is_click_selecting
@@ -457,9 +521,31 @@ class UniversalParser:
             self.selection_status.config(text="Режим: ВЫКЛ", foreground="red")
             self.disable_element_selection()
 
+    def toggle_link_selection(self, mode):
+        """Выбор ссылки для обхода сайта: mode "next" — следующая страница, "detail" — карточка"""
+        if not self.driver:
+            messagebox.showwarning("Предупреждение", "Сначала загрузите страницу")
+            return
+        if self.is_selecting or self.is_click_selecting:
+            messagebox.showwarning("Предупреждение", "Сначала завершите выбор элементов")
+            return
+        if self.link_selecting:
+            self.selection_status.config(text="Режим: ВЫКЛ", foreground="red")
+            self.disable_element_selection()
+            return
+        self.link_selecting = mode
+        if mode == "next":
+            self.selection_status.config(text="Режим: СЛЕДУЮЩАЯ СТРАНИЦА", foreground="purple")
+            messagebox.showinfo("Обход сайта", "Кликните на ссылку или кнопку перехода на следующую страницу списка")
+        else:
+            self.selection_status.config(text="Режим: ССЫЛКА НА КАРТОЧКУ", foreground="purple")
+            messagebox.showinfo("Обход сайта", "Кликните на ссылку на одну из карточек списка\n"
+                                               "Селектор подбирается так, чтобы совпасть со всеми карточками")
+        self.setup_element_selection(mode)
+
     def setup_element_selection(self, mode):
         try:
-            script = """
+            script = SELECTOR_BUILDER_SCRIPT + """
             if (window.parserHandlers) {
                 document.removeEventListener('mouseover', window.parserHandlers.mouseOver);
                 document.removeEventListener('mouseout', window.parserHandlers.mouseOut);
@@ -498,16 +584,10 @@ class UniversalParser:
                             text: element.textContent.trim().substring(0, 100),
                             html: element.outerHTML.substring(0, 200)
                         };
-                        var selector = element.tagName.toLowerCase();
-                        if (element.id) {
-                            selector = '#' + element.id;
-                        } else if (element.className) {
-                            var classes = element.className.split(' ')
-                                .filter(function(c) { return c.trim(); })
-                                .join('.');
-                            if (classes) selector = '.' + classes;
-                        }
-                        info.selector = selector;
+                        var built = window.__parserBuildSelectors(element, window.parserMode === 'detail');
+                        info.selector = built.selector;
+                        info.matches = built.matches;
+                        info.alternatives = built.alternatives;
                         info.mode = window.parserMode;
                         window.parserLastSelected = info;
                         return false;
@@ -526,7 +606,7 @@ class UniversalParser:
             messagebox.showerror("Ошибка", f"Не удалось настроить выбор элементов: {str(e)}")
 
     def _check_selected_elements(self):
-        while self.is_selecting or self.is_click_selecting:
+        while self.is_selecting or self.is_click_selecting or self.link_selecting:
             try:
                 selected_info = self.driver.execute_script("return window.parserLastSelected;")
                 if selected_info:
@@ -540,24 +620,34 @@ class UniversalParser:
         selector = element_info['selector']
         text_preview = element_info['text']
         mode = element_info['mode']
+        if mode in ("next", "detail"):
+            self._set_link_selector(mode, selector, element_info.get('matches', 1))
+            return
         base_name = element_info['tag']
         if element_info['id']:
             base_name = element_info['id']
         elif element_info['classes']:
             base_name = element_info['classes'].split(' ')[0]
+        alternatives = element_info.get('alternatives') or []
+        matches = element_info.get('matches', 1)
         name = simpledialog.askstring(
             "Название поля", 
-            f"Введите название для этого элемента ({'клик' if mode == 'click' else 'данные'}):\nСелектор: {selector}\nТекст: {text_preview}",
+            f"Введите название для этого элемента ({'клик' if mode == 'click' else 'данные'}):\nСелектор: {selector}"
+            f"{'' if matches == 1 else f' (совпадений на странице: {matches})'}\n"
+            f"Запасных селекторов: {len(alternatives)}\nТекст: {text_preview}",
             initialvalue=base_name
         )
         if name:
+            element = {"name": name, "selector": selector}
+            if alternatives:
+                element["alternatives"] = alternatives
             if mode == "click":
-                self.click_elements.append({"name": name, "selector": selector})
+                self.click_elements.append(element)
                 self.click_listbox.insert(tk.END, f"{name}: {selector}")
                 messagebox.showinfo("Успех", f"Добавлен элемент для клика: {name}")
             else:
-                self.selected_elements.append({"name": name, "selector": selector})
-                self.parse_listbox.insert(tk.END, f"{name}: {selector}")
+                self.selected_elements.append(element)
+                self.parse_listbox.insert(tk.END, self._parse_element_label(element))
                 messagebox.showinfo("Успех", f"Добавлен элемент для парсинга: {name}")
 
     def disable_element_selection(self):
@@ -573,9 +663,27 @@ class UniversalParser:
             """)
             self.is_selecting = False
             self.is_click_selecting = False
+            self.link_selecting = None
         except Exception as e:
             print(f"Ошибка при отключении выбора: {e}")
 
+    def _set_link_selector(self, mode, selector, matches):
+        """Селектор ссылки для обхода сайта; выбор завершается после одного клика"""
+        self.selection_status.config(text="Режим: ВЫКЛ", foreground="red")
+        self.disable_element_selection()
+        self.discover_var.set(True)
+        if mode == "next":
+            self.next_page_var.set(selector)
+            messagebox.showinfo("Успех", f"Селектор следующей страницы: {selector}")
+        else:
+            self.detail_link_var.set(selector)
+            messagebox.showinfo("Успех", f"Селектор ссылок на карточки: {selector}\nСовпадений на странице: {matches}")
+
+    def clear_link_selectors(self):
+        self.next_page_var.set("")
+        self.detail_link_var.set("")
+        self.discover_var.set(False)
+
     def remove_click_element(self):
         selection = self.click_listbox.curselection()
         if selection:
@@ -590,6 +698,78 @@ class UniversalParser:
             self.parse_listbox.delete(index)
             self.selected_elements.pop(index)
 
+    def edit_field_processing(self):
+        """Окно обработки поля: атрибут вместо текста и преобразование значения (число, дата, телефон...)"""
+        selection = self.parse_listbox.curselection()
+        if not selection:
+            messagebox.showwarning("Предупреждение", "Выберите поле в списке элементов для парсинга")
+            return
+        index = selection[0]
+        element = self.selected_elements[index]
+        transforms = element.get("transforms") or [{}]
+        current = transforms[0] if isinstance(transforms[0], dict) else {"type": transforms[0]}
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Обработка поля: {element['name']}")
+        dialog.transient(self.root)
+        frame = ttk.Frame(dialog, padding=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text="Значение:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        attribute_var = tk.StringVar(value=element.get("attribute") or "текст")
+        ttk.Combobox(frame, textvariable=attribute_var, values=["текст", "href", "src"], width=30).grid(row=0, column=1, pady=2)
+        ttk.Label(frame, text="Обработка:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        transform_names = {kind: name for name, kind in TRANSFORM_CHOICES.items()}
+        transform_var = tk.StringVar(value=transform_names.get(current.get("type"), "нет"))
+        ttk.Combobox(frame, textvariable=transform_var, values=list(TRANSFORM_CHOICES), state="readonly", width=30).grid(row=1, column=1, pady=2)
+        ttk.Label(frame, text="Формат даты или выражение:").grid(row=2, column=0, sticky=tk.W, pady=2)
+        parameter_var = tk.StringVar(value=current.get("pattern") or current.get("format") or "")
+        ttk.Entry(frame, textvariable=parameter_var, width=32).grid(row=2, column=1, pady=2)
+        ttk.Label(frame, text="Например: %d.%m.%Y или Арт\\. (\\d+)", style='Info.TLabel').grid(row=3, column=1, sticky=tk.W)
+        if len(transforms) > 1:
+            ttk.Label(frame, text=f"! Обработок в профиле: {len(transforms)}, будут заменены одной", style='Info.TLabel').grid(row=4, column=0, columnspan=2, sticky=tk.W)
+
+        def apply():
+            kind = TRANSFORM_CHOICES[transform_var.get()]
+            parameter = parameter_var.get().strip()
+            specs = []
+            if kind == "regex":
+                specs.append({"type": kind, "pattern": parameter})
+            elif kind == "date" and parameter:
+                specs.append({"type": kind, "format": parameter})
+            elif kind:
+                specs.append({"type": kind})
+            try:
+                build_transforms(specs)
+            except ValueError as e:
+                messagebox.showerror("Ошибка", str(e), parent=dialog)
+                return
+            attribute = attribute_var.get().strip()
+            element.pop("attribute", None)
+            element.pop("transforms", None)
+            if attribute and attribute != "текст":
+                element["attribute"] = attribute
+            if specs:
+                element["transforms"] = specs
+            self.parse_listbox.delete(index)
+            self.parse_listbox.insert(index, self._parse_element_label(element))
+            dialog.destroy()
+
+        btn_frame = ttk.Frame(frame)
+        btn_frame.grid(row=5, column=0, columnspan=2, pady=(10,0))
+        ttk.Button(btn_frame, text="✅ Применить", command=apply, style='Accent.TButton').pack(side=tk.LEFT, padx=5)
+        ttk.Button(btn_frame, text="Отмена", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        dialog.grab_set()
+
+    @staticmethod
+    def _parse_element_label(element):
+        label = f"{element['name']}: {element['selector']}"
+        if element.get("attribute"):
+            label += f" @{element['attribute']}"
+        transforms = [spec if isinstance(spec, str) else spec.get("type") for spec in element.get("transforms") or []]
+        if transforms:
+            label += f" → {', '.join(transforms)}"
+        return label
+
     def clear_click_elements(self):
         self.click_listbox.delete(0, tk.END)
         self.click_elements.clear()
@@ -598,23 +778,121 @@ class UniversalParser:
         self.parse_listbox.delete(0, tk.END)
         self.selected_elements.clear()
 
+    def _show_elements(self):
+        self.click_listbox.delete(0, tk.END)
+        for element in self.click_elements:
+            self.click_listbox.insert(tk.END, f"{element['name']}: {element['selector']}")
+        self.parse_listbox.delete(0, tk.END)
+        for element in self.selected_elements:
+            self.parse_listbox.insert(tk.END, self._parse_element_label(element))
+
+    def save_profile(self):
+        name = self.profile_var.get().strip()
+        if not name:
+            preview = self.preview_url.get().strip()
+            name = urlparse(preview).hostname if preview else ""
+            self.profile_var.set(name or "")
+        if not self.click_elements and not self.selected_elements:
+            messagebox.showwarning("Предупреждение", "Не выбраны элементы для сохранения")
+            return
+        try:
+            settings = self.job_settings()
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите корректные числовые значения в настройки")
+            return
+        for key in ("links", "links_file", "links_column", "click_elements", "selected_elements"):
+            settings.pop(key)
+        try:
+            profile = self.profiles.save(name, self.click_elements, self.selected_elements, settings)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Профиль не сохранен:\n{str(e)}")
+            return
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить профиль: {str(e)}")
+            return
+        self.click_elements = profile["click_elements"]
+        self.selected_elements = profile["selected_elements"]
+        self._show_elements()
+        self.profile_combo.config(values=self.profiles.names())
+        messagebox.showinfo("Успех", f"Профиль «{name}» сохранен")
+
+    def load_profile(self):
+        name = self.profile_var.get().strip()
+        if not name:
+            messagebox.showwarning("Предупреждение", "Выберите профиль")
+            return
+        try:
+            profile = self.profiles.load(name)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить профиль: {str(e)}")
+            return
+        self.click_elements = profile.get("click_elements", [])
+        self.selected_elements = profile.get("selected_elements", [])
+        self._show_elements()
+        self.apply_job_settings(profile.get("settings", {}))
+        self.status_var.set(f"Загружен профиль «{name}»: {len(self.click_elements)} кликов, {len(self.selected_elements)} полей")
+
+    def delete_profile(self):
+        name = self.profile_var.get().strip()
+        if name and messagebox.askyesno("Подтверждение", f"Удалить профиль «{name}»?"):
+            self.profiles.delete(name)
+            self.profile_var.set("")
+            self.profile_combo.config(values=self.profiles.names())
+
     def load_links_from_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        file_path = filedialog.askopenfilename(filetypes=[("Ссылки: txt, csv, sitemap, gzip", "*.txt *.csv *.tsv *.xml *.gz"),
+                                                          ("Text files", "*.txt"), ("All files", "*.*")])
         if file_path:
+            column = None
+            if file_path.lower().endswith((".csv", ".tsv", ".csv.gz", ".tsv.gz")):
+                column = simpledialog.askstring("Колонка со ссылками",
+                                                "Название или номер колонки со ссылками\n(пусто — найти автоматически):")
+                if column is None:
+                    return
+            self._scan_links(LinkSource(file_path, column.strip() if column else None))
+
+    def load_links_from_url(self):
+        url = simpledialog.askstring("Sitemap по адресу", "Адрес sitemap.xml, индекса sitemap или файла со ссылками:")
+        if url is None:
+            return
+        url = url.strip()
+        if not is_url(url):
+            messagebox.showwarning("Предупреждение", "Введите адрес, начинающийся с http:// или https://")
+            return
+        self._scan_links(LinkSource(url))
+
+    def _scan_links(self, source):
+        """Подсчет ссылок и пример из начала списка в фоне: сами ссылки в окне не хранятся"""
+        self.status_var.set("Чтение ссылок...")
+
+        def scan():
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    links = file.readlines()
-                self.links_text.config(state=tk.NORMAL)
-                self.links_text.delete(1.0, tk.END)
-                for link in links:
-                    if link.strip():
-                        self.links_text.insert(tk.END, link.strip() + '\n')
-                self.links_text.config(state=tk.DISABLED)
-                messagebox.showinfo("Успех", f"Загружено {len([l for l in links if l.strip()])} ссылок")
+                count, sample = source.scan()
             except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось загрузить файл: {str(e)}")
+                error = str(e)
+                self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Не удалось загрузить ссылки: {error}"))
+                self.root.after(0, lambda: self.status_var.set("Ошибка загрузки ссылок"))
+                return
+            self.root.after(0, self._show_link_source, source, count, sample)
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def _show_link_source(self, source, count, sample):
+        self.link_source = source
+        self.link_sample = sample
+        self.links_text.config(state=tk.NORMAL)
+        self.links_text.delete(1.0, tk.END)
+        for link in sample:
+            self.links_text.insert(tk.END, link + '\n')
+        if count > len(sample):
+            self.links_text.insert(tk.END, f"... и еще {count - len(sample)} ссылок\n")
+        self.links_text.config(state=tk.DISABLED)
+        self.status_var.set(f"Загружено {count} ссылок")
+        messagebox.showinfo("Успех", f"Загружено {count} ссылок\n({source.report()})")
 
     def clear_links(self):
+        self.link_source = LinkSource()
+        self.link_sample = []
         self.links_text.config(state=tk.NORMAL)
         self.links_text.delete(1.0, tk.END)
         self.links_text.config(state=tk.DISABLED)
@@ -623,26 +901,109 @@ class UniversalParser:
         self.preview_url.config(state='readonly')
 
     def save_links(self):
-        links_text = self.links_text.get(1.0, tk.END).strip()
-        if not links_text:
+        if not self.link_sample:
             messagebox.showwarning("Предупреждение", "Нет ссылок для сохранения")
             return
         file_path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Text files", "*.txt")])
+        if file_path:
+            source = self.link_source.copy()
+
+            def save():
+                # Источник читается заново потоком, без повторов: большой список не попадает в память
+                try:
+                    with open(file_path, 'w', encoding='utf-8') as file:
+                        for link in source:
+                            file.write(link + '\n')
+                    self.root.after(0, lambda: messagebox.showinfo("Успех", "Ссылки сохранены"))
+                except Exception as e:
+                    error = str(e)
+                    self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {error}"))
+
+            threading.Thread(target=save, daemon=True).start()
+
+    def job_settings(self):
+        """Ссылки, выбранные элементы и настройки окна в виде задания для job.py"""
+        return {
+            "links": list(self.link_source.links),
+            "links_file": self.link_source.path,
+            "links_column": self.link_source.column or "",
+            "click_elements": list(self.click_elements),
+            "selected_elements": list(self.selected_elements),
+            "limit": int(self.limit_var.get() or 0),
+            "concurrency": max(1, int(self.workers_var.get() or 1)),
+            "delay": self.delay_var.get(),
+            "host_delays": self.host_delays_var.get(),
+            "restart": int(self.restart_var.get() or 0),
+            "max_memory": int(self.max_memory_var.get() or 0),
+            "max_slowdown": float(self.max_slowdown_var.get() or 0),
+            "adaptive_waits": self.adaptive_waits_var.get(),
+            "block_resources": self.block_resources_var.get(),
+            "allow": self.allow_resources_var.get(),
+            "static_fetch": self.static_fetch_var.get(),
+            "page_cache": DEFAULT_CACHE_PATH if self.page_cache_var.get() else "",
+            "cache_size_mb": int(self.cache_size_var.get() or 0),
+            "timings": DEFAULT_TIMINGS_PATH if self.timings_var.get() else "",
+            "parse_processes": max(0, int(self.parse_processes_var.get() or 0)),
+            "discover": self.discover_var.get(),
+            "next_page_selector": self.next_page_var.get().strip(),
+            "detail_link_selector": self.detail_link_var.get().strip(),
+            "max_depth": max(0, int(self.max_depth_var.get() or 0)),
+            "backend": self.backend_var.get(),
+        }
+
+    def apply_job_settings(self, settings):
+        """Настройки из профиля или задания в поля окна"""
+        variables = {
+            "limit": self.limit_var,
+            "concurrency": self.workers_var,
+            "delay": self.delay_var,
+            "host_delays": self.host_delays_var,
+            "restart": self.restart_var,
+            "max_memory": self.max_memory_var,
+            "max_slowdown": self.max_slowdown_var,
+            "adaptive_waits": self.adaptive_waits_var,
+            "block_resources": self.block_resources_var,
+            "allow": self.allow_resources_var,
+            "static_fetch": self.static_fetch_var,
+            "cache_size_mb": self.cache_size_var,
+            "parse_processes": self.parse_processes_var,
+            "discover": self.discover_var,
+            "next_page_selector": self.next_page_var,
+            "detail_link_selector": self.detail_link_var,
+            "max_depth": self.max_depth_var,
+        }
+        for key, variable in variables.items():
+            if key in settings:
+                variable.set(settings[key])
+        if "page_cache" in settings:
+            self.page_cache_var.set(bool(settings["page_cache"]))
+        if "timings" in settings:
+            self.timings_var.set(bool(settings["timings"]))
+        if settings.get("backend") in available_backends():
+            self.backend_var.set(settings["backend"])
+
+    def save_job_file(self):
+        if not self.selected_elements:
+            messagebox.showwarning("Предупреждение", "Не выбраны элементы для парсинга")
+            return
+        try:
+            job = self.job_settings()
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите корректные числовые значения в настройки")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    file.write(links_text)
-                messagebox.showinfo("Успех", "Ссылки сохранены")
+                save_job(file_path, job)
+                messagebox.showinfo("Успех", f"Задание сохранено. Запуск без интерфейса:\npython job.py {os.path.basename(file_path)}")
             except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {str(e)}")
+                messagebox.showerror("Ошибка", f"Не удалось сохранить задание: {str(e)}")
 
     def load_first_link(self):
-        links_text = self.links_text.get(1.0, tk.END).strip()
-        links = [link.strip() for link in links_text.split('\n') if link.strip()]
-        if not links:
+        if not self.link_sample:
             messagebox.showwarning("Предупреждение", "Сначала загрузите файл со ссылками")
             return
-        first_link = links[0]
+        first_link = self.link_sample[0]
         self.preview_url.config(state=tk.NORMAL)
         self.preview_url.delete(0, tk.END)
         self.preview_url.insert(0, first_link)
@@ -679,9 +1040,7 @@ class UniversalParser:
             self.root.after(0, lambda: self.page_info.config(text="Ошибка загрузки страницы"))
 
     def start_parsing(self):
-        links_text = self.links_text.get(1.0, tk.END).strip()
-        self.links = [link.strip() for link in links_text.split('\n') if link.strip()]
-        if not self.links:
+        if not self.link_sample:
             messagebox.showwarning("Предупреждение", "Нет ссылок для парсинга")
             return
         if not self.selected_elements:
@@ -690,25 +1049,87 @@ class UniversalParser:
         if not self.driver:
             messagebox.showerror("Ошибка", "Браузер не запущен. Перезапустите приложение.")
             return
+        if self.exporting:
+            messagebox.showwarning("Предупреждение", "Дождитесь окончания экспорта")
+            return
         try:
             page_limit = int(self.limit_var.get() or 0)
             restart_interval = int(self.restart_var.get() or 0)
+            workers = max(1, int(self.workers_var.get() or 1))
+            politeness = Politeness(parse_delay(self.delay_var.get() or 0), parse_host_delays(self.host_delays_var.get()))
+            recycle_policy = RecyclePolicy(max_rss_mb=int(self.max_memory_var.get() or 0),
+                                           max_latency_ratio=float(self.max_slowdown_var.get() or 0))
+            cache_size = int(self.cache_size_var.get() or 0)
+            parse_processes = max(0, int(self.parse_processes_var.get() or 0))
+            max_depth = max(0, int(self.max_depth_var.get() or 0))
         except ValueError:
             messagebox.showerror("Ошибка", "Введите корректные числовые значения в настройки")
             return
-        if page_limit > 0:
-            self.links = self.links[:page_limit]
-        self.results = []
-        if os.path.exists(self.temp_results_file):
-            os.remove(self.temp_results_file)
+        discovery = None
+        if self.discover_var.get():
+            try:
+                # Лимит относится к найденным страницам с данными, а не к стартовым
+                discovery = Discovery(self.next_page_var.get(), self.detail_link_var.get(), max_depth, page_limit)
+            except ValueError as e:
+                messagebox.showerror("Ошибка", f"Обход сайта: {str(e)}")
+                return
+        # Ссылки читаются из источника по мере работы браузеров
+        self.links = self.link_source.copy(limit=0 if discovery else page_limit)
+        if self.resume_var.get() and self.checkpoint.exists():
+            if not self._prepare_resume(discovery):
+                return
+        else:
+            self.results = ResultStore.for_elements(self.selected_elements)
+            self.checkpoint.clear()
+        page_cache = None
+        if self.page_cache_var.get():
+            try:
+                page_cache = PageCache(DEFAULT_CACHE_PATH, cache_size)
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось открыть кэш страниц: {str(e)}")
+                self._close_resume_index()
+                return
+        timings = TimingRecorder(DEFAULT_TIMINGS_PATH) if self.timings_var.get() else None
+        self.results_loaded = True
         self.parsing_in_progress = True
+        self._set_journal_busy(True)
         self.start_parsing_btn.config(state=tk.DISABLED)
         self.stop_parsing_btn.config(state=tk.NORMAL)
-        self.total_links = len(self.links)
+        self.total_links = link_count(self.links)
         self.status_var.set("Начало парсинга...")
         self.progress_var.set(0)
         self.progress_info_var.set("Начинаем...")
-        threading.Thread(target=self._parse_all_links, args=(restart_interval,), daemon=True).start()
+        self.pending_progress = None
+        self.root.after(UI_REFRESH_MS, self._refresh_ui)
+        threading.Thread(target=self._parse_all_links, args=(restart_interval, workers, politeness, recycle_policy, page_cache, timings, parse_processes, discovery), daemon=True).start()
+
+    def _prepare_resume(self, discovery=None):
+        """Пропуск уже обработанных ссылок; ссылки с ошибкой обрабатываются повторно
+
+        Индекс обработанных адресов проверяется при чтении источника ссылок, а при
+        обходе сайта — при добавлении найденных страниц; закрывается после парсинга.
+        """
+        try:
+            self.resume_index = self.checkpoint.completed_index()
+            if discovery is not None:
+                discovery.done = self.resume_index
+                print(f"Продолжение обхода: уже обработано {len(self.resume_index)} страниц")
+            else:
+                self.links.exclude = self.resume_index
+                print(f"Продолжение: уже обработано {len(self.resume_index)} из {link_count(self.links)}")
+            # Записи с ошибкой будут перезаписаны повторной попыткой
+            self.results = ResultStore.for_elements(self.selected_elements)
+            self.results.extend(record for record in self.checkpoint.iter_latest() if "error" not in record)
+        except Exception as e:
+            self._close_resume_index()
+            messagebox.showerror("Ошибка", f"Не удалось прочитать временные результаты: {str(e)}")
+            return False
+        return True
+
+    def _close_resume_index(self):
+        if self.resume_index is not None:
+            self.resume_index.close()
+            self.resume_index = None
 
     def stop_parsing(self):
         self.parsing_in_progress = False
@@ -716,148 +1137,202 @@ class UniversalParser:
         self.stop_parsing_btn.config(state=tk.DISABLED)
         self.status_var.set("Парсинг остановлен")
 
-    def _parse_all_links(self, restart_interval):
-        total_links = len(self.links)
-        pages_since_restart = 0
-        for i, url in enumerate(self.links):
-            if not self.parsing_in_progress:
-                break
-            short_url = url[:50] + "..." if len(url) > 50 else url
-            try:
-                if restart_interval > 0 and pages_since_restart >= restart_interval:
-                    print(f"Перезапуск браузера после {pages_since_restart} страниц")
-                    self.root.after(0, lambda: self.status_var.set("Перезапуск браузера..."))
-                    self.root.after(0, self.restart_driver)
-                    while self.waiting_for_restart:
-                        time.sleep(0.5)
-                    pages_since_restart = 0
-                    time.sleep(2)
-
-                print(f"\n=== Обрабатывается {i+1}/{total_links}: {url} ===")
-                self.driver.get(url)
-                WebDriverWait(self.driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                time.sleep(random.uniform(1, 3))
-
-                if self.click_elements:
-                    print(f"  Выполняю клики по {len(self.click_elements)} типам элементов")
-                    for click_element in self.click_elements:
-                        try:
-                            elements = self.driver.find_elements(By.CSS_SELECTOR, click_element["selector"])
-                            print(f"    Найдено {len(elements)} элементов для: {click_element['name']}")
-                            clicked_count = 0
-                            for idx, elem in enumerate(elements):
-                                if self.smart_click(elem, f"{click_element['name']} #{idx+1}"):
-                                    clicked_count += 1
-                                    time.sleep(random.uniform(2, 4))
-                                else:
-                                    print(f"      ✗ Не удалось кликнуть: {click_element['name']} #{idx+1}")
-                            print(f"    ✓ Успешно кликнуто: {clicked_count}/{len(elements)} для {click_element['name']}")
-                        except Exception as e:
-                            print(f"    ✗ Ошибка при клике {click_element['name']}: {e}")
-
-                time.sleep(random.uniform(2, 3))
-
-                page_data = {"url": url}
-                html_content = self.driver.page_source
-                soup = BeautifulSoup(html_content, 'html.parser')
-                for element in self.selected_elements:
-                    try:
-                        selected_elements = soup.select(element["selector"])
-                        if selected_elements:
-                            texts = [elem.get_text(strip=True) for elem in selected_elements]
-                            page_data[element["name"]] = " | ".join(texts)
-                        else:
-                            page_data[element["name"]] = "Не найдено"
-                    except Exception as e:
-                        page_data[element["name"]] = f"Ошибка: {str(e)}"
-
-                self.results.append(page_data)
-                self.logger.info(f"Успешно обработана: {url}")
-                pages_since_restart += 1
-                self.save_temp_results()
-
-                time.sleep(random.uniform(1, 2))
-
-                def update_success():
-                    if self.parsing_in_progress:
-                        self.update_progress(i + 1, total_links, short_url)
-                        self._display_results()
-                self.root.after(0, update_success)
+    def _parse_all_links(self, restart_interval, workers=1, politeness=None, recycle_policy=None, page_cache=None,
+                         timings=None, parse_processes=0, discovery=None):
+        processed = [0]
 
-            except Exception as e:
-                print(f"  ✗ Ошибка при обработке {url}: {e}")
-                self.logger.error(f"Ошибка при обработке {url}: {str(e)}")
-                error_data = {"url": url, "error": str(e)}
-                for element in self.selected_elements:
-                    error_data[element["name"]] = "Ошибка загрузки"
-                self.results.append(error_data)
-                self.save_temp_results()
-                pages_since_restart += 1
-
-                def update_error():
-                    if self.parsing_in_progress:
-                        self.update_progress(i + 1, total_links, f"ERROR: {short_url}")
-                        self._display_results()
-                self.root.after(0, update_error)
+        def on_result(index, page_data):
+            self.results.append(page_data)
+            processed[0] += 1
+            if "error" in page_data:
+                self.logger.error(f"Ошибка при обработке {page_data['url']}: {page_data['error']}")
+            else:
+                self.logger.info(f"Успешно обработана: {page_data['url']}")
+            self.checkpoint.append(page_data)
+
+        def on_progress(done, url, ok, worker_stats):
+            short_url = url[:50] + "..." if len(url) > 50 else url
+            status = short_url if ok else f"ERROR: {short_url}"
+            self.pending_progress = (done, pool.total, status, worker_stats)  # Покажет _refresh_ui
+
+        def on_restart(worker):
+            if worker.worker_id == 0:
+                self.driver = worker.driver  # Первый браузер остается окном предпросмотра
+            self.root.after(0, lambda: self.status_var.set(f"Перезапуск браузера {worker.name}..."))
+
+        pool = WorkerPool(
+            self.links, self.click_elements, self.selected_elements,
+            workers=workers,
+            restart_interval=restart_interval,
+            recycle_policy=recycle_policy,
+            initial_driver=self.driver,
+            is_running=lambda: self.parsing_in_progress,
+            on_result=on_result,
+            on_progress=on_progress,
+            on_restart=on_restart,
+            static_fetch=self.static_fetch_var.get(),
+            backend=self.backend_var.get(),
+            waits=AdaptiveWaits() if self.adaptive_waits_var.get() else None,
+            politeness=politeness,
+            blocking=ResourceBlocking(allow=parse_allow_list(self.allow_resources_var.get()))
+            if self.block_resources_var.get() else None,
+            page_cache=page_cache,
+            timings=timings,
+            parse_processes=parse_processes,
+            discovery=discovery,
+        )
+        try:
+            pool.run()
+        finally:
+            self._close_resume_index()
+        if timings:
+            timings.close()
+            print(timing_report(DEFAULT_TIMINGS_PATH))
+        cache_info = ""
+        if page_cache:
+            cache_info = f", без изменений (из кэша): {page_cache.hits} из {page_cache.hits + page_cache.misses}"
+            page_cache.close()
+        try:
+            self.checkpoint.compact(self.results)
+        except Exception as e:
+            print(f"Ошибка сжатия временных результатов: {e}")
 
         def final_update():
             self.parsing_in_progress = False
-            if len(self.results) == total_links:
-                self.status_var.set(f"Парсинг завершен. Обработано: {len(self.results)} страниц")
+            self._set_journal_busy(False)
+            if self.pending_progress:
+                self.update_progress(*self.pending_progress)
+                self.pending_progress = None
+            if processed[0] == pool.total:
+                self.status_var.set(f"Парсинг завершен. Обработано: {processed[0]} страниц (всего результатов: {len(self.results)}{cache_info})")
             else:
-                self.status_var.set(f"Парсинг остановлен. Обработано: {len(self.results)} страниц")
+                self.status_var.set(f"Парсинг остановлен. Обработано: {processed[0]} страниц (всего результатов: {len(self.results)}{cache_info})")
             self._display_results()
             self.start_parsing_btn.config(state=tk.NORMAL)
             self.stop_parsing_btn.config(state=tk.DISABLED)
         self.root.after(0, final_update)
 
+    def _refresh_ui(self):
+        """Прогресс и новые строки результатов пачкой раз в UI_REFRESH_MS, а не после каждой страницы"""
+        if not self.parsing_in_progress:
+            return
+        if self.pending_progress:
+            self.update_progress(*self.pending_progress)
+            self.pending_progress = None
+        self._display_results()
+        self.root.after(UI_REFRESH_MS, self._refresh_ui)
+
     def _display_results(self):
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
-        if not self.results:
-            return
-        columns = list(self.results[0].keys())
-        self.results_tree["columns"] = columns
-        self.results_tree["show"] = "headings"
-        for col in columns:
-            self.results_tree.heading(col, text=col, anchor='w')
-            self.results_tree.column(col, width=200, anchor='w', minwidth=100)
-        for result in self.results:
-            values = [result.get(col, "") for col in columns]
-            self.results_tree.insert("", tk.END, values=values)
+        """Добавляет в таблицу только новые строки; полная перерисовка — если сменился сам список результатов"""
+        results = self.results
+        total = len(results)
+        if results is not self.shown_results or total < self.shown_until:
+            self._show_results_page(0)
+            return
+        page_end = (self.results_page + 1) * RESULTS_PAGE_SIZE
+        if self.shown_until < min(total, page_end):
+            for result in results[self.shown_until:min(total, page_end)]:
+                self.results_tree.insert("", tk.END, values=[result.get(col, "") for col in self.shown_columns])
+            self.shown_until = min(total, page_end)
+        elif self.results_follow and total > page_end:
+            self._show_results_page(self.results_page + 1)
+            return
+        self._update_results_page_label()
+
+    def _show_results_page(self, page):
+        """Перерисовка одной страницы таблицы (не больше RESULTS_PAGE_SIZE строк)"""
+        results = self.results
+        total = len(results)
+        last_page = max(0, (total - 1) // RESULTS_PAGE_SIZE)
+        page = min(max(0, page), last_page)
+        self.results_tree.delete(*self.results_tree.get_children())
+        columns = list(results[0].keys()) if results else []
+        if columns != self.shown_columns:
+            self.results_tree["columns"] = columns
+            self.results_tree["show"] = "headings"
+            for col in columns:
+                self.results_tree.heading(col, text=col, anchor='w')
+                self.results_tree.column(col, width=200, anchor='w', minwidth=100)
+            self.shown_columns = columns
+        start = page * RESULTS_PAGE_SIZE
+        end = min(total, start + RESULTS_PAGE_SIZE)
+        for result in results[start:end]:
+            self.results_tree.insert("", tk.END, values=[result.get(col, "") for col in columns])
+        self.shown_results = results
+        self.shown_until = end
+        self.results_page = page
+        self.results_follow = page == last_page
+        self._update_results_page_label()
+
+    def _update_results_page_label(self):
+        total = len(self.results)
+        pages = max(1, (total + RESULTS_PAGE_SIZE - 1) // RESULTS_PAGE_SIZE)
+        self.results_page_var.set(f"Страница {self.results_page + 1} из {pages} · всего результатов: {total}")
 
     def export_excel(self):
-        if not self.results:
-            messagebox.showwarning("Предупреждение", "Нет данных для экспорта")
-            return
-        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")])
-        if file_path:
-            try:
-                df = pd.DataFrame(self.results)
-                df.to_excel(file_path, index=False)
-                messagebox.showinfo("Успех", f"Данные экспортированы в {file_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {str(e)}")
+        self._export(".xlsx", [("Excel files", "*.xlsx")])
 
     def export_json(self):
-        if not self.results:
+        self._export(".json", [("JSON files", "*.json")])
+
+    def export_other(self):
+        self._export(".csv", [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet", "*.parquet")])
+
+    def _set_journal_busy(self, busy):
+        """Экспорт и очистка недоступны, пока парсинг пишет и сжимает журнал"""
+        self.journal_busy = busy
+        for button in self.journal_buttons:
+            button.config(state=tk.DISABLED if busy else tk.NORMAL)
+
+    def _journal_available(self):
+        if self.journal_busy:
+            messagebox.showwarning("Предупреждение", "Дождитесь окончания парсинга")
+            return False
+        if self.exporting:
+            messagebox.showwarning("Предупреждение", "Дождитесь окончания экспорта")
+            return False
+        return True
+
+    def _export(self, extension, filetypes):
+        """Экспорт из журнала результатов в отдельном потоке, прогресс — в панели внизу окна"""
+        if not self._journal_available():
+            return
+        if self.checkpoint.is_empty():
             messagebox.showwarning("Предупреждение", "Нет данных для экспорта")
             return
-        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        file_path = filedialog.asksaveasfilename(defaultextension=extension, filetypes=filetypes)
         if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(self.results, file, ensure_ascii=False, indent=2)
-                messagebox.showinfo("Успех", f"Данные экспортированы в {file_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {str(e)}")
+            if os.path.splitext(file_path)[1].lower() not in available_formats():
+                messagebox.showerror("Ошибка", "Формат не поддерживается (для Parquet нужен pyarrow, для Excel — openpyxl)")
+                return
+            self.status_var.set("Экспорт...")
+            self.exporting = True
+            threading.Thread(target=self._export_thread, args=(file_path,), daemon=True).start()
+
+    def _export_thread(self, file_path):
+        def on_progress(done, total):
+            def update():
+                if total:
+                    self.progress_var.set(done / total * 100)
+                self.status_var.set(f"Экспорт: {done}/{total}")
+            self.root.after(0, update)
+
+        try:
+            count = export_journal(self.checkpoint, file_path, on_progress)
+            self.root.after(0, lambda: messagebox.showinfo("Успех", f"Экспортировано {count} записей в {file_path}"))
+        except Exception as e:
+            error = str(e)
+            self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {error}"))
+        finally:
+            self.root.after(0, lambda: setattr(self, "exporting", False))
 
     def clear_results(self):
-        for item in self.results_tree.get_children():
-            self.results_tree.delete(item)
+        if not self._journal_available():
+            return
         self.results.clear()
-        if os.path.exists(self.temp_results_file):
-            os.remove(self.temp_results_file)
+        self.results_loaded = True
+        self.checkpoint.clear()
+        self._show_results_page(0)
 
     def __del__(self):
         if self.driver:
@@ -0,0 +1,143 @@
+"""Телефоны в формате E.164
+
+Все форматы номеров собраны в одно регулярное выражение, которое
+компилируется один раз. Во время парсинга номера извлекает обработка
+"phone" (transforms.py); уже собранные результаты можно обработать пачками
+(большие файлы — параллельно в нескольких процессах):
+
+    python phones.py results.jsonl --fields "Телефон" --output phones.xlsx
+"""
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_COUNTRY_CODE = "7"
+PHONE_CHUNK = 20000
+POOL_MIN_ROWS = 100000  # Меньше строк быстрее обработать в одном процессе, чем запускать пул
+
+PHONE_PATTERN = re.compile(r"""
+    (?<![\w+])
+    (?:
+        # +7, 8 или 7, код в скобках или без, номер группами 3-2-2. Без префикса номер
+        # должен быть записан со скобками или разделителями: 10 цифр подряд — скорее артикул
+        (?:(?:\+7|8|7)[\s-]?|(?!\d{10}))
+        \(?(?P<area>\d{3})\)?[\s-]?(?P<number>\d{3}[\s-]?\d{2}[\s-]?\d{2})
+      | # Другие страны: + и от 8 до 15 цифр с пробелами, скобками или дефисами
+        \+(?P<international>[1-9][\d\s()-]{6,18}\d)
+    )
+    (?!\w)
+""", re.VERBOSE)
+NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_phone(area, number, international):
+    """Номер E.164 (+79161234567) из групп PHONE_PATTERN; None, если цифр не столько, сколько в номере"""
+    if area:
+        return "+" + DEFAULT_COUNTRY_CODE + area + (number if number.isdigit() else NON_DIGITS.sub("", number))
+    digits = NON_DIGITS.sub("", international)
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+def find_phones(text):
+    """Номера E.164 в порядке появления в тексте, без повторов
+
+    >>> find_phones("Звоните: 8 (916) 123-45-67, +7 916 123 45 67 или 495 123-45-67")
+    ['+79161234567', '+74951234567']
+    >>> find_phones("Артикул 1234567890")
+    []
+    """
+    if not isinstance(text, str):
+        return []
+    phones = []
+    for groups in PHONE_PATTERN.findall(text):
+        phone = normalize_phone(*groups)
+        if phone and phone not in phones:
+            phones.append(phone)
+    return phones
+
+
+def _find_phones_chunk(texts):
+    return [find_phones(text) for text in texts]
+
+
+def find_phones_batch(texts, workers=None):
+    """find_phones для списка текстов; большие списки делятся на части и обрабатываются в процессах"""
+    if len(texts) < POOL_MIN_ROWS or workers == 1:
+        return _find_phones_chunk(texts)
+    chunks = [texts[i:i + PHONE_CHUNK] for i in range(0, len(texts), PHONE_CHUNK)]
+    result = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for phones in pool.map(_find_phones_chunk, chunks):
+            result.extend(phones)
+    return result
+
+
+class PhoneStage:
+    """Замена значений полей найденными телефонами ("+7... | +7..."), пачкой по всем записям
+
+    not_found — значение поля, в котором нет ни одного номера.
+    """
+
+    def __init__(self, fields, not_found, workers=None):
+        self.fields = list(fields)
+        self.not_found = not_found
+        self.workers = workers
+
+    def apply(self, records):
+        records = [record for record in records if "error" not in record]
+        for field in self.fields:
+            rows = [record for record in records if isinstance(record.get(field), str)]
+            found = find_phones_batch([record[field] for record in rows], self.workers)
+            for record, phones in zip(rows, found):
+                record[field] = " | ".join(phones) if phones else self.not_found
+
+
+def _read_records(path):
+    if path.lower().endswith(".json"):
+        with open(path, 'r', encoding='utf-8') as file:
+            yield from json.load(file)
+        return
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None):
+    from export import EXPORT_CHUNK, export_records
+    from constants import NOT_FOUND
+
+    arg_parser = argparse.ArgumentParser(description="Телефоны в формате E.164 из сохраненных результатов")
+    arg_parser.add_argument("input", help="Результаты: .jsonl (журнал) или .json")
+    arg_parser.add_argument("--fields", required=True, help="Поля с телефонами через запятую")
+    arg_parser.add_argument("--output", required=True, help="Файл результата: .json, .jsonl, .csv, .xlsx, .parquet")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Процессов для больших файлов (по умолчанию — по числу ядер)")
+    args = arg_parser.parse_args(argv)
+
+    stage = PhoneStage([field.strip() for field in args.fields.split(",") if field.strip()], NOT_FOUND, args.workers)
+
+    def batches():
+        batch = []
+        for record in _read_records(args.input):
+            batch.append(record)
+            if len(batch) >= max(POOL_MIN_ROWS, EXPORT_CHUNK):
+                stage.apply(batch)
+                yield from batch
+                batch = []
+        stage.apply(batch)
+        yield from batch
+
+    # Первый проход — только названия колонок, записи обрабатываются при втором
+    columns = {}
+    for record in _read_records(args.input):
+        columns.update(dict.fromkeys(record))
+    count = export_records(batches(), list(columns), args.output)
+    print(f"Сохранено {count} записей в {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
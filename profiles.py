@@ -0,0 +1,181 @@
+"""Профили сайтов: сохраненные элементы для клика и парсинга и настройки запуска
+
+Селекторы проверяются и приводятся к единому виду при сохранении, поэтому
+профиль загружается сразу, без повторного выбора элементов на странице.
+Профили общие для окна программы и запуска по заданию (job.py).
+"""
+import json
+import os
+import re
+
+import soupsieve
+
+from transforms import build_transforms, upgrade_element, upgrade_elements
+
+PROFILES_DIR = "profiles"
+COMBINATORS = ">+~"
+
+
+def normalize_selector(selector):
+    """Единый вид селектора: без лишних пробелов, комбинаторы через один пробел
+
+    Текст в кавычках и внутри [...] и (...) не изменяется.
+    """
+    result = []
+    quote = None
+    depth = 0
+    pending_space = False
+    for char in selector.strip():
+        if quote:
+            result.append(char)
+            if char == quote:
+                quote = None
+            continue
+        if char in "\"'":
+            quote = char
+        elif char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        elif depth == 0 and char.isspace():
+            pending_space = True
+            continue
+        elif depth == 0 and char in COMBINATORS:
+            while result and result[-1] == " ":
+                result.pop()
+            result.append(f" {char} ")
+            pending_space = False
+            continue
+        if pending_space and result and not result[-1].endswith(" "):
+            result.append(" ")
+        pending_space = False
+        result.append(char)
+    return "".join(result).strip()
+
+
+def normalize_elements(elements, kind):
+    """Проверенные элементы с нормализованными селекторами и список ошибок"""
+    normalized = []
+    errors = []
+    names = set()
+    for element in elements:
+        element = upgrade_element(element)
+        name = str(element.get("name", "")).strip()
+        selector = normalize_selector(str(element.get("selector", "")))
+        if not name or not selector:
+            errors.append(f"{kind}: у элемента нет названия или селектора")
+            continue
+        if name in names:
+            errors.append(f"{kind}: повторяется название «{name}»")
+            continue
+        try:
+            soupsieve.compile(selector)
+        except Exception as e:
+            errors.append(f"{kind}: «{name}» — неверный селектор {selector}: {e}")
+            continue
+        try:
+            build_transforms(element.get("transforms"))
+        except ValueError as e:
+            errors.append(f"{kind}: «{name}» — {e}")
+            continue
+        names.add(name)
+        normalized_element = dict(element, name=name, selector=selector)
+        if element.get("alternatives"):
+            normalized_element["alternatives"] = _valid_alternatives(element["alternatives"], selector)
+        normalized.append(normalized_element)
+    return normalized, errors
+
+
+def _valid_alternatives(alternatives, selector):
+    """Запасные селекторы: нормализованные, без повторов и неверных"""
+    result = []
+    for alternative in alternatives:
+        alternative = normalize_selector(str(alternative))
+        if not alternative or alternative == selector or alternative in result:
+            continue
+        try:
+            soupsieve.compile(alternative)
+        except Exception:
+            continue
+        result.append(alternative)
+    return result
+
+
+def profile_file_name(name):
+    """Имя файла профиля: название без символов, недопустимых в именах файлов"""
+    return re.sub(r'[^\w.-]+', '_', name.strip()).strip('._') + ".json"
+
+
+class ProfileStore:
+    """Папка с профилями: по одному JSON-файлу на профиль"""
+
+    def __init__(self, directory=PROFILES_DIR):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, profile_file_name(name))
+
+    def names(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = []
+        for file_name in sorted(os.listdir(self.directory)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), 'r', encoding='utf-8') as file:
+                    names.append(json.load(file)["name"])
+            except (OSError, ValueError, KeyError):
+                print(f"Пропущен поврежденный профиль {file_name}")
+        return names
+
+    def save(self, name, click_elements, selected_elements, settings=None):
+        """Проверка и сохранение профиля; ValueError со списком ошибок, если селекторы неверны"""
+        if not name or not profile_file_name(name)[:-len(".json")]:
+            raise ValueError("Введите название профиля")
+        click_elements, click_errors = normalize_elements(click_elements, "Клик")
+        selected_elements, parse_errors = normalize_elements(selected_elements, "Парсинг")
+        errors = click_errors + parse_errors
+        if errors:
+            raise ValueError("\n".join(errors))
+        profile = {
+            "name": name,
+            "click_elements": click_elements,
+            "selected_elements": selected_elements,
+            "settings": settings or {},
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name)
+        stored = self._stored_name(path)
+        if stored is not None and stored != name:
+            # "Site/A" и "Site_A" дают один файл: без проверки новый профиль молча заменил бы старый
+            raise ValueError(f"Название слишком похоже на профиль «{stored}» (тот же файл "
+                             f"{os.path.basename(path)}), выберите другое")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(profile, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return profile
+
+    @staticmethod
+    def _stored_name(path):
+        """Название профиля из файла path; None, если файла нет или он поврежден"""
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)["name"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def load(self, name):
+        """Профиль по названию; селекторы уже проверены при сохранении"""
+        with open(self.path(name), 'r', encoding='utf-8') as file:
+            profile = json.load(file)
+        for key in ("click_elements", "selected_elements"):
+            if key in profile:
+                profile[key] = upgrade_elements(profile[key])  # Профили, сохраненные до появления transforms
+        return profile
+
+    def delete(self, name):
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(path)
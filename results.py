@@ -0,0 +1,133 @@
+"""Компактное хранилище результатов в памяти: колонки с кодами значений
+
+Вместо списка словарей (имена полей повторяются в каждой записи) каждая
+колонка хранит массив целых кодов, а каждое различное значение — один раз
+в словаре колонки. "Не найдено", "Ошибка загрузки" и отсутствие поля
+записываются служебными кодами. Снаружи хранилище ведет себя как список
+записей: append, len, индексы и срезы, перебор.
+"""
+import threading
+from array import array
+
+from constants import LOAD_ERROR, NOT_FOUND
+
+MISSING_CODE = -1  # Поля нет в записи
+NULL_CODE = -2
+NOT_FOUND_CODE = -3
+LOAD_ERROR_CODE = -4
+SENTINELS = {NOT_FOUND: NOT_FOUND_CODE, LOAD_ERROR: LOAD_ERROR_CODE}
+SENTINEL_VALUES = {NULL_CODE: None, NOT_FOUND_CODE: NOT_FOUND, LOAD_ERROR_CODE: LOAD_ERROR}
+UNIQUE_COLUMNS = ("url",)  # Значения почти не повторяются: словарь только занял бы память
+
+
+class Column:
+    """Коды значений колонки и словарь различных значений"""
+
+    def __init__(self, name, length=0):
+        self.name = name
+        self.codes = array('i', [MISSING_CODE]) * length
+        self.values = []
+        self.index = None if name in UNIQUE_COLUMNS else {}
+
+    def encode(self, value):
+        if value is None:
+            return NULL_CODE
+        if isinstance(value, str) and value in SENTINELS:
+            return SENTINELS[value]
+        if self.index is None:
+            self.values.append(value)
+            return len(self.values) - 1
+        key = (value.__class__, value)  # 1, 1.0 и True — разные значения
+        try:
+            code = self.index.get(key)
+        except TypeError:  # Списки и словари не хешируются: хранятся без словаря
+            self.values.append(value)
+            return len(self.values) - 1
+        if code is None:
+            code = self.index[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        if code >= 0:
+            return self.values[code]
+        return SENTINEL_VALUES.get(code)
+
+
+class ResultStore:
+    """Результаты парсинга по колонкам; columns — url и поля из selected_elements
+
+    Поля, которых нет среди колонок (например error), добавляются новой колонкой
+    при первом появлении.
+    """
+
+    def __init__(self, columns=("url",)):
+        self.lock = threading.Lock()
+        self.columns = {}
+        self.length = 0
+        for name in columns:
+            self.columns[name] = Column(name)
+
+    @classmethod
+    def for_elements(cls, selected_elements):
+        return cls(["url"] + [element["name"] for element in selected_elements])
+
+    @property
+    def column_names(self):
+        return list(self.columns)
+
+    def append(self, record):
+        self.extend((record,))
+
+    def extend(self, records):
+        """Добавление записей пачкой под одной блокировкой"""
+        with self.lock:
+            for record in records:
+                for name in record:
+                    if name not in self.columns:
+                        self.columns[name] = Column(name, self.length)
+                for name, column in self.columns.items():
+                    column.codes.append(column.encode(record[name]) if name in record else MISSING_CODE)
+                self.length += 1
+
+    def clear(self):
+        with self.lock:
+            for name in list(self.columns):
+                self.columns[name] = Column(name)
+            self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def _columns(self):
+        with self.lock:
+            return list(self.columns.items())
+
+    def _row(self, i, columns):
+        row = {}
+        for name, column in columns:
+            code = column.codes[i]
+            if code != MISSING_CODE:
+                row[name] = column.decode(code)
+        return row
+
+    def iter_rows(self, start=0, stop=None):
+        """Записи-словари в порядке добавления (собираются по одной при переборе)"""
+        stop = self.length if stop is None else min(stop, self.length)
+        columns = self._columns()
+        for i in range(start, stop):
+            yield self._row(i, columns)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self.length)
+            columns = self._columns()
+            return [self._row(i, columns) for i in range(start, stop, step)]
+        if item < 0:
+            item += self.length
+        if not 0 <= item < self.length:
+            raise IndexError("индекс результата вне диапазона")
+        return self._row(item, self._columns())
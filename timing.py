@@ -0,0 +1,204 @@
+"""Замеры времени по этапам обработки страницы и отчет по ним
+
+Для каждой страницы записывается одна строка JSON: время этапов (загрузка,
+ожидание body и данных, клики с каждым способом, передача page_source,
+разбор HTML, извлечение, кэш, запись результата, перезапуск браузера),
+домен и браузер. Отчет — медиана (p50) и p95 по этапам, доменам и браузерам:
+
+    python timing.py timings.jsonl
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+DEFAULT_TIMINGS_PATH = "timings.jsonl"
+FLUSH_EVERY = 50  # Строк в буфере до записи на диск
+
+
+class _Stage:
+    """Контекст замера одного этапа; время прибавляется к этапу, если он повторяется"""
+
+    __slots__ = ("timer", "name", "started")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class PageTimer:
+    """Время этапов одной страницы: with timer.stage("navigation"): ..."""
+
+    def __init__(self, url=None, worker=None):
+        self.url = url
+        self.worker = worker
+        self.source = None  # browser, static, cache или error
+        self.stages = {}
+        self.clicks = []
+        self.started = time.perf_counter()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def click(self, strategy, seconds, ok):
+        """Одна попытка клика одним способом"""
+        self.clicks.append([strategy, round(seconds, 4), ok])
+        self.add("click_attempts", seconds)
+
+    def record(self):
+        return {
+            "time": round(time.time(), 3),
+            "url": self.url,
+            "domain": urlparse(self.url or "").netloc.lower(),
+            "worker": self.worker,
+            "source": self.source,
+            "total": round(time.perf_counter() - self.started, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "clicks": self.clicks,
+        }
+
+
+class NullTimer:
+    """Заглушка, когда замеры не нужны (окно предпросмотра, разовые вызовы)"""
+
+    source = None
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add(self, name, seconds):
+        pass
+
+    def click(self, strategy, seconds, ok):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class TimingRecorder:
+    """Запись замеров страниц в JSONL-файл: строки копятся в буфере и дописываются пачками"""
+
+    def __init__(self, path=DEFAULT_TIMINGS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.pages = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def record(self, timer):
+        line = json.dumps(timer.record(), ensure_ascii=False) + "\n"
+        with self.lock:
+            self.buffer.append(line)
+            self.pages += 1
+            if len(self.buffer) >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        self.file.writelines(self.buffer)
+        self.file.flush()
+        self.buffer = []
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._flush()
+                self.file.close()
+
+
+def percentile(values, q):
+    """Перцентиль по ближайшему рангу; values уже отсортированы"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def _read_timings(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # Строка, недописанная при аварийной остановке
+
+
+def _table(title, samples):
+    """Строки отчета: название, число замеров, p50, p95, сумма; по убыванию суммы"""
+    lines = [title, f"  {'':<28}{'замеров':>9}{'p50, с':>9}{'p95, с':>9}{'всего, с':>11}"]
+    rows = []
+    for name, values in samples.items():
+        values.sort()
+        rows.append((sum(values), name, values))
+    for total, name, values in sorted(rows, key=lambda row: (-row[0], str(row[1]))):
+        lines.append(f"  {str(name)[:28]:<28}{len(values):>9}{percentile(values, 50):>9.2f}"
+                     f"{percentile(values, 95):>9.2f}{total:>11.1f}")
+    return lines
+
+
+def timing_report(path=DEFAULT_TIMINGS_PATH):
+    """Текст отчета: p50/p95 по этапам, доменам, браузерам и способам клика"""
+    stages = defaultdict(list)
+    domains = defaultdict(list)
+    workers = defaultdict(list)
+    clicks = defaultdict(list)
+    click_ok = defaultdict(int)
+    sources = defaultdict(int)
+    pages = 0
+    for record in _read_timings(path):
+        pages += 1
+        total = record.get("total", 0.0)
+        stages["страница целиком"].append(total)
+        for name, seconds in record.get("stages", {}).items():
+            stages[name].append(seconds)
+        domains[record.get("domain") or "?"].append(total)
+        workers[record.get("worker") or "?"].append(total)
+        sources[record.get("source") or "?"] += 1
+        for strategy, seconds, ok in record.get("clicks", []):
+            clicks[strategy].append(seconds)
+            click_ok[strategy] += bool(ok)
+    if not pages:
+        return f"В {path} нет замеров"
+    lines = [f"Замеры: {pages} страниц ({', '.join(f'{name}: {count}' for name, count in sorted(sources.items()))})", ""]
+    lines += _table("По этапам:", stages) + [""]
+    lines += _table("По доменам (страница целиком):", domains) + [""]
+    lines += _table("По браузерам (страница целиком):", workers)
+    if clicks:
+        lines += [""] + _table("Попытки клика по способам:", clicks)
+        lines.append("  Успешных: " + ", ".join(
+            f"{strategy} {click_ok[strategy]}/{len(values)}" for strategy, values in sorted(clicks.items())
+        ))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Отчет по замерам времени обработки страниц")
+    arg_parser.add_argument("timings", nargs="?", default=DEFAULT_TIMINGS_PATH, help="Файл замеров (JSONL)")
+    args = arg_parser.parse_args(argv)
+    print(timing_report(args.timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Обработка значений полей при извлечении: числа и цены, даты, телефоны, регулярные выражения
+
+Обработка задается в элементе для парсинга списком "transforms", например
+
+    {"name": "Цена", "selector": ".price", "transforms": [{"type": "price"}]}
+    {"name": "Дата", "selector": ".date", "transforms": [{"type": "date", "format": "%d.%m.%Y"}]}
+    {"name": "Артикул", "selector": ".sku", "transforms": [{"type": "regex", "pattern": "Арт\\\\. (\\\\d+)"}]}
+
+Обработки применяются по очереди ко всем значениям поля на странице.
+Числа возвращаются как int/float, даты — строкой ГГГГ-ММ-ДД.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+from phones import find_phones
+
+NUMBER_PATTERN = re.compile(r"[-−]?\d(?:[\d\s'.,]*\d)?")  # \s — и неразрывные пробелы
+NUMBER_SPACES = re.compile(r"[\s']")
+ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+NUMERIC_DATE = re.compile(r"(?<!\d)(\d{1,2})[./](\d{1,2})[./](\d{4}|\d{2})(?!\d)")
+TEXT_DATE = re.compile(r"(?<!\d)(\d{1,2})\s+([а-яё]{3,})\.?(?:\s+(\d{4}))?", re.IGNORECASE)
+MONTHS = {
+    "янв": 1, "фев": 2, "мар": 3, "апр": 4, "мая": 5, "май": 5, "июн": 6,
+    "июл": 7, "авг": 8, "сен": 9, "окт": 10, "ноя": 11, "дек": 12,
+}
+RELATIVE_DAYS = {"сегодня": 0, "вчера": 1, "позавчера": 2}
+
+
+def parse_number(text):
+    """Первое число в тексте: "12 990,50 ₽" → 12990.5, "1,299.00" → 1299.0, "1 500" → 1500"""
+    match = NUMBER_PATTERN.search(text)
+    if not match:
+        return None
+    number = NUMBER_SPACES.sub("", match.group()).replace("−", "-")
+    if "," in number and "." in number:
+        decimal = "," if number.rfind(",") > number.rfind(".") else "."
+        number = number.replace("." if decimal == "," else ",", "").replace(decimal, ".")
+    elif "," in number or "." in number:
+        separator = "," if "," in number else "."
+        whole, _, fraction = number.rpartition(separator)
+        # Один разделитель и ровно три цифры после него — разделитель тысяч (1,299 или 1.299)
+        if number.count(separator) > 1 or (len(fraction) == 3 and whole.lstrip("-") not in ("", "0")):
+            number = number.replace(separator, "")
+        else:
+            number = number.replace(separator, ".")
+    try:
+        return float(number) if "." in number else int(number)
+    except ValueError:
+        return None
+
+
+def parse_date(text, today=None):
+    """Дата в тексте (ГГГГ-ММ-ДД, ДД.ММ.ГГГГ, "5 января 2024", "вчера") строкой ГГГГ-ММ-ДД"""
+    today = today or date.today()
+    lowered = text.lower()
+    for word, days in RELATIVE_DAYS.items():
+        if re.search(rf"(?<![а-яё]){word}(?![а-яё])", lowered):
+            return (today - timedelta(days=days)).isoformat()
+    try:
+        match = ISO_DATE.search(text)
+        if match:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3))).isoformat()
+        match = NUMERIC_DATE.search(text)
+        if match:
+            year = int(match.group(3))
+            if year < 100:
+                year += 2000
+            return date(year, int(match.group(2)), int(match.group(1))).isoformat()
+        for match in TEXT_DATE.finditer(lowered):
+            month = MONTHS.get(match.group(2)[:3])
+            if month:
+                year = int(match.group(3)) if match.group(3) else today.year
+                return date(year, month, int(match.group(1))).isoformat()
+    except ValueError:  # 31.02.2024 и т. п.
+        return None
+    return None
+
+
+class NumberTransform:
+    """Число или цена: первое число в значении"""
+
+    def __call__(self, values):
+        numbers = (parse_number(str(value)) for value in values)
+        return [number for number in numbers if number is not None]
+
+
+class DateTransform:
+    """Дата строкой ГГГГ-ММ-ДД; format — точный формат strptime, если даты на сайте записаны необычно"""
+
+    def __init__(self, format=None):
+        self.format = format
+
+    def parse(self, value):
+        if not self.format:
+            return parse_date(value)
+        try:
+            parsed = datetime.strptime(value.strip(), self.format)
+        except ValueError:
+            return None
+        return parsed.isoformat(sep=" ") if "%H" in self.format else parsed.date().isoformat()
+
+    def __call__(self, values):
+        dates = (self.parse(str(value)) for value in values)
+        return [value for value in dates if value is not None]
+
+
+class PhoneTransform:
+    """Телефоны в формате E.164 без повторов"""
+
+    def __call__(self, values):
+        result = []
+        for value in values:
+            for phone in find_phones(str(value)):
+                if phone not in result:
+                    result.append(phone)
+        return result
+
+
+class RegexTransform:
+    """Часть значения по регулярному выражению: группа group (по умолчанию первая, если группы есть)"""
+
+    def __init__(self, pattern, group=None):
+        try:
+            self.pattern = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"неверное регулярное выражение {pattern}: {e}")
+        self.group = group if group is not None else (1 if self.pattern.groups else 0)
+        if isinstance(self.group, int) and self.group > self.pattern.groups:
+            raise ValueError(f"в выражении {pattern} нет группы {self.group}")
+
+    def __call__(self, values):
+        result = []
+        for value in values:
+            match = self.pattern.search(str(value))
+            if match and match.group(self.group) is not None:
+                result.append(match.group(self.group))
+        return result
+
+
+TRANSFORMS = {
+    "number": NumberTransform,
+    "price": NumberTransform,
+    "date": DateTransform,
+    "phone": PhoneTransform,
+    "regex": RegexTransform,
+}
+
+
+def build_transforms(specs):
+    """Обработки из описаний [{"type": ..., параметры}]; ValueError, если описание неверно"""
+    transforms = []
+    for spec in specs or []:
+        if isinstance(spec, str):
+            spec = {"type": spec}
+        options = dict(spec)
+        kind = options.pop("type", None)
+        if kind not in TRANSFORMS:
+            raise ValueError(f"неизвестная обработка {kind} (доступны: {', '.join(TRANSFORMS)})")
+        try:
+            transforms.append(TRANSFORMS[kind](**options))
+        except TypeError:
+            raise ValueError(f"неверные параметры обработки {kind}: {', '.join(options) or 'нет'}")
+    return transforms
+
+
+def upgrade_element(element):
+    """Элемент из старых профилей и заданий: отметка "phones": true становится обработкой phone"""
+    if "phones" not in element:
+        return element
+    element = dict(element)
+    if element.pop("phones"):
+        transforms = list(element.get("transforms") or [])
+        if not any((spec if isinstance(spec, str) else spec.get("type")) == "phone" for spec in transforms):
+            transforms.append({"type": "phone"})
+        element["transforms"] = transforms
+    return element
+
+
+def upgrade_elements(elements):
+    return [upgrade_element(element) if isinstance(element, dict) else element for element in elements or []]
+
+
+def apply_transforms(transforms, values):
+    for transform in transforms:
+        values = transform(values)
+    return values
+
+
+def parse_transform_arg(value):
+    """Обработка из строки командной строки: price, number, phone, date[:формат], regex:выражение"""
+    kind, _, parameter = value.partition(":")
+    kind = kind.strip()
+    if kind == "date" and parameter:
+        return {"type": "date", "format": parameter}
+    if kind == "regex":
+        return {"type": "regex", "pattern": parameter}
+    return {"type": kind}